@@ -0,0 +1,130 @@
+"""
+Memory and assignment benchmark: slotted Package vs the __dict__ based layouts it replaced.
+
+Three layouts are compared:
+  - dict: the original Package, a plain object with a per-instance __dict__
+  - watched_dict: a __dict__ based Package whose status, truck_id, destination and deadline
+    are watched properties, as they were before Package got __slots__
+  - slotted: today's Package
+
+Each is measured on its own, and (for the watched layouts) the way the simulation holds them:
+stored in a PackageHashTable, which indexes them by status, truck, destination and deadline
+and watches them to keep those indexes current. Memory is measured with tracemalloc, and
+assignment time is one `package.status = ...` on an unwatched and on a stored package.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_package_memory.py [N]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+
+from wgups.core.package import Package, PackageStatus
+from wgups.data_structures.hash_table import PackageHashTable
+from wgups.utils import convert_deadline
+
+DESTINATIONS = [f"Location {i} 123 Main St" for i in range(500)]
+DEADLINES = ["09:00:00", "10:30:00", "EOD", "EOD"]
+ASSIGNMENTS = 200000
+REPEAT = 5
+
+
+class DictPackage:
+    """The original Package layout: a plain object with a per-instance __dict__"""
+    def __init__(self, package_ID, destination, deadline_in_hhmmss, weight, notes):
+        self.package_ID = package_ID
+        self.destination = destination
+        self.deadline = convert_deadline(deadline_in_hhmmss)
+        self.weight = weight
+        self.notes = notes
+        self.delivered_at_time = None
+        self.status = PackageStatus.AT_HUB
+        self.truck_id = 0
+        self.note_on_delivery = None
+
+
+def _watched_property(name):
+    private = "_" + name
+
+    def getter(self):
+        return self.__dict__[private]
+
+    def setter(self, value):
+        old_value, self.__dict__[private] = self.__dict__.get(private), value
+        if old_value != value:
+            for watcher in self._watchers:
+                watcher.package_changed(self, name, old_value, value)
+    return property(getter, setter)
+
+
+class WatchedDictPackage(DictPackage):
+    """The layout before __slots__: a __dict__ per instance, plus watched properties and a watcher list"""
+    status = _watched_property("status")
+    truck_id = _watched_property("truck_id")
+    destination = _watched_property("destination")
+    deadline = _watched_property("deadline")
+
+    def __init__(self, *args):
+        self._watchers = []
+        super().__init__(*args)
+
+    def add_watcher(self, watcher):
+        self._watchers.append(watcher)
+
+    def remove_watcher(self, watcher):
+        self._watchers.remove(watcher)
+
+
+def build(package_class, count, stored, **extra):
+    """Build `count` packages (and store them in an indexed table if `stored`). Returns (bytes, packages, table)."""
+    # IDs are built up front so only the package objects (and the table) are measured
+    package_ids = [str(i) for i in range(count)]
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    packages = [package_class(package_ids[i], DESTINATIONS[i % len(DESTINATIONS)], DEADLINES[i % len(DEADLINES)],
+                              i % 100, "", **{key: value(i) for key, value in extra.items()})
+                for i in range(count)]
+    table = None
+    if stored:
+        table = PackageHashTable(initial_capacity=count)
+        for package in packages:
+            table.insert(package.package_ID, package)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, packages, table
+
+
+def assignment_ns(package):
+    """
+    Nanoseconds per `package.status = ...`, alternating between two statuses so every one is a change.
+    Best of REPEAT runs.
+    """
+    runs = timeit.repeat("package.status = ON_TRUCK; package.status = AT_HUB", number=ASSIGNMENTS // 2, repeat=REPEAT,
+                         globals={"package": package, "ON_TRUCK": PackageStatus.ON_TRUCK,
+                                  "AT_HUB": PackageStatus.AT_HUB})
+    return min(runs) / ASSIGNMENTS * 1e9
+
+
+def measure(name, package_class, count, stored, **extra):
+    memory, packages, table = build(package_class, count, stored, **extra)
+    return {"layout": name, "stored": stored, "bytes_per_package": round(memory / count, 1),
+            "ns_per_status_assignment": round(assignment_ns(packages[count // 2]), 1)}
+
+
+def main(count=50000):
+    destination_index = {"destination_index": lambda i: i % len(DESTINATIONS)}
+    results = [
+        measure("dict", DictPackage, count, stored=False),
+        measure("watched_dict", WatchedDictPackage, count, stored=False),
+        measure("slotted", Package, count, stored=False, **destination_index),
+        measure("watched_dict", WatchedDictPackage, count, stored=True),
+        measure("slotted", Package, count, stored=True, **destination_index),
+    ]
+    for result in results:
+        print(json.dumps({"benchmark": "package_memory", "packages": count, **result}))
+    return results
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,144 @@
+"""
+Regression checks for the simulation's results, as opposed to its speed (see run_benchmarks.py).
+
+On the bundled day, for each configuration in CONFIGURATIONS:
+  - tick by tick and event driven runs deliver every package at the same second, with the same
+    mileage per truck and the same finish time
+  - no package with a deadline is delivered late
+and, for the default configuration:
+  - the day still comes to EXPECTED_MILES miles, done at EXPECTED_FINISH
+  - state_at(t), rebuilt from the history, agrees with the live simulation at every REPLAY_STEP
+    seconds: each package's status, truck and delivery time, and each truck's status and miles
+
+Prints one line per check and exits non-zero if any failed.
+
+Usage:
+    PYTHONPATH=src python benchmarks/check_regressions.py
+"""
+import sys
+
+from workloads import bundled_data, build_manager, quiet_logging
+
+from wgups.constants import EOD_IN_SECONDS
+from wgups.core.local_search import get_local_search
+from wgups.history import SNAPSHOT_INTERVAL
+from wgups.utils import convert_seconds_to_hhmmss
+
+CONFIGURATIONS = {
+    "default": {},
+    "plan_ahead": {"plan_ahead": True},
+    "2opt_neighbors_5": {"local_search": lambda: get_local_search("2opt", neighbors=5)},
+}
+EXPECTED_MILES = 113.88
+EXPECTED_FINISH = "11:12:39"
+REPLAY_STEP = 7 * 60 + 13  # Off the snapshot interval, so most checks replay events past a snapshot
+MILES_TOLERANCE = 1e-6  # The replay works out miles from the speed; the trucks add them up every second
+
+
+def make_manager(data, settings, **extra):
+    settings = {name: value() if callable(value) else value for name, value in settings.items()}
+    return build_manager(data, **settings, **extra)
+
+
+def outcome(delivery_manager):
+    """Everything the two loops have to agree on"""
+    return {
+        "time": delivery_manager.time,
+        "miles": [truck.total_miles_travelled for truck in delivery_manager.trucks],
+        "delivered": {pkg.package_ID: pkg.delivered_at_time for pkg in delivery_manager.packages.values()},
+    }
+
+
+def late_packages(delivery_manager):
+    return sorted((pkg for pkg in delivery_manager.packages.values()
+                   if pkg.deadline != EOD_IN_SECONDS
+                   and (pkg.delivered_at_time is None or pkg.delivered_at_time > pkg.deadline)),
+                  key=lambda pkg: int(pkg.package_ID))
+
+
+def live_state(delivery_manager):
+    packages = {pkg.package_ID: (pkg.status, pkg.truck_id, pkg.delivered_at_time)
+                for pkg in delivery_manager.packages.values()}
+    trucks = {truck.truck_id: (truck.status.name, truck.total_miles_travelled) for truck in delivery_manager.trucks}
+    return packages, trucks
+
+
+def replay_mismatches(live, state):
+    packages, trucks = live
+    mismatches = []
+    for package_id, expected in packages.items():
+        replayed = state.packages[package_id]
+        found = (replayed["status"], replayed["truck"], replayed["delivered_at"])
+        if found != expected:
+            mismatches.append(f"package {package_id}: live {expected}, replayed {found}")
+    for truck_id, (status, miles) in trucks.items():
+        replayed_miles = state.truck_miles(truck_id)
+        if state.trucks[truck_id]["status"] != status or abs(replayed_miles - miles) > MILES_TOLERANCE:
+            mismatches.append(f"truck {truck_id}: live {status} {miles:.6f}, "
+                              f"replayed {state.trucks[truck_id]['status']} {replayed_miles:.6f}")
+    return mismatches
+
+
+def check_replay(data, settings):
+    """Tick through the day, keeping the live state every REPLAY_STEP seconds, then ask state_at for the same times"""
+    delivery_manager = make_manager(data, settings, snapshot_interval=SNAPSHOT_INTERVAL)
+    kept = {}
+    next_check = delivery_manager.time + REPLAY_STEP
+    while not delivery_manager.all_packages_delivered():
+        delivery_manager.tick()
+        if delivery_manager.time >= next_check:
+            kept[delivery_manager.time] = live_state(delivery_manager)
+            next_check += REPLAY_STEP
+    kept[delivery_manager.time] = live_state(delivery_manager)
+    failures = []
+    for time, live in kept.items():
+        failures.extend(f"{convert_seconds_to_hhmmss(time)} {mismatch}"
+                        for mismatch in replay_mismatches(live, delivery_manager.state_at(time)))
+    return len(kept), failures
+
+
+def main():
+    quiet_logging()
+    data = bundled_data()
+    failed = []
+
+    def report(name, problems):
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for problem in problems[:10]:
+            print(f"     {problem}")
+        if problems:
+            failed.append(name)
+
+    for name, settings in CONFIGURATIONS.items():
+        ticked = make_manager(data, settings)
+        ticked.start()
+        jumped = make_manager(data, settings)
+        jumped.start(event_driven=True)
+        expected, found = outcome(ticked), outcome(jumped)
+        problems = [f"{field}: tick {expected[field]}, event driven {found[field]}"
+                    for field in ("time", "miles") if expected[field] != found[field]]
+        problems.extend(f"package {package_id}: tick {delivered}, event driven {found['delivered'][package_id]}"
+                        for package_id, delivered in expected["delivered"].items()
+                        if found["delivered"][package_id] != delivered)
+        report(f"{name}: tick and event driven agree", problems)
+
+        report(f"{name}: no late packages",
+               [f"package {pkg.package_ID} due {convert_seconds_to_hhmmss(pkg.deadline)}, delivered "
+                f"{convert_seconds_to_hhmmss(pkg.delivered_at_time) if pkg.delivered_at_time else 'never'}"
+                for pkg in late_packages(ticked)])
+
+        if name == "default":
+            miles, finish = round(ticked.total_miles_travelled, 2), convert_seconds_to_hhmmss(ticked.time)
+            report(f"{name}: {EXPECTED_MILES} miles, done at {EXPECTED_FINISH}",
+                   [] if (miles, finish) == (EXPECTED_MILES, EXPECTED_FINISH)
+                   else [f"{miles} miles, done at {finish}"])
+            checked, problems = check_replay(data, settings)
+            report(f"{name}: state_at agrees with the live run at {checked} times", problems)
+
+    if failed:
+        print(f"{len(failed)} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
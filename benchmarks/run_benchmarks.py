@@ -0,0 +1,372 @@
+"""
+Simulation benchmark suite.
+
+Times the hot paths of the simulation on reproducible workloads (see workloads.py):
+  - end-to-end DeliveryManager.start(), tick by tick and event driven
+  - a single route assignment pass (run_route_algorithm) with every truck at the hub
+  - local search over a full truck manifest, for every engine in LOCAL_SEARCHES
+  - batch route evaluation of many candidate orderings, pure Python and NumPy (when installed)
+  - PackageHashTable insert and lookup
+  - MinHeap push, pop, bulk heapify, and update / remove by key
+  - AVLTree deadline index insert, count_before, range and delete
+
+Each benchmark prints one JSON object per line (and optionally writes them to a file), so
+results can be saved, diffed, and compared against a baseline run to catch regressions.
+
+Usage:
+    PYTHONPATH=src python benchmarks/run_benchmarks.py
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --quick -o results.jsonl
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --baseline results.jsonl --tolerance 0.25
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --only hash_table --packages 5000
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+from time import perf_counter
+
+from workloads import bundled_data, synthetic_data, build_manager, quiet_logging
+
+from wgups.constants import EOD_IN_SECONDS
+from wgups.core.batch_evaluator import BatchRouteEvaluator, numpy
+from wgups.core.local_search import LOCAL_SEARCHES, get_local_search
+from wgups.core.package import Package, PackageStatus
+from wgups.data_structures.avl_tree import AVLTree
+from wgups.data_structures.hash_table import PackageHashTable
+from wgups.data_structures.min_heap import MinHeap
+from wgups.utils import convert_seconds_to_hhmmss
+
+DEADLINES = ["09:00:00", "10:30:00", "EOD", "EOD"]
+
+
+def measure(setup, run, repeat):
+    """
+    Call setup() then time run(state), `repeat` times. Only run() is timed.
+    Returns the timings and whatever the last run() returned.
+    """
+    timings = []
+    outcome = None
+    for _ in range(repeat):
+        state = setup()
+        started = perf_counter()
+        outcome = run(state)
+        timings.append(perf_counter() - started)
+    return timings, outcome
+
+
+def record(benchmark, workload, timings, **extra):
+    return {
+        "benchmark": benchmark,
+        "workload": workload,
+        "repeat": len(timings),
+        "best_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "mean_seconds": round(statistics.fmean(timings), 6),
+        "python": platform.python_version(),
+        **extra,
+    }
+
+
+def simulation_outcome(delivery_manager):
+    return {
+        "miles": round(delivery_manager.total_miles_travelled, 4),
+        "finish_time": convert_seconds_to_hhmmss(delivery_manager.time),
+    }
+
+
+def bench_end_to_end(workloads, args):
+    for workload, data, trucks in workloads:
+        modes = [("tick", False), ("event", True)]
+        if workload["name"] != "bundled":
+            # Tick mode over a synthetic day takes minutes; the event mode covers it
+            modes = modes[1:]
+        for mode, event_driven in modes:
+            def run(delivery_manager):
+                try:
+                    delivery_manager.start(event_driven=event_driven)
+                    error = None
+                except Exception as e:
+                    # e.g. an oversized workload running past midnight; still worth recording
+                    error = str(e)
+                return dict(simulation_outcome(delivery_manager), error=error)
+
+            repeat = 1 if not event_driven else args.repeat
+            timings, outcome = measure(lambda: build_manager(data, trucks), run, repeat)
+            yield record(f"end_to_end_{mode}", workload, timings, **outcome)
+
+
+def bench_route_assignment(workloads, args):
+    for workload, data, trucks in workloads:
+        def setup():
+            delivery_manager = build_manager(data, trucks)
+            delivery_manager.time += 1
+            return delivery_manager
+
+        def run(delivery_manager):
+            delivery_manager.run_route_algorithm(delivery_manager.trucks_at_hub)
+            return sum(len(truck.packages_on_truck) for truck in delivery_manager.trucks)
+
+        timings, loaded = measure(setup, run, args.repeat)
+        yield record("route_assignment", workload, timings, packages_loaded=loaded)
+
+
+def bench_local_search(workloads, args):
+    for workload, data, trucks in workloads:
+        delivery_manager = build_manager(data, trucks)
+        truck = delivery_manager.trucks[0]
+        # A shuffled full truckload of end-of-day packages: lots of room to improve, always on time
+        eod = [pkg for pkg in delivery_manager.packages_at_hub if pkg.deadline == EOD_IN_SECONDS]
+        random.Random(args.seed).shuffle(eod)
+        manifest = eod[:truck.max_capacity]
+
+        for name in LOCAL_SEARCHES:
+            def run(local_search):
+                route = local_search.optimize(delivery_manager.evaluate_route(list(manifest), truck))
+                return route.total_distance
+
+            timings, distance = measure(lambda: get_local_search(name), run, args.repeat)
+            yield record(f"local_search_{name}", dict(workload, stops=len(manifest)), timings,
+                         route_miles=round(distance, 4))
+
+
+def bench_batch_evaluator(workloads, args):
+    for workload, data, trucks in workloads:
+        delivery_manager = build_manager(data, trucks)
+        truck = delivery_manager.trucks[0]
+        # Shuffled orderings of a full truckload, as a local search or planner would score them
+        manifest = delivery_manager.packages_at_hub[:truck.max_capacity]
+        rng = random.Random(args.seed)
+        manifests = [rng.sample(manifest, len(manifest)) for _ in range(args.orderings)]
+
+        for use_numpy in (False, True) if numpy is not None else (False,):
+            def setup():
+                delivery_manager.batch_evaluator = BatchRouteEvaluator(delivery_manager.distance_matrix,
+                                                                       use_numpy=use_numpy, min_numpy_stops=0)
+
+            def run(_):
+                distances, meets_deadlines = delivery_manager.evaluate_manifests(manifests, truck)
+                return min(distances), sum(meets_deadlines)
+
+            timings, (shortest, on_time) = measure(setup, run, args.repeat)
+            yield record(f"batch_evaluator_{'numpy' if use_numpy else 'python'}",
+                         dict(workload, orderings=len(manifests), stops=len(manifest)), timings,
+                         shortest_miles=round(shortest, 4), on_time=on_time)
+
+
+def make_packages(count, seed):
+    rng = random.Random(seed)
+    return [Package(str(i), f"Location {rng.randrange(500)}", rng.choice(DEADLINES), rng.randint(1, 50), "")
+            for i in range(1, count + 1)]
+
+
+def bench_hash_table(args):
+    workload = {"name": "synthetic", "packages": args.packages, "seed": args.seed}
+    ids = [str(i) for i in range(1, args.packages + 1)]
+    random.Random(args.seed).shuffle(ids)
+
+    # A table watches the packages stored in it, so every run gets its own packages
+    def empty_table():
+        return PackageHashTable(), make_packages(args.packages, args.seed)
+
+    def filled_table():
+        table, packages = empty_table()
+        return insert((table, packages))
+
+    def insert(state):
+        table, packages = state
+        for package in packages:
+            table.insert(package.package_ID, package)
+        return table
+
+    timings, table = measure(empty_table, insert, args.repeat)
+    yield record("hash_table_insert", workload, timings, **table.chain_stats())
+
+    timings, found = measure(filled_table,
+                             lambda table: sum(1 for package_id in ids if table.lookup_by_id(package_id) is not None),
+                             args.repeat)
+    yield record("hash_table_lookup", workload, timings, found=found)
+
+    timings, found = measure(filled_table, lambda table: len(table.lookup_by_status(PackageStatus.AT_HUB)), args.repeat)
+    yield record("hash_table_lookup_by_status", workload, timings, found=found)
+
+
+def bench_min_heap(args):
+    workload = {"name": "synthetic", "packages": args.packages, "seed": args.seed}
+    packages = make_packages(args.packages, args.seed)
+
+    def push(heap):
+        for package in packages:
+            heap.push([package])
+        return heap
+
+    timings, _ = measure(MinHeap, push, args.repeat)
+    yield record("min_heap_push", workload, timings)
+
+    def pop(heap):
+        popped = 0
+        while heap.pop():
+            popped += 1
+        return popped
+
+    timings, popped = measure(lambda: push(MinHeap()), pop, args.repeat)
+    yield record("min_heap_pop", workload, timings, popped=popped)
+
+    timings, _ = measure(lambda: [[package] for package in packages], MinHeap.heapify, args.repeat)
+    yield record("min_heap_heapify", workload, timings)
+
+    # Re-prioritize every other package, then remove the rest, through the position map
+    def update_and_remove(heap):
+        for index, package in enumerate(packages):
+            if index % 2:
+                heap.remove((package.package_ID,))
+            else:
+                heap.update((package.package_ID,), package.deadline - 60)
+        return len(heap)
+
+    timings, left = measure(lambda: push(MinHeap()), update_and_remove, args.repeat)
+    yield record("min_heap_update_remove", workload, timings, left=left)
+
+
+def bench_avl_tree(args):
+    workload = {"name": "synthetic", "packages": args.packages, "seed": args.seed}
+    packages = make_packages(args.packages, args.seed)
+    deadlines = sorted({package.deadline for package in packages})
+
+    def insert(tree):
+        for package in packages:
+            tree.insert(package)
+        return tree
+
+    timings, _ = measure(AVLTree, insert, args.repeat)
+    yield record("avl_tree_insert", workload, timings)
+
+    # "How many packages are due before each deadline", and who they are
+    timings, counted = measure(lambda: insert(AVLTree()),
+                               lambda tree: sum(tree.count_before(deadline) for deadline in deadlines), args.repeat)
+    yield record("avl_tree_count_before", workload, timings, counted=counted)
+
+    timings, found = measure(lambda: insert(AVLTree()),
+                             lambda tree: sum(len(tree.range(None, deadline)) for deadline in deadlines), args.repeat)
+    yield record("avl_tree_range", workload, timings, found=found)
+
+    def delete(tree):
+        for package in packages:
+            tree.delete(package)
+        return len(tree)
+
+    timings, left = measure(lambda: insert(AVLTree()), delete, args.repeat)
+    yield record("avl_tree_delete", workload, timings, left=left)
+
+
+def build_workloads(args):
+    workloads = [({"name": "bundled"}, bundled_data(), None)]
+    workloads.append(({"name": "synthetic", "packages": args.sim_packages, "locations": args.locations,
+                       "trucks": args.trucks, "seed": args.seed},
+                      synthetic_data(args.sim_packages, args.locations, trucks=args.trucks, seed=args.seed), args.trucks))
+    return workloads
+
+
+def run_benchmarks(args):
+    workloads = build_workloads(args)
+    benchmarks = {
+        "end_to_end": lambda: bench_end_to_end(workloads, args),
+        "route_assignment": lambda: bench_route_assignment(workloads, args),
+        "local_search": lambda: bench_local_search(workloads, args),
+        "batch_evaluator": lambda: bench_batch_evaluator(workloads, args),
+        "hash_table": lambda: bench_hash_table(args),
+        "min_heap": lambda: bench_min_heap(args),
+        "avl_tree": lambda: bench_avl_tree(args),
+    }
+    for name, benchmark in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        yield from benchmark()
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Compare median timings against a previous run. Returns the list of regressions:
+    benchmarks (matched on name and workload) that got more than `tolerance` slower.
+    """
+    with open(baseline_path, mode='r', encoding='utf-8') as baseline_file:
+        baseline = {}
+        for line in baseline_file:
+            if line.strip():
+                row = json.loads(line)
+                baseline[(row["benchmark"], json.dumps(row["workload"], sort_keys=True))] = row
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], json.dumps(result["workload"], sort_keys=True)))
+        if previous is None or not previous["median_seconds"]:
+            continue
+        ratio = result["median_seconds"] / previous["median_seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append({"benchmark": result["benchmark"], "workload": result["workload"],
+                                "baseline_seconds": previous["median_seconds"],
+                                "median_seconds": result["median_seconds"], "ratio": round(ratio, 3)})
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="WGUPS simulation benchmarks")
+    parser.add_argument("--only", nargs="+",
+                        choices=["end_to_end", "route_assignment", "local_search", "batch_evaluator", "hash_table",
+                                 "min_heap", "avl_tree"],
+                        help="Only run these benchmarks.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (default: 5).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for every synthetic workload (default: 1).")
+    parser.add_argument("--packages", type=int, default=20000,
+                        help="N packages for the hash table, heap and AVL tree benchmarks (default: 20000).")
+    parser.add_argument("--orderings", type=int, default=2000,
+                        help="Candidate orderings per batch route evaluation (default: 2000).")
+    parser.add_argument("--sim-packages", type=int, default=200,
+                        help="N packages for the synthetic simulation workload (default: 200).")
+    parser.add_argument("--locations", type=int, default=60,
+                        help="M locations for the synthetic simulation workload (default: 60).")
+    parser.add_argument("--trucks", type=int, default=4,
+                        help="K trucks (and drivers) for the synthetic simulation workload (default: 4).")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads and a single run, for a smoke test.")
+    parser.add_argument("-o", "--output", help="Also write the results to this JSONL file.")
+    parser.add_argument("--baseline", help="JSONL results of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline before failing (default: 0.25 = 25%%).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.quick:
+        args.repeat = 1
+        args.packages = min(args.packages, 2000)
+        args.sim_packages = min(args.sim_packages, 60)
+        args.locations = min(args.locations, 30)
+        args.orderings = min(args.orderings, 200)
+    quiet_logging()
+
+    results = []
+    output_file = open(args.output, mode='w', encoding='utf-8') if args.output else None
+    try:
+        for result in run_benchmarks(args):
+            results.append(result)
+            line = json.dumps(result)
+            print(line, flush=True)
+            if output_file:
+                output_file.write(line + "\n")
+                output_file.flush()
+    finally:
+        if output_file:
+            output_file.close()
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(json.dumps({"regression": regression}), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Batch runner
+
+Runs the full DeliveryManager simulation over many scenarios (fleet size, crew size, speed,
+start time, package file, local search, ...) in parallel across a process pool, and streams
+one result row per scenario to a CSV or JSONL file as soon as it finishes.
+
+Scenario files are YAML (needs PyYAML) or JSON:
+
+    defaults:                 # optional, applied to every scenario
+      truck_speed: 18
+    grid:                     # optional, every combination becomes a scenario
+      truck_fleet_size: [2, 3]
+      driver_crew_size: [2, 3]
+    scenarios:                # optional, explicit scenarios
+      - name: early-start
+        start_time: "07:30:00"
+      - name: alternate-packages
+        package_file: packages_variant.csv
+
+Usage:
+    wgups batch scenarios.yaml -o results.csv --workers 8
+"""
+import csv
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging import getLogger
+from time import process_time
+from typing import Dict, List
+
+from wgups.constants import EOD_IN_SECONDS
+from wgups.core.delivery_manager import DeliveryManager
+from wgups.core.local_search import get_local_search
+from wgups.log_pipeline import reset_event_counts, event_count_report
+from wgups.network_cache import load_network
+from wgups.utils import ingest_packages_from_file, convert_deadline, convert_seconds_to_hhmmss, data_file_path, \
+    PACKAGE_FILE_NAME, DISTANCE_FILE_NAME, LOCATION_FILE_NAME
+
+logger = getLogger(__name__)
+
+# Scenario keys passed straight through to DeliveryManager
+MANAGER_SETTINGS = ("truck_fleet_size", "driver_crew_size", "start_time", "truck_speed", "truck_capacity", "regions",
+                    "plan_ahead")
+
+RESULT_FIELDS = ["name", *MANAGER_SETTINGS, "package_file", "local_search", "neighbors",
+                 "miles", "late_packages", "undelivered_packages", "finish_time", "finish_seconds",
+                 "cpu_seconds", "events", "error"]
+
+# Parsed data shared by every scenario a worker process runs. Set once per worker by _init_worker.
+_shared: Dict = {}
+
+
+def load_scenarios(scenarios_path: str) -> List[Dict]:
+    """Read a YAML or JSON scenario file and expand it into a flat list of scenarios"""
+    with open(scenarios_path, mode='r', encoding='utf-8') as scenarios_file:
+        if scenarios_path.endswith(".json"):
+            config = json.load(scenarios_file)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise Exception("PyYAML is required to read YAML scenario files. "
+                                "Install it with `pip install PyYAML`, or use a .json scenario file.")
+            config = yaml.safe_load(scenarios_file)
+
+    scenarios = expand_scenarios(config or {})
+
+    # Relative package file paths are relative to the scenario file
+    base_dir = os.path.dirname(os.path.abspath(scenarios_path))
+    for scenario in scenarios:
+        package_file = scenario.get("package_file")
+        if package_file and not os.path.isabs(package_file):
+            scenario["package_file"] = os.path.join(base_dir, package_file)
+    return scenarios
+
+
+def expand_scenarios(config: Dict) -> List[Dict]:
+    """
+    Combine defaults, the grid and the explicit scenario list.
+    Every scenario gets a unique name.
+    """
+    defaults = config.get("defaults", {})
+    scenarios = []
+
+    grid = config.get("grid", {})
+    if grid:
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            scenario = dict(defaults)
+            scenario.update(zip(keys, values))
+            scenario.setdefault("name", ",".join(f"{key}={value}" for key, value in zip(keys, values)))
+            scenarios.append(scenario)
+
+    for i, explicit in enumerate(config.get("scenarios", [])):
+        scenario = dict(defaults)
+        scenario.update(explicit)
+        scenario.setdefault("name", f"scenario-{i + 1}")
+        scenarios.append(scenario)
+
+    if not scenarios:
+        # Only defaults given: run them as a single scenario
+        scenario = dict(defaults)
+        scenario.setdefault("name", "default")
+        scenarios.append(scenario)
+    return scenarios
+
+
+def _init_worker(distance_matrix, address_index):
+    """Process pool initializer: keep the parsed distance and location data for every scenario"""
+    _shared["distance_matrix"] = distance_matrix
+    _shared["address_index"] = address_index
+    _shared["packages"] = {}
+    # Per-delivery log lines are noise in a batch; keep warnings and errors, and count the rest
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _package_data(package_file):
+    """Parsed package data, cached per package file within a worker"""
+    packages = _shared["packages"]
+    if package_file not in packages:
+        packages[package_file] = ingest_packages_from_file(package_file)
+    # Ingested rows aren't modified by the simulation, but hand each run its own list anyway
+    return list(packages[package_file])
+
+
+def run_scenario(scenario: Dict) -> Dict:
+    """Run a single scenario to completion and summarise it as a result row"""
+    result = {field: None for field in RESULT_FIELDS}
+    result.update({key: value for key, value in scenario.items() if key in result})
+
+    settings = {key: scenario[key] for key in MANAGER_SETTINGS if key in scenario}
+    if isinstance(settings.get("start_time"), str):
+        settings["start_time"] = convert_deadline(settings["start_time"])
+
+    started = process_time()
+    reset_event_counts()
+    delivery_manager = None
+    try:
+        local_search = get_local_search(scenario.get("local_search", "swap"), neighbors=scenario.get("neighbors"))
+        delivery_manager = DeliveryManager(_package_data(scenario.get("package_file")),
+                                           _shared["distance_matrix"], _shared["address_index"],
+                                           local_search=local_search, **settings)
+        # Record the settings actually used, including defaults the scenario left out
+        result["truck_fleet_size"] = delivery_manager.truck_fleet_size
+        result["driver_crew_size"] = delivery_manager.driver_crew_size
+        result["start_time"] = convert_seconds_to_hhmmss(delivery_manager.time)
+        if delivery_manager.trucks:
+            result["truck_speed"] = delivery_manager.trucks[0].speed_in_mph
+            result["truck_capacity"] = delivery_manager.trucks[0].max_capacity
+        result["local_search"] = local_search.name
+        delivery_manager.start(event_driven=scenario.get("event_driven", True))
+    except Exception as e:
+        result["error"] = str(e)
+
+    if delivery_manager is not None:
+        packages = delivery_manager.packages.values()
+        result["miles"] = round(delivery_manager.total_miles_travelled, 4)
+        result["late_packages"] = sum(1 for pkg in packages if pkg.delivered_at_time is not None
+                                      and pkg.deadline != EOD_IN_SECONDS and pkg.delivered_at_time > pkg.deadline)
+        result["undelivered_packages"] = sum(1 for pkg in packages if pkg.delivered_at_time is None)
+        result["finish_seconds"] = delivery_manager.time
+        result["finish_time"] = convert_seconds_to_hhmmss(delivery_manager.time)
+    result["cpu_seconds"] = round(process_time() - started, 4)
+    # Deliveries, departures, special routes, ... counted even though they weren't logged
+    result["events"] = json.dumps(event_count_report())
+    return result
+
+
+class ResultWriter:
+    """Append result rows to a CSV or JSONL file (picked by extension), flushing after each row"""
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.jsonl = output_path.endswith(".jsonl") or output_path.endswith(".json")
+        self._file = open(output_path, mode='w', newline='', encoding='utf-8')
+        self._writer = None
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._writer.writeheader()
+
+    def write(self, result: Dict):
+        if self.jsonl:
+            self._file.write(json.dumps(result) + "\n")
+        else:
+            self._writer.writerow(result)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def run_batch(scenarios_path: str, output_path: str, workers: int = None, data_dir: str = None) -> int:
+    """
+    Run every scenario in the file across a process pool.
+    The distance and location data are loaded once here (from the network cache) and shipped to each worker once.
+    data_dir: read the data files from here (e.g. a generated dataset) instead of the bundled ones.
+    Returns the number of scenarios run.
+    """
+    scenarios = load_scenarios(scenarios_path)
+    address_index, distance_matrix = load_network(data_file_path(DISTANCE_FILE_NAME, data_dir),
+                                                  data_file_path(LOCATION_FILE_NAME, data_dir))
+    if data_dir is not None:
+        for scenario in scenarios:
+            scenario.setdefault("package_file", data_file_path(PACKAGE_FILE_NAME, data_dir))
+    logger.info(f"Running {len(scenarios)} scenarios, writing results to {output_path}")
+
+    with ResultWriter(output_path) as writer, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(distance_matrix, address_index)) as pool:
+        futures = [pool.submit(run_scenario, scenario) for scenario in scenarios]
+        for completed, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            writer.write(result)
+            logger.info(f"[{completed}/{len(scenarios)}] {result['name']}: {result['miles']} miles, "
+                        f"{result['late_packages']} late, finished {result['finish_time']}")
+    return len(scenarios)
@@ -4,3 +4,10 @@ START_TIME = 28800 # 8:00:00 AM in seconds
 SPECIAL_UPDATE_TIME = 37200 # 10:20:00 AM in seconds
 FLIGHT_ARRIVAL_TIME = 32700  # 9:05:00 AM in seconds
 EOD_IN_SECONDS = 86400
+
+# Special notes in the package file, as written by the WGUPS dispatch team
+DELAYED_FLIGHT_NOTE = "Delayed on flight---will not arrive to depot until 9:05 am"
+TRUCK_ONLY_NOTE = "Can only be on truck {truck_id}"
+BUNDLE_NOTE = "Must be delivered with {package_ids}"
+WRONG_ADDRESS_NOTE = "Wrong address listed"
+REVISED_ADDRESS = "410 S State St, Salt Lake City, UT 84111"  # Package 9's corrected address, known at 10:20
@@ -0,0 +1,124 @@
+from itertools import chain
+from typing import List, Sequence, Tuple
+
+from wgups.core.delivery_truck import AVG_SPEED
+from wgups.data_structures.distance_matrix import DistanceMatrix
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, see BatchRouteEvaluator
+    numpy = None
+
+INFINITY = float('inf')
+# Below this many stops per batch, NumPy's fixed per-call cost outweighs the vectorized loop
+MIN_NUMPY_STOPS = 512
+
+
+class BatchRouteEvaluator:
+    """
+    Scores a whole batch of candidate routes in one call.
+
+    Each candidate is a sequence of location indices (into the DistanceMatrix) driven in order
+    from a common start location and start time, with one deadline per stop (inf for EOD).
+    For every candidate we return the miles driven (optionally including the return leg to
+    the start) and whether any stop is reached after its deadline.
+
+    With NumPy installed, the batch is padded into an index array, legs are gathered from the
+    distance matrix in one fancy-indexing step and arrival times come from a row-wise cumulative
+    sum, so the per-candidate Python overhead disappears. The matrix is viewed in place through
+    the buffer protocol (array or memory-mapped cache), not copied.
+    Without NumPy, or for batches under min_numpy_stops stops in total, the same arithmetic
+    runs as plain Python loops.
+
+    Both paths add the same floats in the same order as RouteEvaluation and
+    DeliveryManager.route_meets_deadlines (start time first, then each leg's travel time),
+    so their answers are identical, not just close.
+    """
+    def __init__(self, distance_matrix: DistanceMatrix, use_numpy: bool = None,
+                 min_numpy_stops: int = MIN_NUMPY_STOPS):
+        self.distance_matrix = distance_matrix
+        self.min_numpy_stops = min_numpy_stops
+        if use_numpy and numpy is None:
+            raise ImportError("NumPy is not installed. Install it with `pip install numpy` (or wgups[numpy]).")
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self._matrix = None
+
+    @property
+    def matrix(self):
+        """The distance matrix as an n x n NumPy array, sharing memory with the DistanceMatrix"""
+        if self._matrix is None:
+            data = self.distance_matrix._data
+            self._matrix = numpy.frombuffer(data, dtype=numpy.dtype(data.typecode if hasattr(data, "typecode")
+                                                                    else data.format))
+            self._matrix = self._matrix.reshape(self.distance_matrix.size, self.distance_matrix.size)
+        return self._matrix
+
+    def evaluate(self, orderings: Sequence[Sequence[int]], deadlines: Sequence[Sequence[float]], start_index: int,
+                 start_time: float, speed_in_mph: float = AVG_SPEED,
+                 return_to_start: bool = True) -> Tuple[List[float], List[bool]]:
+        """
+        orderings[b] is candidate b's stops in order, deadlines[b] the matching deadlines.
+        Returns (miles, late): miles[b] is the distance driven, late[b] is True if any stop
+        of candidate b is reached after its deadline.
+        """
+        if not orderings:
+            return [], []
+        if self.use_numpy and sum(map(len, orderings)) >= self.min_numpy_stops:
+            return self._evaluate_numpy(orderings, deadlines, start_index, start_time, speed_in_mph, return_to_start)
+        return self._evaluate_python(orderings, deadlines, start_index, start_time, speed_in_mph, return_to_start)
+
+    def _evaluate_python(self, orderings, deadlines, start_index, start_time, speed_in_mph, return_to_start):
+        distance = self.distance_matrix.distance
+        all_miles, all_late = [], []
+        for stops, stop_deadlines in zip(orderings, deadlines):
+            miles = 0.0
+            current_time = start_time
+            previous = start_index
+            late = False
+            for location, deadline in zip(stops, stop_deadlines):
+                leg = distance(previous, location)
+                miles = miles + leg
+                current_time = current_time + (leg / speed_in_mph) * 3600.0
+                if current_time > deadline:
+                    late = True
+                previous = location
+            if return_to_start and stops:
+                miles = miles + distance(previous, start_index)
+            all_miles.append(miles)
+            all_late.append(late)
+        return all_miles, all_late
+
+    def _evaluate_numpy(self, orderings, deadlines, start_index, start_time, speed_in_mph, return_to_start):
+        batch = len(orderings)
+        lengths = numpy.fromiter(map(len, orderings), dtype=numpy.intp, count=batch)
+        total = int(lengths.sum())
+        flat_stops = numpy.fromiter(chain.from_iterable(orderings), dtype=numpy.intp, count=total)
+        flat_deadlines = numpy.fromiter(chain.from_iterable(deadlines), dtype=numpy.float64, count=total)
+        width = max(1, int(lengths.max()))
+
+        # Lay the candidates out as rows. Column 0 is the start. Short candidates are padded by
+        # repeating their last stop, which adds zero-length legs that can't be late.
+        row_starts = numpy.cumsum(lengths) - lengths
+        columns = numpy.arange(width)
+        in_route = columns < lengths[:, None]
+        gather = row_starts[:, None] + numpy.minimum(columns, numpy.maximum(lengths - 1, 0)[:, None])
+        stops = numpy.full((batch, width + 1), start_index, dtype=numpy.intp)
+        if total:
+            non_empty = lengths > 0
+            stops[non_empty, 1:] = flat_stops[gather[non_empty]]
+        stop_deadlines = numpy.full((batch, width), INFINITY)
+        stop_deadlines[in_route] = flat_deadlines
+
+        legs = self.matrix[stops[:, :-1], stops[:, 1:]].astype(numpy.float64)
+
+        # Same association as the Python loop: ((start + t1) + t2) + ..., and (d1 + d2) + ...
+        travel_times = numpy.empty((batch, width + 1))
+        travel_times[:, 0] = start_time
+        travel_times[:, 1:] = (legs / speed_in_mph) * 3600.0
+        arrivals = numpy.cumsum(travel_times, axis=1)[:, 1:]
+        late = (arrivals > stop_deadlines).any(axis=1)
+
+        miles = numpy.cumsum(legs, axis=1)[:, -1]
+        if return_to_start:
+            miles = miles + numpy.where(lengths > 0, self.matrix[stops[:, -1], start_index], 0.0)
+        return miles.tolist(), late.tolist()
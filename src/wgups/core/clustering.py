@@ -0,0 +1,115 @@
+from logging import getLogger
+from typing import Dict, Iterable, List
+
+from wgups.data_structures.distance_matrix import DistanceMatrix
+
+logger = getLogger(__name__)
+
+INFINITY = float('inf')
+# Voronoi iterations after the initial medoids are picked. Each one can only lower the total distance.
+MAX_ITERATIONS = 20
+
+
+class RegionClustering:
+    """
+    Partitions the day's delivery locations into regions, using k-medoids over the distance matrix.
+
+    The distance data only has road miles between locations, no coordinates, so there is no
+    angle to sweep by. Instead each region is represented by one of its own locations (its
+    medoid), and every location belongs to the region whose medoid is closest:
+
+      - BUILD: medoids are added one at a time, each time picking the location that most
+        lowers the total distance from every location to its nearest medoid.
+      - Voronoi iteration: assign every location to its nearest medoid, move each medoid to
+        the member with the smallest total distance to the other members, and repeat until
+        the medoids stop moving.
+
+    Both steps are deterministic (ties go to the lower location index), so the same day
+    always gets the same regions. Locations that weren't clustered, e.g. a package's revised
+    address, belong to the region of their nearest medoid.
+    """
+    def __init__(self, distance_matrix: DistanceMatrix, regions: int, max_iterations: int = MAX_ITERATIONS):
+        if regions < 1:
+            raise ValueError(f"Need at least one region, got {regions}")
+        self.distance_matrix = distance_matrix
+        self.regions = regions
+        self.max_iterations = max_iterations
+        self.medoids: List[int] = []
+        # Location index -> region index
+        self.region_of_location: Dict[int, int] = {}
+
+    def fit(self, locations: Iterable[int]) -> "RegionClustering":
+        """Cluster these location indices. Returns self."""
+        points = sorted(set(locations))
+        self.region_of_location = {}
+        if not points:
+            self.medoids = []
+            return self
+
+        self.medoids = self._build(points)
+        for _ in range(self.max_iterations):
+            members = self._assign(points)
+            medoids = [self._medoid(region_members) if region_members else medoid
+                       for region_members, medoid in zip(members, self.medoids)]
+            if medoids == self.medoids:
+                break
+            self.medoids = medoids
+
+        for region, region_members in enumerate(self._assign(points)):
+            for location in region_members:
+                self.region_of_location[location] = region
+        logger.info("Clustered %s locations into %s regions", len(points), len(self.medoids))
+        return self
+
+    def _build(self, points: List[int]) -> List[int]:
+        """Greedy initial medoids: each one lowers the total distance to the nearest medoid the most"""
+        distance = self.distance_matrix.distance
+        nearest = [INFINITY] * len(points)
+        medoids = []
+        for _ in range(min(self.regions, len(points))):
+            best, best_cost = None, INFINITY
+            for candidate in points:
+                if candidate in medoids:
+                    continue
+                cost = 0.0
+                for i, point in enumerate(points):
+                    cost += min(nearest[i], distance(candidate, point))
+                if cost < best_cost:
+                    best, best_cost = candidate, cost
+            medoids.append(best)
+            nearest = [min(nearest[i], distance(best, point)) for i, point in enumerate(points)]
+        return medoids
+
+    def _nearest_region(self, location: int) -> int:
+        distance = self.distance_matrix.distance
+        best_region, best_distance = 0, INFINITY
+        for region, medoid in enumerate(self.medoids):
+            d = distance(location, medoid)
+            if d < best_distance:
+                best_region, best_distance = region, d
+        return best_region
+
+    def _assign(self, points: List[int]) -> List[List[int]]:
+        members = [[] for _ in self.medoids]
+        for location in points:
+            members[self._nearest_region(location)].append(location)
+        return members
+
+    def _medoid(self, members: List[int]) -> int:
+        """The member with the smallest total distance to the others"""
+        distance = self.distance_matrix.distance
+        best, best_cost = None, INFINITY
+        for candidate in members:
+            cost = 0.0
+            for member in members:
+                cost += distance(candidate, member)
+            if cost < best_cost:
+                best, best_cost = candidate, cost
+        return best
+
+    def region_of(self, location: int) -> int:
+        """The region of a location index, or None before anything was clustered"""
+        region = self.region_of_location.get(location)
+        if region is None and self.medoids:
+            region = self.region_of_location[location] = self._nearest_region(location)
+        return region
@@ -1,38 +1,102 @@
+import re
+from contextlib import nullcontext
 from copy import copy
 from logging import getLogger
-from typing import List, Dict
-from collections import OrderedDict
+from typing import Iterable, List, Dict, Set, Union
 
 from wgups.constants import TRUCK_FLEET_SIZE, DRIVER_CREW_SIZE, START_TIME, SPECIAL_UPDATE_TIME, FLIGHT_ARRIVAL_TIME, \
-    EOD_IN_SECONDS
-from wgups.core.delivery_truck import DeliveryTruck, TruckStatus
+    EOD_IN_SECONDS, DELAYED_FLIGHT_NOTE, TRUCK_ONLY_NOTE, BUNDLE_NOTE, REVISED_ADDRESS
+from wgups.core.batch_evaluator import BatchRouteEvaluator
+from wgups.core.clustering import RegionClustering
+from wgups.core.fleet_planner import FleetPlanner, Trip
+from wgups.core.delivery_truck import DeliveryTruck, TruckStatus, AVG_SPEED, MAX_CAPACITY
 from wgups.core.package import PackageStatus, Package
+from wgups.core.local_search import LocalSearch, get_local_search
+from wgups.core.route_evaluation import RouteEvaluation, INFINITY
 from wgups.core.special_route import SpecialRoute
-from wgups.utils import get_distance
+from wgups.data_structures.address_index import AddressIndex
+from wgups.data_structures.avl_tree import AVLTree, deadline_key
+from wgups.data_structures.distance_matrix import DistanceMatrix
 from wgups.data_structures.min_heap import MinHeap
 from wgups.data_structures.hash_table import PackageHashTable
+from wgups.event_log import EventLog, EventLogTee, ReplayState
+from wgups.history import SimulationHistory
+from wgups.ingest import package_from_row
+from wgups.log_pipeline import count_event, ITEM_ACCEPTED, TRUCK_DEPARTED, SPECIAL_UPDATE
+from wgups.profiling import Profiler, DELIVERY_MANAGER_PHASES, DELIVERY_TRUCK_PHASES, DISTANCE_MATRIX_PHASES
+from wgups.utils import convert_seconds_to_hhmmss
 
 logger = getLogger(__name__)
 
+# Special notes that take a value, e.g. "Can only be on truck 2" or "Must be delivered with 13, 15"
+TRUCK_ONLY_PATTERN = re.compile(re.escape(TRUCK_ONLY_NOTE).replace(r"\{truck_id\}", r"(\d+)"))
+BUNDLE_PATTERN = re.compile(re.escape(BUNDLE_NOTE).replace(r"\{package_ids\}", r"(\d+(?:\s*,\s*\d+)*)"))
+
 
 class DeliveryManager:
 
-    def __init__(self, package_data: List[Dict], distance_data: List[Dict], location_data: List[Dict]):
+    def __init__(self, package_data: Iterable[Union[Dict, Package]], distance_data: Union[DistanceMatrix, List[Dict]],
+                 location_data: Union[AddressIndex, List[Dict]], local_search: LocalSearch = None,
+                 truck_fleet_size: int = TRUCK_FLEET_SIZE, driver_crew_size: int = DRIVER_CREW_SIZE,
+                 start_time: int = START_TIME, truck_speed: float = AVG_SPEED, truck_capacity: int = MAX_CAPACITY,
+                 batch_evaluator: BatchRouteEvaluator = None, profiler: Profiler = None,
+                 event_log: EventLog = None, snapshot_interval: int = None, regions: int = None,
+                 plan_ahead: bool = False):
         self.package_data = package_data
-        self.distance_data = distance_data
         self.location_data = location_data
 
+        # Address -> location index, built once. Accept raw CSV rows for backwards compatibility.
+        if isinstance(location_data, AddressIndex):
+            self.address_index = location_data
+        else:
+            self.address_index = AddressIndex(location_data)
+
+        # Per-run settings. Defaults come from wgups.constants and delivery_truck,
+        # and can be overridden to run what-if scenarios side by side.
+        self.truck_fleet_size = truck_fleet_size
+        self.driver_crew_size = driver_crew_size
+        self.truck_speed = truck_speed
+        self.truck_capacity = truck_capacity
+
+        # Route improvement engine used by optimize_route_order. Defaults to pairwise swaps.
+        self.local_search = local_search if local_search is not None else get_local_search()
+
+        # Indexed distance matrix, built once. Accept raw CSV rows for backwards compatibility.
+        if isinstance(distance_data, DistanceMatrix):
+            self.distance_matrix = distance_data
+        else:
+            self.distance_matrix = DistanceMatrix(distance_data)
+
+        # Scores many candidate routes per call, with NumPy when it's installed
+        self.batch_evaluator = batch_evaluator if batch_evaluator is not None \
+            else BatchRouteEvaluator(self.distance_matrix)
+
         # Our custom PackageHashTable
         self.packages = PackageHashTable(initial_capacity=50)
         self.trucks = []
 
-        # Create a fleet of trucks
-        for i in range(min(TRUCK_FLEET_SIZE, DRIVER_CREW_SIZE)):
-            self.trucks.append(DeliveryTruck(truck_id=i + 1, distance_data=self.distance_data))
+        # Create a fleet of trucks: one per driver, or the whole fleet when planning ahead (see FleetPlanner)
+        for i in range(self.truck_fleet_size if plan_ahead else min(self.truck_fleet_size, self.driver_crew_size)):
+            self.trucks.append(DeliveryTruck(truck_id=i + 1, distance_matrix=self.distance_matrix,
+                                             speed_in_mph=truck_speed, max_capacity=truck_capacity))
 
         self.total_packages = 0
         self.default_tick_speed = None
-        self.time = START_TIME
+        self.time = start_time
+
+        # Event-driven mode: trucks at the hub need a routing pass on the next second.
+        # True at start of day, and again whenever a truck docks.
+        self.routing_pending = True
+
+        # Timed events of the day, earliest first. Each runs once, on the first tick at or after its
+        # time: a tick longer than a second, or a late start_time, can step past the exact second.
+        self._timed_events = [(FLIGHT_ARRIVAL_TIME, self.flight_arrival), (SPECIAL_UPDATE_TIME, self.special_update)]
+
+        # Every departure so far, as wgups.core.fleet_planner.Trip records
+        self.departures: List[Trip] = []
+        # The day's schedule when planning ahead (see FleetPlanner), and the trips not sent out yet
+        self.plan: List[Trip] = None
+        self._pending_trips: List[Trip] = []
 
         # NEW: Dictionary that tracks which trucks each package can ride
         # Example structure: { package_id: {1, 2}, ... }
@@ -42,8 +106,74 @@ class DeliveryManager:
         # Example: [ {"10","11","12"}, {"15","16"}, ... ]
         self.bundles: List[Set[str]] = []
 
+        # Hub dispatch queue: an indexed MinHeap of the items at the hub (bundles and single packages),
+        # ordered by _dispatch_order. Built for the first routing pass, then patched by package_changed
+        # when a package arrives at or leaves the hub, or a hub package's deadline changes.
+        self._dispatch_queue: MinHeap = None
+        # Item ID (a bundle's index in self.bundles, or a package ID) -> the item's key in the queue
+        self._queued_keys: Dict[Union[int, str], tuple] = {}
+        # Package ID -> index in self.bundles, for the packages that ride in a bundle
+        self._bundle_of: Dict[str, int] = {}
+        # The queue's items in order, as the last routing pass got them. None once anything at the hub changed.
+        self._dispatch_items = None
+        # Trucks the last routing pass in tick() ran for. With the same trucks at the hub and the
+        # same dispatch queue, the last pass loaded nothing and another one would load nothing too.
+        self._routed_trucks = None
+
+        # Deadline indexes, keyed by (deadline, package ID) and kept current by package_changed:
+        # the packages at the hub, and every package not delivered yet
+        self.hub_deadlines = AVLTree()
+        self.pending_deadlines = AVLTree()
+
         self.initialize_packages()
 
+        # Optional clustering pre-pass: split the day's delivery locations into `regions` regions,
+        # and have each truck fill up from one region first (see run_route_algorithm)
+        self.clustering = None
+        if regions:
+            self.clustering = RegionClustering(self.distance_matrix, regions).fit(
+                self._destination_index(pkg) for pkg in self.packages.values())
+
+        # Per-phase timing. Without a profiler nothing is instrumented, so there is no overhead.
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self, *DELIVERY_MANAGER_PHASES)
+            profiler.instrument(self.distance_matrix, *DISTANCE_MATRIX_PHASES)
+            for truck in self.trucks:
+                profiler.instrument(truck, *DELIVERY_TRUCK_PHASES)
+
+        # With a snapshot_interval (e.g. wgups.history.SNAPSHOT_INTERVAL), every state change is recorded
+        # in the in-memory history behind state_at. Off by default: only runs that ask for past states
+        # pay for it. Every state change also goes to the event_log file if one is given (see wgups.event_log)
+        self.history = SimulationHistory(snapshot_interval) if snapshot_interval else None
+        event_logs = [log for log in (self.history, event_log) if log is not None]
+        for log in event_logs:
+            log.attach(self)
+        self.event_log = event_logs[0] if len(event_logs) == 1 else EventLogTee(*event_logs) if event_logs else None
+        for truck in self.trucks:
+            truck.event_log = self.event_log
+
+        # A day that starts late has already seen the events before start_time
+        self._run_timed_events()
+
+        if plan_ahead:
+            self.plan = FleetPlanner(self).plan()
+            self._pending_trips = list(self.plan)
+
+    def use_whole_fleet(self):
+        """
+        Have a truck for every truck in the fleet, not just one per driver.
+        tick() still sends out at most driver_crew_size trucks at a time.
+        Call it before the day starts: the history and event log only know the trucks they started with.
+        """
+        for i in range(len(self.trucks), self.truck_fleet_size):
+            truck = DeliveryTruck(truck_id=i + 1, distance_matrix=self.distance_matrix,
+                                  speed_in_mph=self.truck_speed, max_capacity=self.truck_capacity)
+            truck.event_log = self.event_log
+            if self.profiler is not None:
+                self.profiler.instrument(truck, *DELIVERY_TRUCK_PHASES)
+            self.trucks.append(truck)
+
     # --------------------------
     # Existing Properties
     # --------------------------
@@ -61,16 +191,23 @@ class DeliveryManager:
 
     @property
     def packages_at_hub(self):
-        return [package for package in self.packages.values() if package.status == PackageStatus.AT_HUB]
+        return self.packages.lookup_by_status(PackageStatus.AT_HUB)
 
     @property
     def packages_at_hub_sorted(self):
-        packages_unsorted = [p for p in self.packages.values() if p.status == PackageStatus.AT_HUB]
-        return sorted(packages_unsorted, key=lambda pkg: pkg.deadline)
+        return self.hub_deadlines.in_order_traversal()
+
+    def packages_due_before(self, time: int) -> List[Package]:
+        """Packages not delivered yet that are due before `time`, earliest deadline first"""
+        return self.pending_deadlines.range(None, time)
+
+    @property
+    def packages_overdue(self):
+        return self.packages_due_before(self.time)
 
     @property
     def packages_unavailable(self):
-        return [package for package in self.packages.values() if package.status == PackageStatus.UNAVAILABLE]
+        return self.packages.lookup_by_status(PackageStatus.UNAVAILABLE)
 
     @property
     def packages_on_trucks(self):
@@ -86,8 +223,30 @@ class DeliveryManager:
             packages.extend(truck.packages_delivered)
         return packages
 
+    @property
+    def total_miles_travelled(self):
+        return sum(truck.total_miles_travelled for truck in self.trucks)
+
+    def local_search_report(self) -> Dict:
+        """Fleet mileage next to the CPU time spent improving routes, for comparing local searches"""
+        report = self.local_search.report()
+        report["fleet_miles"] = self.total_miles_travelled
+        return report
+
+    def state_at(self, time: int) -> ReplayState:
+        """
+        Package and truck state at the end of simulated second `time`, rebuilt from the
+        history's snapshots and events. The live simulation isn't touched, so `time`
+        has to be one the simulation has already reached.
+        """
+        if self.history is None:
+            raise ValueError("No history is kept for this simulation (snapshot_interval=None)")
+        if time > self.time:
+            raise ValueError(f"The simulation has only reached {convert_seconds_to_hhmmss(self.time)}")
+        return self.history.state_at(time)
+
     def all_packages_delivered(self):
-        return all(pkg.status == PackageStatus.DELIVERED for pkg in self.packages.values())
+        return self.packages.all_have_status(PackageStatus.DELIVERED)
 
     # --------------------------
     # Main Simulation Loop
@@ -97,38 +256,63 @@ class DeliveryManager:
             seconds = self.default_tick_speed
         self.time += seconds
 
-        if self.time == SPECIAL_UPDATE_TIME:
-            self.special_update()
+        self._run_timed_events()
 
-        if self.time == FLIGHT_ARRIVAL_TIME:
-            logger.info("Flight has arrived — making delayed packages available.")
-            for pkg in self.packages_unavailable:
-                if pkg.package_ID == "9":
-                    continue
-                pkg.status = PackageStatus.AT_HUB
-
-        # Run route assignment whenever a truck is free at the hub
-        if any(t.status == TruckStatus.AT_HUB for t in self.trucks):
-            self.run_route_algorithm(self.trucks_at_hub)
+        if self.plan is not None:
+            # Follow the day's plan instead of routing
+            self._dispatch_planned_trips()
+        else:
+            # Run route assignment whenever a truck and a driver are free at the hub,
+            # unless nothing changed since the last pass
+            trucks_at_hub = self.trucks_at_hub
+            free_drivers = self.driver_crew_size - (len(self.trucks) - len(trucks_at_hub))
+            if trucks_at_hub and free_drivers > 0 and \
+                    (self._dispatch_items is None or trucks_at_hub != self._routed_trucks):
+                self.run_route_algorithm(trucks_at_hub, max_departures=free_drivers)
+                self._routed_trucks = trucks_at_hub
 
         # Update each truck
         for truck in self.trucks:
             truck.update(self.time, seconds=seconds)
 
-        if self.time == EOD_IN_SECONDS:
+        if self.time >= EOD_IN_SECONDS:
             raise Exception("Reached midnight! Stopping simulation.")
 
-    def start(self):
+    def _run_timed_events(self):
+        """Run every timed event of the day that is due and hasn't run yet, earliest first"""
+        while self._timed_events and self._timed_events[0][0] <= self.time:
+            _, event = self._timed_events.pop(0)
+            event()
+
+    def flight_arrival(self):
+        logger.info("Flight has arrived — making delayed packages available.")
+        for pkg in self.packages_unavailable:
+            if pkg.package_ID == "9":
+                continue
+            pkg.status = PackageStatus.AT_HUB
+            if self.event_log is not None:
+                self.event_log.record("available", package=pkg, location=pkg.destination_index)
+
+    def start(self, event_driven=False):
+        """
+        Run the simulation until all packages are delivered.
+
+        event_driven=False ticks one simulated second at a time.
+        event_driven=True jumps straight to the next second where something can happen
+        (see advance_to_next_event), producing the same delivery times and mileage.
+        """
         max_seconds = 24 * 3600  # 24 hours in seconds
         start_time = self.time
-        
-        while True:
-            if self.all_packages_delivered():
-                break
-            if self.time - start_time > max_seconds:
-                logger.warning("Simulation exceeded maximum time limit of 24 hours")
-                break
-            self.tick()
+        step = self.advance_to_next_event if event_driven else self.tick
+
+        with self.profiler.session() if self.profiler is not None else nullcontext():
+            while True:
+                if self.all_packages_delivered():
+                    break
+                if self.time - start_time > max_seconds:
+                    logger.warning("Simulation exceeded maximum time limit of 24 hours")
+                    break
+                step()
 
         # Logging final time
         hours = self.time // 3600
@@ -136,14 +320,66 @@ class DeliveryManager:
         seconds = self.time % 60
         logger.info(f"Simulation complete. Time: {hours}:{minutes}:{seconds}")
         logger.info(f"All packages delivered.")
+        if self.profiler is not None:
+            self.profiler.log_summary()
 
     def pause(self):
         pass
 
+    # --------------------------
+    # Discrete-event simulation
+    # --------------------------
+    def next_event_time(self):
+        """
+        The next simulated second at which tick() can change anything:
+          - a truck reaches the end of its current leg (delivery or docking)
+          - a truck is waiting at the hub for a routing pass
+          - the delayed flight arrives
+          - the special address update happens
+          - midnight
+        Between these seconds, trucks at the hub would only re-run a routing pass that
+        can't succeed (nothing new arrived and deadlines only get harder to meet),
+        and moving trucks just travel.
+        """
+        if self.routing_pending and self.trucks_at_hub:
+            return self.time + 1
+
+        candidates = [EOD_IN_SECONDS]
+        candidates.extend(trip.departure for trip in self._pending_trips if trip.departure > self.time)
+        candidates.extend(event_time for event_time, _ in self._timed_events)
+        for truck in self.trucks:
+            ticks = truck.ticks_until_next_stop()
+            if ticks is not None:
+                candidates.append(self.time + ticks)
+        return min(candidates)
+
+    def advance_to_next_event(self):
+        """
+        Skip straight to the next event and run a single tick() there.
+        Uses 1 second tick resolution regardless of default_tick_speed.
+        """
+        next_time = max(self.time + 1, self.next_event_time())
+        skipped = next_time - self.time - 1
+        if skipped > 0:
+            for truck in self.trucks:
+                truck.coast(skipped)
+            self.time += skipped
+
+        returning_before = [truck.status == TruckStatus.RETURNING for truck in self.trucks]
+        default_tick_speed, self.default_tick_speed = self.default_tick_speed, None
+        try:
+            self.tick()
+        finally:
+            self.default_tick_speed = default_tick_speed
+
+        # Any truck that docked this second gets its routing pass on the next one
+        self.routing_pending = any(was_returning and truck.status == TruckStatus.AT_HUB
+                                   for was_returning, truck in zip(returning_before, self.trucks))
+
     # --------------------------
     # Modified Route Algorithm
     # --------------------------
-    def run_route_algorithm(self, trucks_to_assign_routes):
+    def run_route_algorithm(self, trucks_to_assign_routes, max_departures: int = None):
         """
         Assign packages to each truck at the hub, respecting:
           - Truck constraints
@@ -152,13 +388,34 @@ class DeliveryManager:
           - Attempts to minimize driving distance,
         and ensures we add as many feasible items as possible
         before the truck departs.
+        At most max_departures trucks (one per free driver) are sent out, if given.
         """
         # 1) Group all hub packages into bundle "items," respecting bundles
         available_items = self._get_available_items_as_bundles()
 
+        # Regions already taken by a truck in this pass
+        claimed_regions = set()
+
+        departed = 0
         for truck in trucks_to_assign_routes:
+            if max_departures is not None and departed >= max_departures:
+                break
             current_location = truck.point_a  # The hub location
             manifest = []
+            # With clustering, the truck first considers only the items that have a deadline, then
+            # adds the items in its region, and then considers everything. Each stage starts once
+            # nothing more from the previous one fits.
+            region = self._choose_region(available_items, truck, claimed_regions) if self.clustering else None
+            if region is not None:
+                claimed_regions.add(region)
+            stages = self._candidate_stages(available_items, region)
+            candidates = next(stages)
+            # Cached arrival times / distances for the manifest built so far
+            route = self.evaluate_route([], truck)
+            # Feasibility results for the route as it stands, by item. Each one depends on the whole
+            # manifest, so they only last until the next item is accepted. They are reused when the
+            # same route is scanned again, after a truck's region runs out of items that fit.
+            feasibility_cache = {}
             max_iterations = 1000  # Add a reasonable limit
             iterations = 0
 
@@ -176,9 +433,12 @@ class DeliveryManager:
                     break
                 
                 if len(manifest) >= truck.available_capacity:
-                    logger.info(f"Truck {truck.truck_id} is at capacity: {len(manifest)} items.")
+                    logger.info("Truck %s is at capacity: %s items.", truck.truck_id, len(manifest))
                     break
-                if not available_items:
+                if not candidates:
+                    if candidates is not available_items:
+                        candidates = next(stages)
+                        continue
                     #logger.info(f"No more available items for Truck {truck.truck_id}.")
                     break
 
@@ -186,26 +446,27 @@ class DeliveryManager:
                 best_score = float('inf')
                 best_idx = -1
 
+                # Whether each remaining item can simply be appended to the route, in one batch
+                appendable = self._items_appendable(route, candidates, truck)
+
                 # Try each remaining item to see if it can fit
-                for idx, item in enumerate(available_items):
+                for idx, item in enumerate(candidates):
                     # Check truck constraint
                     if not self._truck_can_carry_item(item, truck):
                         continue
+                    # A bundle has to fit in the space left on the truck
+                    if len(manifest) + len(item) > truck.available_capacity:
+                        continue
 
-                    # Try appending this item to a *temp* manifest
-                    test_manifest = manifest + item
-                    # Then do a quick route optimization
-                    test_manifest_optimized = self.optimize_route_order(test_manifest, truck)
-
-                    # Check if the new route meets all deadlines
-                    if self.route_meets_deadlines(test_manifest_optimized, truck):
+                    # Check if appending this item, then optimizing the route, meets all deadlines
+                    if self._candidate_meets_deadlines(route, item, truck, feasibility_cache, appendable[idx]):
                         # If feasible, compute a priority score.
                         # You can do distance from current_location or
                         # recalculate total route distance, etc.
                         # We'll just do the distance from the last known location
                         # to the first package in 'item' as a quick tie-breaker.
                         distance_to_item = self._calculate_bundle_distance(current_location, item)
-                        priority_score = self._compute_priority_score(item, distance_to_item)
+                        priority_score = self._compute_priority_score(item, distance_to_item, region)
 
                         if priority_score < best_score:
                             best_score = priority_score
@@ -213,76 +474,238 @@ class DeliveryManager:
                             best_idx = idx
 
                 if best_item is None:
+                    if candidates is not available_items:
+                        # Nothing more fits from this stage: widen to the next one
+                        candidates = next(stages)
+                        continue
                     # Means we couldn't feasibly add *any* item
                     #logger.info(f"Cannot add more items to Truck {truck.truck_id} without violating constraints.")
                     break
                 else:
                     # Actually add the best_item to the manifest for real
                     manifest += best_item
+                    route.append(best_item)
+                    feasibility_cache.clear()
                     current_location = best_item[0].destination  # simple approach
-                    logger.info(
-                        f"Truck {truck.truck_id} accepted item (size={len(best_item)}) with best score={best_score}.")
-                    available_items.pop(best_idx)
+                    count_event(ITEM_ACCEPTED)
+                    logger.info("Truck %s accepted item (size=%s) with best score=%s.",
+                                truck.truck_id, len(best_item), best_score)
+                    candidates.pop(best_idx)
+                    if candidates is not available_items:
+                        available_items.remove(best_item)
 
             # 3) Final route optimization
             optimized_manifest = self.optimize_route_order(manifest, truck)
 
             # 4) Load them onto the truck & send it out (only if we have something)
             if optimized_manifest:
-                truck.load(optimized_manifest)
-                logger.info(f"Truck {truck.truck_id} loaded {len(optimized_manifest)} packages and is departing.")
-                truck.start_route()
+                self._depart(truck, optimized_manifest)
+                departed += 1
             else:
                 #logger.info(f"Truck {truck.truck_id} found no items to load this round.")
                 pass
 
-    # -- HELPER: Convert all AT_HUB packages into "items," respecting bundles
+    def _depart(self, truck: DeliveryTruck, manifest: List[Package]):
+        """Load a manifest onto a truck at the hub and send it out"""
+        truck.load(manifest)
+        count_event(TRUCK_DEPARTED)
+        logger.info("Truck %s loaded %s packages and is departing.", truck.truck_id, len(manifest))
+        trip = 1 + sum(1 for departure in self.departures if departure.truck == truck.truck_id)
+        self.departures.append(Trip(truck.truck_id, trip, self.time, tuple(pkg.package_ID for pkg in manifest)))
+        truck.start_route()
+
+    def _dispatch_planned_trips(self):
+        """
+        Send out every planned trip that is due, once its truck is at the hub.
+        The plan was made by running this same day, so a planned package that isn't at the hub
+        means the day has gone off plan: that raises rather than leaving the package behind.
+        """
+        for trip in [trip for trip in self._pending_trips if trip.departure <= self.time]:
+            truck = self.trucks[trip.truck - 1]
+            if truck.status != TruckStatus.AT_HUB:
+                continue
+            self._pending_trips.remove(trip)
+            manifest = []
+            for package_id in trip.packages:
+                package = self.packages.lookup_by_id(package_id)
+                if package is None or package.status != PackageStatus.AT_HUB:
+                    raise Exception(f"Planned package {package_id} isn't at the hub for truck {truck.truck_id} "
+                                    f"trip {trip.trip}: the day is off plan")
+                manifest.append(package)
+            self._depart(truck, manifest)
+
+    # -- HELPER: Feasibility of a candidate item for the greedy insertion loop
+    def _candidate_meets_deadlines(self, route: RouteEvaluation, item: List[Package], truck: DeliveryTruck,
+                                   cache: Dict, appendable: bool = None) -> bool:
+        """
+        Same answer as route_meets_deadlines(optimize_route_order(manifest + item)),
+        without optimizing the candidate route.
+
+        optimize_route_order only ever accepts moves that meet all deadlines, so the optimized
+        route meets deadlines exactly when either
+          - manifest + item already meets them (checked in O(len(item)) from the cached route), or
+          - the local search's first pass finds a feasible, shorter move.
+        The second check is the expensive one, so its result is kept in `cache`, by item, for
+        as long as the caller's route doesn't change.
+        `appendable` is the first check when it was already done for a batch of items.
+        """
+        if appendable is None:
+            appendable = route.meets_deadlines_with(item)
+        if appendable:
+            return True
+
+        key = tuple(id(pkg) for pkg in item)
+        feasible = cache.get(key)
+        if feasible is None:
+            candidate = self.evaluate_route(route.manifest + item, truck)
+            feasible = len(candidate.manifest) > 2 and self.local_search.has_improving_move(candidate)
+            cache[key] = feasible
+        return feasible
+
+    # -- HELPER: route.meets_deadlines_with(item) for every item at once
+    def _items_appendable(self, route: RouteEvaluation, items: List[List[Package]],
+                          truck: DeliveryTruck) -> List[bool]:
+        if not route.meets_deadlines:
+            return [False] * len(items)
+        _, late = self.batch_evaluator.evaluate(
+            [[route._location_index(pkg) for pkg in item] for item in items],
+            [[route.routing_deadline(pkg, route._location_index(pkg)) for pkg in item] for item in items],
+            route.locations[-1], route.arrivals[-1], truck.speed_in_mph, return_to_start=False)
+        return [not item_is_late for item_is_late in late]
+
+    # -- HELPER: The hub dispatch queue, listed again only when it changed
     def _get_available_items_as_bundles(self) -> List[List[Package]]:
         """
-        Gathers packages at the hub, groups any that share a bundle,
-        and returns a list of list-of-Packages sorted by deadline.
+        The packages at the hub as a list of list-of-Packages sorted by deadline.
         (Each sub-list is a 'bundle item' or a single un-bundled package.)
+        Returns a fresh list each time, since the routing pass takes items off it.
+        """
+        if self._dispatch_queue is None:
+            self._dispatch_queue = self._build_dispatch_queue()
+        if self._dispatch_items is None:
+            self._dispatch_items = list(self._dispatch_queue.in_order())
+        return list(self._dispatch_items)
+
+    def package_changed(self, package: Package, attribute: str, old_value, new_value):
+        """
+        Called by a Package when a watched attribute changes. Keeps the deadline indexes and the
+        dispatch queue current.
         """
-        # All packages currently at hub, sorted by deadline and package ID
-        at_hub = sorted([p for p in self.packages_at_hub], 
-                       key=lambda p: (p.deadline, p.package_ID))
-
-        # Bucket by package_id for quick lookups using OrderedDict
-        pkg_map = OrderedDict()
-        for p in at_hub:
-            pkg_map[p.package_ID] = p
-
-        # Create a min-heap to sort items by deadline
-        heap = MinHeap()
-        used_ids = set()
-
-        # First handle bundles, sorted by earliest deadline in bundle
-        # Only process bundles that have packages at the hub
-        valid_bundles = []
-        for bundle in self.bundles:
-            hub_packages = [pkg_map[pid] for pid in bundle if pid in pkg_map]
-            if hub_packages:  # Only include bundles that have packages at the hub
-                valid_bundles.append((min(p.deadline for p in hub_packages), bundle, hub_packages))
-
-        # Sort bundles by earliest deadline
-        for _, bundle, hub_packages in sorted(valid_bundles, key=lambda x: (x[0], x[1])):
-            # Sort packages within the bundle by deadline and package ID
-            sorted_packages = sorted(hub_packages, key=lambda p: (p.deadline, p.package_ID))
-            heap.push(sorted_packages)
-            used_ids.update([p.package_ID for p in sorted_packages])
-
-        # Now handle any package NOT in a declared bundle or not used yet
-        for p in at_hub:
-            if p.package_ID not in used_ids:
-                # This package stands alone
-                heap.push([p])
-
-        # Extract items from heap in order of deadline
-        sorted_items = []
-        while len(heap) > 0:
-            sorted_items.append(heap.pop())
-
-        return sorted_items
+        if attribute == "status":
+            if old_value == PackageStatus.AT_HUB:
+                self.hub_deadlines.delete(package)
+                self._requeue(package)
+            elif new_value == PackageStatus.AT_HUB:
+                self.hub_deadlines.insert(package)
+                self._requeue(package)
+            if new_value == PackageStatus.DELIVERED:
+                self.pending_deadlines.delete(package)
+            elif old_value == PackageStatus.DELIVERED:
+                self.pending_deadlines.insert(package)
+        elif attribute == "deadline":
+            if package.status == PackageStatus.AT_HUB:
+                self.hub_deadlines.delete(package, old_value)
+                self.hub_deadlines.insert(package)
+                self._requeue(package)
+            if package.status != PackageStatus.DELIVERED:
+                self.pending_deadlines.delete(package, old_value)
+                self.pending_deadlines.insert(package)
+        elif attribute == "destination" and package.status == PackageStatus.AT_HUB:
+            # The queue's order doesn't depend on addresses, but the last routing pass did
+            self._dispatch_items = None
+
+    # -- HELPER: Convert all AT_HUB packages into "items," respecting bundles
+    def _build_dispatch_queue(self) -> MinHeap:
+        """
+        Gathers packages at the hub, groups any that share a bundle,
+        and returns them as a MinHeap of list-of-Packages in _dispatch_order.
+        """
+        self._bundle_of = {pid: index for index, bundle in enumerate(self.bundles) for pid in bundle}
+        self._queued_keys = {}
+        items = {}
+        # All packages currently at hub, sorted by deadline and package ID, so each item is too
+        for package in self.hub_deadlines.in_order_traversal():
+            items.setdefault(self._item_id(package), []).append(package)
+        queue = MinHeap.heapify(list(items.values()), [self._dispatch_order(item) for item in items.values()])
+        for item_id, item in items.items():
+            self._queued_keys[item_id] = tuple(pkg.package_ID for pkg in item)
+        return queue
+
+    def _item_id(self, package: Package) -> Union[int, str]:
+        """The bundle a package rides in, or its own ID if it rides alone"""
+        bundle = self._bundle_of.get(package.package_ID)
+        return package.package_ID if bundle is None else bundle
+
+    @staticmethod
+    def _dispatch_order(item: List[Package]):
+        """
+        Where an item goes in the dispatch queue: the deadline of its first (most urgent) package,
+        then the higher package ID first. No package is in two items, so this is a total order, and
+        the queue lists the same items in the same order however it was patched.
+        Higher IDs first is how the heap used to break most deadline ties, and the greedy pass keeps
+        the first of equally scored items, so the loads, and every deadline on the bundled day, depend on it.
+        """
+        first = item[0]
+        return first.deadline, -int(first.package_ID)
+
+    def _requeue(self, package: Package):
+        """Patch the item holding `package` in the dispatch queue, after it arrived at, left, or changed at the hub"""
+        if self._dispatch_queue is None:
+            return
+        self._dispatch_items = None
+        item_id = self._item_id(package)
+        if item_id == package.package_ID:
+            members = [package]
+        else:
+            members = [self.packages.get(pid) for pid in self.bundles[item_id]]
+        item = sorted((pkg for pkg in members if pkg is not None and pkg.status == PackageStatus.AT_HUB),
+                      key=deadline_key)
+        key = tuple(pkg.package_ID for pkg in item)
+        old_key = self._queued_keys.get(item_id)
+        if old_key == key:
+            # Same packages in the same order: only the item's place in the queue can have changed
+            self._dispatch_queue.update(key, self._dispatch_order(item))
+            return
+        if old_key is not None:
+            self._dispatch_queue.remove(old_key)
+            del self._queued_keys[item_id]
+        if item:
+            self._queued_keys[item_id] = self._dispatch_queue.push(item, self._dispatch_order(item))
+
+    # -- HELPER: Regions, when clustering is on
+    def _item_region(self, item: List[Package]) -> int:
+        return self.clustering.region_of(self._destination_index(item[0]))
+
+    def _choose_region(self, items: List[List[Package]], truck: DeliveryTruck, claimed: Set[int]):
+        """
+        The region a truck fills up from: the one with the most packages this truck can carry,
+        preferring regions no other truck has taken in this pass. None if it can carry nothing.
+        """
+        counts = {}
+        for item in items:
+            if self._truck_can_carry_item(item, truck):
+                region = self._item_region(item)
+                counts[region] = counts.get(region, 0) + len(item)
+        if not counts:
+            return None
+        unclaimed = [region for region in counts if region not in claimed] or list(counts)
+        return max(sorted(unclaimed), key=lambda region: counts[region])
+
+    def _candidate_stages(self, items: List[List[Package]], region: int):
+        """
+        The candidate lists a truck working `region` goes through: the items with a deadline, so
+        those never wait on regions; then those plus the items headed for the region; then every
+        item (`items` itself). Without a region, just every item. Each list is built when it's
+        reached, from what's left of `items` by then.
+        """
+        if region is not None:
+            yield [item for item in items if self._item_has_deadline(item)]
+            yield [item for item in items if self._item_has_deadline(item) or self._item_region(item) == region]
+        yield items
+
+    @staticmethod
+    def _item_has_deadline(item: List[Package]) -> bool:
+        return any(pkg.deadline != EOD_IN_SECONDS for pkg in item)
 
     # -- HELPER: Check if truck can carry all packages in an item
     def _truck_can_carry_item(self, item: List[Package], truck: DeliveryTruck) -> bool:
@@ -292,7 +715,7 @@ class DeliveryManager:
         """
         for pkg in item:
             # If no entry in truck_constraints, assume it can ride any truck
-            allowed_trucks = self.truck_constraints.get(pkg.package_ID, set(range(1, TRUCK_FLEET_SIZE + 1)))
+            allowed_trucks = self.truck_constraints.get(pkg.package_ID, set(range(1, self.truck_fleet_size + 1)))
             if truck.truck_id not in allowed_trucks:
                 return False
         return True
@@ -304,17 +727,16 @@ class DeliveryManager:
         (or you could average addresses if you wanted).
         """
         first_pkg = item[0]
-        return get_distance(self.distance_data, current_location, first_pkg.destination)
+        return self.distance_matrix.between(current_location, first_pkg.destination)
 
     # -- HELPER: Compute your priority score for the entire item (bundle)
-    def _compute_priority_score(self, item: List[Package], distance_to_item: float) -> float:
+    def _compute_priority_score(self, item: List[Package], distance_to_item: float, region: int = None) -> float:
         """
-        Adapt your existing scoring to handle multiple packages.
-        For example, sum up cluster effects or pick the earliest deadline, etc.
-        Below is a minimal example that sums a few factors.
+        Score an item (bundle) for the greedy insertion loop. Lower is better.
+        Sums the distance to the item, how urgent its earliest deadline is, and a cluster
+        bonus: one per extra package in a bundle, and with clustering, one per package headed
+        for the truck's region.
         """
-        # For cluster score, you might check how close these packages are to each other
-        # or how many are near them at the hub. Below is a trivial example.
 
         # Example: We just take the earliest deadline among the item
         # and treat that as the item's "deadline urgency."
@@ -324,9 +746,12 @@ class DeliveryManager:
         else:
             time_urgency = max(1, earliest_deadline - self.time)
 
-        # (Optional) compute a simple cluster score for these packages
-        # For example, how many are in the same general area:
-        cluster_score = len(item) - 1  # trivial approach: more packages = better cluster
+        # Packages that ride together
+        cluster_score = len(item) - 1
+        if region is not None:
+            # Packages headed for the region the truck is working
+            cluster_score += sum(1 for pkg in item
+                                 if self.clustering.region_of(self._destination_index(pkg)) == region)
 
         # Weighted priority, similar to your original logic:
         # Use round() to avoid floating point imprecision
@@ -375,53 +800,93 @@ class DeliveryManager:
     def optimize_route_order(self, manifest, truck):
         """
         Optimize the order of packages in a truck's manifest while respecting deadlines.
-        Uses a simple 2-opt approach. Make sure you do NOT rearrange packages
+        The moves tried are up to self.local_search (pairwise swaps by default, or 2-opt / Or-opt).
+        Make sure you do NOT rearrange packages
         in a way that breaks any 'must-deliver-together' rule
         if that rule implies they arrive at the same time.
+
+        Each candidate move is scored incrementally by a RouteEvaluation, which caches
+        prefix arrival times and distances, so we never copy the manifest or re-walk
+        the whole route to test a move. With clustering, packages that already missed their
+        deadline are then moved ahead of the EOD packages (see _missed_deadlines_first).
         """
-        if len(manifest) <= 2:
-            return manifest
+        if len(manifest) > 2:
+            route = self.evaluate_route(manifest.copy(), truck)
+            self.local_search.optimize(route)
+            manifest = route.manifest
+        if self.clustering is not None:
+            manifest = self._missed_deadlines_first(manifest, truck)
+        return manifest
+
+    def evaluate_route(self, manifest, truck) -> RouteEvaluation:
+        """
+        Build a cached RouteEvaluation for a manifest, starting from the truck's
+        current location at the current simulation time.
+        """
+        return RouteEvaluation(manifest, truck.point_a, self.time, truck.speed_in_mph, self.distance_matrix,
+                               route_missed_deadlines=self.clustering is not None)
 
-        best_manifest = manifest.copy()
-        best_distance = self.calculate_route_distance(best_manifest, truck)
-        improved = True
-        max_iterations = 100  # Add a reasonable limit
-        iterations = 0
-
-        while improved and iterations < max_iterations:
-            improved = False
-            iterations += 1
-            # Sort the range of indices to ensure deterministic order
-            indices = sorted(range(1, len(best_manifest) - 2))
-            for i in indices:
-                for j in sorted(range(i + 1, len(best_manifest))):
-                    new_manifest = best_manifest.copy()
-                    # Swap two packages
-                    new_manifest[i], new_manifest[j] = new_manifest[j], new_manifest[i]
-
-                    # Check if new route meets deadlines
-                    if self.route_meets_deadlines(new_manifest, truck):
-                        new_distance = self.calculate_route_distance(new_manifest, truck)
-                        # Use a small epsilon for floating point comparison
-                        if new_distance < best_distance - 1e-10:
-                            best_manifest = new_manifest
-                            best_distance = new_distance
-                            improved = True
-
-        if iterations >= max_iterations:
-            logger.warning(f"Route optimization exceeded maximum iterations ({max_iterations})")
-        return best_manifest
+    def evaluate_manifests(self, manifests, truck):
+        """
+        calculate_route_distance and route_meets_deadlines for many manifests in one call,
+        all starting from the truck's current location at the current simulation time.
+        Returns (distances, meets_deadlines), two lists in manifest order.
+        """
+        start_index = self.distance_matrix.index_of(truck.point_a)
+        distances, late = self.batch_evaluator.evaluate(
+            [[self._destination_index(pkg) for pkg in manifest] for manifest in manifests],
+            [[self._routing_deadline(pkg, truck) for pkg in manifest] for manifest in manifests],
+            start_index, self.time, truck.speed_in_mph)
+        return distances, [not manifest_is_late for manifest_is_late in late]
+
+    def _destination_index(self, package):
+        if package.destination_index is not None:
+            return package.destination_index
+        return self.distance_matrix.index_of(package.destination)
+
+    def _routing_deadline(self, package, truck) -> float:
+        """
+        The deadline a route from the truck's position now is held to for a package: none for EOD,
+        and with clustering, none when driving straight there would already be late
+        (see RouteEvaluation.routing_deadline)
+        """
+        if package.deadline == EOD_IN_SECONDS or self._missed_deadline(package, truck):
+            return INFINITY
+        return package.deadline
+
+    def _missed_deadline(self, package, truck) -> bool:
+        """With clustering: the package would be late even if the truck drove straight to it now"""
+        if self.clustering is None or package.deadline == EOD_IN_SECONDS:
+            return False
+        direct_arrival = self.time + self._calculate_travel_time(
+            self.distance_matrix.between(truck.point_a, package.destination), truck)
+        return direct_arrival > package.deadline
+
+    def _missed_deadlines_first(self, manifest, truck):
+        """
+        The manifest with every package that has already missed its deadline moved ahead of the EOD
+        packages before it, so late packages aren't left for the end of the trip. Packages with a
+        deadline keep their order. Returns the manifest unchanged if the new order would miss a
+        deadline the original met.
+        """
+        missed = [index for index, pkg in enumerate(manifest) if self._missed_deadline(pkg, truck)]
+        if not missed:
+            return manifest
+        head = manifest[:missed[-1] + 1]
+        reordered = ([pkg for pkg in head if pkg.deadline != EOD_IN_SECONDS]
+                     + [pkg for pkg in head if pkg.deadline == EOD_IN_SECONDS] + manifest[missed[-1] + 1:])
+        return reordered if self.route_meets_deadlines(reordered, truck) else manifest
 
     def route_meets_deadlines(self, manifest, truck):
         current_time = self.time
         current_location = truck.point_a
 
         for package in manifest:
-            distance = get_distance(self.distance_data, current_location, package.destination)
+            distance = self.distance_matrix.between(current_location, package.destination)
             travel_time_sec = self._calculate_travel_time(distance, truck)
             delivery_time = current_time + travel_time_sec
 
-            if package.deadline != EOD_IN_SECONDS and delivery_time > package.deadline:
+            if delivery_time > self._routing_deadline(package, truck):
                 return False
 
             current_time = delivery_time
@@ -432,29 +897,30 @@ class DeliveryManager:
     def calculate_route_distance(self, manifest, truck):
         if not manifest:
             return 0.0
-        total_distance = get_distance(self.distance_data, truck.point_a, manifest[0].destination)
+        total_distance = self.distance_matrix.between(truck.point_a, manifest[0].destination)
         for i in range(len(manifest) - 1):
-            total_distance += get_distance(self.distance_data,
-                                           manifest[i].destination,
-                                           manifest[i + 1].destination)
+            total_distance += self.distance_matrix.between(manifest[i].destination,
+                                                           manifest[i + 1].destination)
         # Return to hub
-        total_distance += get_distance(self.distance_data, manifest[-1].destination, truck.point_a)
+        total_distance += self.distance_matrix.between(manifest[-1].destination, truck.point_a)
         return total_distance
 
     # --------------------------
     # Initialize packages + constraints
     # --------------------------
     def initialize_packages(self):
+        # package_data is either ingested CSV rows, or ready-made Packages (e.g. wgups.ingest.stream_packages)
         for data in self.package_data:
-            destination = self.lookup_location(data['full_address'])
-            package = Package(
-                package_ID=data['Package ID'],
-                destination=destination,
-                deadline_in_hhmmss=data['Delivery Deadline'],
-                weight=data['Mass'],
-                notes=data['Special Notes']
-            )
+            if isinstance(data, Package):
+                package = data
+            else:
+                package = package_from_row(data, self.address_index, self.distance_matrix)
             self.packages.insert(package.package_ID, package)
+            package.add_watcher(self)
+            if package.status == PackageStatus.AT_HUB:
+                self.hub_deadlines.insert(package)
+            if package.status != PackageStatus.DELIVERED:
+                self.pending_deadlines.insert(package)
 
         logger.info(f"Added {len(self.packages.values())} packages to global system.")
         self.total_packages = len(self.packages.values())
@@ -462,34 +928,65 @@ class DeliveryManager:
         # Here's how to handle your special notes differently:
         # Instead of physically loading them on a truck, just record constraints or bundles.
         packages_with_notes = [p for p in self.packages.values() if p.notes]
+        linked_packages = []
         for pkg in packages_with_notes:
             match pkg.notes:
-                case 'Can only be on truck 2':
+                case notes if (truck_only := TRUCK_ONLY_PATTERN.fullmatch(notes)):
                     # Record this constraint
-                    self.truck_constraints[pkg.package_ID] = {2}
+                    self.truck_constraints[pkg.package_ID] = {int(truck_only.group(1))}
 
-                case 'Delayed on flight---will not arrive to depot until 9:05 am':
-                    pkg.status = PackageStatus.UNAVAILABLE
+                case notes if notes == DELAYED_FLIGHT_NOTE:
+                    # A planning run's copies can already be unavailable
+                    if pkg.status is not PackageStatus.UNAVAILABLE:
+                        pkg.status = PackageStatus.UNAVAILABLE
 
-                # Example of a bundling note:
+                # Bundling note, e.g. "Must be delivered with 13, 15"
+                case notes if (bundle := BUNDLE_PATTERN.fullmatch(notes)):
+                    linked_packages.append({pkg.package_ID, *(pid.strip() for pid in bundle.group(1).split(","))})
 
-        self.bundles.append({"13", "14", "15", "16", "19", "20"})
+        # Packages linked through any chain of notes ride together
+        self.bundles.extend(self._merge_bundles(linked_packages))
 
-        self.packages.lookup_by_id("9").status = PackageStatus.UNAVAILABLE
+        package_9 = self.packages.lookup_by_id("9")
+        if package_9.status is not PackageStatus.UNAVAILABLE:
+            package_9.status = PackageStatus.UNAVAILABLE
 
         logger.info("Finished reading special notes.")
 
+    @staticmethod
+    def _merge_bundles(linked_packages: List[Set[str]]) -> List[Set[str]]:
+        """Merge overlapping groups of package IDs into disjoint bundles"""
+        bundles = []
+        for group in linked_packages:
+            merged = set(group)
+            remaining = []
+            for bundle in bundles:
+                if bundle & merged:
+                    merged |= bundle
+                else:
+                    remaining.append(bundle)
+            bundles = remaining + [merged]
+        return bundles
+
+    def set_destination(self, package: Package, location: str):
+        """Re-address a package, keeping its cached distance matrix index in step"""
+        package.destination = location
+        package.destination_index = self.distance_matrix.index_of(location)
+        if self.event_log is not None:
+            self.event_log.record("update", package=package, location=package.destination_index)
+
     def lookup_location(self, search_text) -> str:
-        for row in self.location_data:
-            if search_text in row['PackageText']:
-                return row['Location']
-        raise (Exception(f"Location {search_text} not found"))
+        location = self.address_index.lookup(search_text)
+        if location is None:
+            raise (Exception(f"Location {search_text} not found"))
+        return location
 
     def special_update(self):
         # Update package 9 with revised address
-        revised_address = "410 S State St, Salt Lake City, UT 84111"
+        revised_address = REVISED_ADDRESS
+        count_event(SPECIAL_UPDATE)
         logger.info("\n\n")
-        logger.warning(f"Special update!! Updating package 9 with revised address: {revised_address}")
+        logger.info("Special update!! Updating package 9 with revised address: %s", revised_address)
 
         package_9 = [package for package in self.packages.values() if package.package_ID == "9"][0]
 
@@ -497,13 +994,13 @@ class DeliveryManager:
             # if package 9 is delivered, go get it and redeliver
             case PackageStatus.DELIVERED:
                 # find truck nearest to package 9
-                logger.warning("\n\nPackage 9 has already been delivered. Will need to pick up and redeliver.")
+                logger.info("\n\nPackage 9 has already been delivered. Will need to pick up and redeliver.")
                 logger.info("Finding nearest truck to package 9")
 
                 nearest_truck = None
                 nearest_distance = float('inf')
                 for truck in self.trucks:
-                    distance = get_distance(self.distance_data, truck.point_b, package_9.destination)
+                    distance = self.distance_matrix.between(truck.point_b, package_9.destination)
                     if distance < nearest_distance:
                         nearest_truck = truck
                         nearest_distance = distance
@@ -513,7 +1010,7 @@ class DeliveryManager:
                 route_to_package_9.truck_id = nearest_truck.truck_id
                 nearest_truck.packages_on_truck.insert(1, route_to_package_9)
                 # Update original package 9's destination
-                package_9.destination = self.lookup_location(revised_address)
+                self.set_destination(package_9, self.lookup_location(revised_address))
                 package_9.note_on_delivery = "Delivered to wrong address initially"
                 # delivers package 9, continues route
                 package_9_copy = copy(package_9)
@@ -523,17 +1020,17 @@ class DeliveryManager:
             # if package 9 is on truck, update the destination
             case PackageStatus.ON_TRUCK:
                 logger.info(f"Package 9 is on truck {package_9.truck_id}.")
-                logger.warning("Revising routing, but may cause delay")
-                package_9.destination = self.lookup_location(revised_address)
+                logger.info("Revising routing, but may cause delay")
+                self.set_destination(package_9, self.lookup_location(revised_address))
                 logger.info(f"Package 9 destination updated to {revised_address}")
             case PackageStatus.AT_HUB:
                 logger.info(f"Package 9 is at hub. Updating destination.")
-                package_9.destination = self.lookup_location(revised_address)
+                self.set_destination(package_9, self.lookup_location(revised_address))
                 logger.info(f"Package 9 destination updated to {revised_address}")
             case PackageStatus.IN_TRANSIT:
                 logger.info(f"Package 9 is in transit on truck {package_9.truck_id}.")
                 logger.info("Revising routing, but may cause delay.")
-                package_9.destination = self.lookup_location(revised_address)
+                self.set_destination(package_9, self.lookup_location(revised_address))
                 logger.info(f"Package 9 destination updated to {revised_address}")
             case PackageStatus.NEXT_STOP:
                 logger.info(f"Package 9 is next stop")
@@ -542,14 +1039,16 @@ class DeliveryManager:
                 # so that the truck will deliver the revised package 9
                 package_9_copy = Package(package_9.package_ID, package_9.destination, package_9.deadline_in_hhmmss,
                                          package_9.weight, package_9.notes)
-                package_9_copy.destination = self.lookup_location(revised_address)
+                self.set_destination(package_9_copy, self.lookup_location(revised_address))
                 package_9_copy.note_on_delivery = "Delivered after correction!"
                 self.trucks[package_9.truck_id - 1].load([package_9_copy])
             case PackageStatus.UNAVAILABLE:
                 logger.info(f"Package 9 is unavailable.")
                 logger.info("Revising route..")
-                package_9.destination = self.lookup_location(revised_address)
+                self.set_destination(package_9, self.lookup_location(revised_address))
                 package_9.status = PackageStatus.AT_HUB
+                if self.event_log is not None:
+                    self.event_log.record("available", package=package_9, location=package_9.destination_index)
         logger.info(f"Package 9 updated... resuming route! \n\n")
 
 
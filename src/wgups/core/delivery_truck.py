@@ -1,9 +1,11 @@
+import math
+import sys
 from enum import Enum
 from logging import getLogger
-from typing import List, Dict
 
 from wgups.core.package import PackageStatus
-from wgups.utils import get_distance
+from wgups.data_structures.distance_matrix import DistanceMatrix
+from wgups.log_pipeline import count_event, ROUTE_STARTED, RETURNED_TO_HUB
 
 MAX_CAPACITY = 16  # packages
 AVG_SPEED = 18  # MPH
@@ -12,6 +14,49 @@ START_LOCATION = "Western Governors University 4001 South 700 East, Salt Lake Ci
 logger = getLogger(__name__)
 
 
+def _repeat_step(value: float, step: float, count: int, stop_at_zero: bool = False):
+    """
+    What `count` rounds of `value += step` leave in value, computed exactly as the float loop would,
+    stopping early once value <= 0 if stop_at_zero. Returns (value, steps taken).
+
+    Between two powers of two every float is a multiple of the same unit, so every step of the
+    loop adds the same rounded amount there, and a whole run of steps is one integer multiply.
+    The step that crosses a power of two, or one whose rounding is a tie, is taken as a plain
+    float addition, so there are only a few dozen float steps per call, however large count is.
+    """
+    numerator, denominator = step.as_integer_ratio()
+    step_shift = denominator.bit_length() - 1  # step == numerator / 2 ** step_shift
+    taken = 0
+    while taken < count and not (stop_at_zero and value <= 0.0):
+        run = 0
+        if value >= sys.float_info.min:
+            mantissa, exponent = math.frexp(value)
+            scaled = int(mantissa * 2 ** 53)  # value == scaled * 2 ** (exponent - 53), 2**52 <= scaled < 2**53
+            # The step in units of value's last place, rounded to the nearest unit
+            shift = step_shift + exponent - 53
+            if shift <= 0:
+                rounded_step, tie = numerator << -shift, False
+            else:
+                rounded_step = (numerator + (1 << (shift - 1))) >> shift
+                tie = numerator & ((1 << shift) - 1) == 1 << (shift - 1)
+            if not tie:
+                if rounded_step > 0:
+                    run = (2 ** 53 - 1 - scaled) // rounded_step
+                elif rounded_step < 0:
+                    run = (scaled - 1 - 2 ** 52) // -rounded_step
+                else:
+                    # The step is too small to change value
+                    return value, count
+                run = min(run, count - taken)
+        if run > 0:
+            value = math.ldexp(scaled + run * rounded_step, exponent - 53)
+            taken += run
+        else:
+            value += step
+            taken += 1
+    return value, taken
+
+
 class DeliveryTruck:
 
     """"
@@ -23,11 +68,12 @@ class DeliveryTruck:
     Routing algorithm is done by the DeliveryManager, which creates the manifest for each truck.
     """
 
-    def __init__(self, truck_id: int, distance_data: List[Dict]):
+    def __init__(self, truck_id: int, distance_matrix: DistanceMatrix, speed_in_mph: float = AVG_SPEED,
+                 max_capacity: int = MAX_CAPACITY):
         self.truck_id = truck_id
-        self.distance_data = distance_data
-        self.max_capacity = MAX_CAPACITY
-        self.speed_in_mph = AVG_SPEED
+        self.distance_matrix = distance_matrix
+        self.max_capacity = max_capacity
+        self.speed_in_mph = speed_in_mph
 
         self.distance_to_next_location_in_miles = 0.0
         self.point_a = START_LOCATION
@@ -41,6 +87,9 @@ class DeliveryTruck:
 
         self.status = TruckStatus.AT_HUB
 
+        # Optional wgups.event_log.EventLog, set by the DeliveryManager, that records each state change
+        self.event_log = None
+
     @property
     def available_capacity(self):
         return self.max_capacity - len(self.packages_on_truck)
@@ -51,6 +100,9 @@ class DeliveryTruck:
                 self.packages_on_truck.append(package)
                 package.status = PackageStatus.ON_TRUCK
                 package.truck_id = self.truck_id
+                if self.event_log is not None:
+                    self.event_log.record("load", self, package,
+                                          self.distance_matrix.index_of(package.destination))
             else:
                 logger.error(f"Truck {self.truck_id} is at capacity. Cannot load package {package.package_ID}")
                 raise Exception(f"Truck {self.truck_id} is at capacity. Cannot load package {package.package_ID}")
@@ -61,6 +113,8 @@ class DeliveryTruck:
         self.packages_delivered.append(pkg)
 
         pkg.delivered(delivery_time)
+        if self.event_log is not None:
+            self.event_log.record("deliver", self, pkg, self.distance_matrix.index_of(pkg.destination))
         #logger.info(f"Truck {self.truck_id} delivered package {pkg.package_ID} at {pkg.destination}")
 
         self.point_a = pkg.destination
@@ -76,13 +130,18 @@ class DeliveryTruck:
         self.point_a = START_LOCATION
         self.point_b = None
         self.status = TruckStatus.AT_HUB
+        if self.event_log is not None:
+            self.event_log.record("dock", self, location=self.distance_matrix.index_of(START_LOCATION))
 
 
     def return_to_hub(self):
-        logger.info(f"Truck {self.truck_id} is returning to hub")
+        count_event(RETURNED_TO_HUB)
+        logger.info("Truck %s is returning to hub", self.truck_id)
         self.point_b = START_LOCATION
-        self.distance_to_next_location_in_miles = get_distance(self.distance_data, self.point_a, self.point_b)
+        self.distance_to_next_location_in_miles = self.distance_matrix.between(self.point_a, self.point_b)
         self.status = TruckStatus.RETURNING
+        if self.event_log is not None:
+            self.event_log.record("return", self, location=self.distance_matrix.index_of(START_LOCATION))
 
 
     def start_route(self):
@@ -90,19 +149,62 @@ class DeliveryTruck:
         if self.packages_on_truck is None or len(self.packages_on_truck) == 0:
             #logger.warning(f"Truck {self.truck_id} has no packages to deliver")
             return
-        logger.info(f"Truck {self.truck_id} is starting route to {self.packages_on_truck[0].destination} for package {self.packages_on_truck[0].package_ID}")
+        count_event(ROUTE_STARTED)
+        logger.info("Truck %s is starting route to %s for package %s",
+                    self.truck_id, self.packages_on_truck[0].destination, self.packages_on_truck[0].package_ID)
         self.status = TruckStatus.EN_ROUTE
         self.point_b = self.packages_on_truck[0].destination
-        self.distance_to_next_location_in_miles = get_distance(self.distance_data, self.point_a, self.point_b)
+        self.distance_to_next_location_in_miles = self.distance_matrix.between(self.point_a, self.point_b)
         self.packages_on_truck[0].status = PackageStatus.NEXT_STOP
+        # Only packages loaded since the last departure change; the rest are already in transit
         for package in self.packages_on_truck[1:]:
-            package.status = PackageStatus.IN_TRANSIT
+            if package.status is PackageStatus.ON_TRUCK:
+                package.status = PackageStatus.IN_TRANSIT
+        if self.event_log is not None:
+            self.event_log.record("depart", self, self.packages_on_truck[0],
+                                  self.distance_matrix.index_of(self.point_b))
+
+    @property
+    def is_moving(self):
+        return self.status == TruckStatus.EN_ROUTE or self.status == TruckStatus.RETURNING
+
+    def miles_per_tick(self, seconds=1):
+        tick_rate_in_hours = seconds / 3600  # convert seconds to hours
+        return float(float(self.speed_in_mph) * tick_rate_in_hours)
+
+    def ticks_until_next_stop(self, seconds=1):
+        """
+        Number of update() calls of `seconds` each until the truck reaches the end of its current leg.
+        Solved against the exact floating point arithmetic of update() (see _repeat_step), so the
+        event-driven simulation lands on the same second as the tick loop would.
+        Returns None if the truck is not moving.
+        """
+        if not self.is_moving:
+            return None
+        miles_travelled = self.miles_per_tick(seconds)
+        if miles_travelled <= 0.0:
+            return None
+        _, ticks = _repeat_step(self.distance_to_next_location_in_miles, -miles_travelled, sys.maxsize,
+                                stop_at_zero=True)
+        return ticks
+
+    def coast(self, ticks, seconds=1):
+        """
+        Apply `ticks` updates worth of travel without reaching the next stop.
+        Used by the event-driven simulation to skip over seconds where nothing happens.
+        The caller is responsible for not coasting past ticks_until_next_stop() - 1.
+        """
+        if not self.is_moving or ticks <= 0:
+            return
+        miles_travelled = self.miles_per_tick(seconds)
+        self.distance_to_next_location_in_miles, _ = _repeat_step(self.distance_to_next_location_in_miles,
+                                                                  -miles_travelled, ticks)
+        self.total_miles_travelled, _ = _repeat_step(self.total_miles_travelled, miles_travelled, ticks)
 
     # tick rate is in seconds
     def update(self, current_time, seconds=1):
-        tick_rate_in_hours = seconds / 3600  # convert seconds to hours
         if self.status == TruckStatus.EN_ROUTE:
-            miles_travelled = float(float(self.speed_in_mph) * tick_rate_in_hours)
+            miles_travelled = self.miles_per_tick(seconds)
             self.distance_to_next_location_in_miles -= miles_travelled
             self.total_miles_travelled += miles_travelled
             if self.distance_to_next_location_in_miles <= 0.0:
@@ -112,7 +214,7 @@ class DeliveryTruck:
             #logger.info(f"Truck {self.truck_id} is loaded with {len(self.packages_on_truck)} packages")
             return
         elif self.status == TruckStatus.RETURNING:
-            miles_travelled = float(float(self.speed_in_mph) * tick_rate_in_hours)
+            miles_travelled = self.miles_per_tick(seconds)
             self.distance_to_next_location_in_miles -= miles_travelled
             self.total_miles_travelled += miles_travelled
             if self.distance_to_next_location_in_miles <= 0.0:
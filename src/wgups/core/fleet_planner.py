@@ -0,0 +1,83 @@
+from copy import copy
+from logging import getLogger
+from typing import List, NamedTuple, Tuple
+
+from wgups.core.local_search import get_local_search
+from wgups.core.package import PackageStatus
+from wgups.log_pipeline import separate_run
+from wgups.utils import convert_seconds_to_hhmmss
+
+logger = getLogger(__name__)
+
+
+class Trip(NamedTuple):
+    """One departure from the hub: a truck, its n-th trip of the day, when it leaves and what it carries"""
+    truck: int
+    trip: int
+    departure: int  # Seconds after midnight
+    packages: Tuple[str, ...]  # Package IDs, in delivery order
+
+
+class FleetPlanner:
+    """
+    Works out the whole day's schedule before the first tick: for every trip, the truck, the
+    departure time and the ordered manifest.
+
+    It isn't a separate scheduler. It runs this same dispatcher once, event driven, on copies of
+    the packages, and records every departure. Each trip is decided the way the reactive run
+    would decide it, with only what is known at that second; nothing is planned around the
+    delayed flight or the drivers' shifts in advance. What it adds is that the schedule is known,
+    and can be checked and logged, before the day starts. The live simulation then executes it
+    (DeliveryManager(plan_ahead=True)): it loads each trip at its departure second and never runs
+    a routing pass itself.
+
+    The planning run has a truck for every truck in the fleet, not just one per driver. At most
+    driver_crew_size trucks are out at a time, and a driver back at the hub can take any truck
+    parked there.
+    """
+    def __init__(self, delivery_manager):
+        self.delivery_manager = delivery_manager
+
+    def plan(self) -> List[Trip]:
+        """
+        The day's trips, by departure time.
+        Raises if the planning run fails (e.g. reaches midnight) or leaves any package undelivered.
+        """
+        delivery_manager = self.delivery_manager
+        # Unwatched copies, in package ID order, so the live packages are left alone
+        packages = sorted((copy(package) for package in delivery_manager.packages.values()),
+                          key=lambda package: (len(package.package_ID), package.package_ID))
+
+        # The planning run's deliveries aren't the day's deliveries: keep them out of the logs and event counts
+        try:
+            with separate_run():
+                local_search = delivery_manager.local_search
+                planning_run = type(delivery_manager)(
+                    packages, delivery_manager.distance_matrix, delivery_manager.address_index,
+                    local_search=get_local_search(local_search.name, neighbors=local_search.neighbors),
+                    truck_fleet_size=delivery_manager.truck_fleet_size,
+                    driver_crew_size=delivery_manager.driver_crew_size,
+                    start_time=delivery_manager.time, truck_speed=delivery_manager.truck_speed,
+                    truck_capacity=delivery_manager.truck_capacity, batch_evaluator=delivery_manager.batch_evaluator,
+                    regions=delivery_manager.clustering.regions if delivery_manager.clustering is not None else None)
+                planning_run.use_whole_fleet()
+                planning_run.start(event_driven=True)
+        except Exception as e:
+            raise Exception(f"The plan doesn't deliver every package: {e}") from e
+
+        undelivered = [package.package_ID for package in planning_run.packages.values()
+                       if package.status != PackageStatus.DELIVERED]
+        if undelivered:
+            raise Exception(f"The plan doesn't deliver packages {', '.join(undelivered)}")
+
+        trips = sorted(planning_run.departures, key=lambda trip: (trip.departure, trip.truck))
+        logger.info("Planned %s trips for %s trucks, %.4f miles, done at %s", len(trips),
+                    len(planning_run.trucks), planning_run.total_miles_travelled,
+                    convert_seconds_to_hhmmss(planning_run.time))
+        return trips
+
+
+def plan_summary_lines(trips: List[Trip]) -> List[str]:
+    """One line per trip"""
+    return [f"{convert_seconds_to_hhmmss(trip.departure)} truck {trip.truck} trip {trip.trip}: "
+            f"{len(trip.packages)} packages ({', '.join(trip.packages)})" for trip in trips]
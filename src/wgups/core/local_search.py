@@ -0,0 +1,206 @@
+from logging import getLogger
+from time import process_time
+from typing import Dict, Iterator, Tuple
+
+from wgups.core.route_evaluation import RouteEvaluation
+
+logger = getLogger(__name__)
+
+# Use a small epsilon for floating point comparison
+EPSILON = 1e-10
+
+
+class LocalSearch:
+    """
+    Base class for the route improvement step of the DeliveryManager.
+
+    A local search looks at "moves" on a single truck's route (swapping two stops, reversing
+    a segment, relocating a segment, ...) and applies any move that keeps every package on
+    time and shortens the route, until a full pass finds nothing better.
+
+    Moves only reorder a single truck's manifest, so truck constraints and bundles (which are
+    decided when items are assigned to a truck) always stay satisfied. Deadlines, including
+    the arrival times after the move and the return leg to the hub, are checked by the
+    RouteEvaluation for every move before it is applied.
+
+    Subclasses only decide which moves to try, by implementing `moves`.
+
+    neighbors: if set, only try moves whose new edge joins a stop to one of its k nearest
+    locations in the distance matrix. Fewer moves are evaluated, at the cost of missing some.
+    """
+    name = None
+
+    def __init__(self, neighbors: int = None, max_iterations: int = 100):
+        self.neighbors = neighbors
+        self.max_iterations = max_iterations
+        self._neighbor_sets: Dict[int, set] = {}
+
+        # Running totals for reporting
+        self.calls = 0
+        self.evaluations = 0
+        self.improvements = 0
+        self.miles_saved = 0.0
+        self.cpu_time = 0.0
+
+    def moves(self, route: RouteEvaluation) -> Iterator[Tuple]:
+        """Yield candidate moves as (kind, *args) tuples. See `evaluate` for the kinds."""
+        raise NotImplementedError
+
+    def evaluate(self, route: RouteEvaluation, move: Tuple):
+        kind, *args = move
+        if kind == "swap":
+            return route.evaluate_swap(*args)
+        if kind == "reverse":
+            return route.evaluate_reversal(*args)
+        if kind == "relocate":
+            return route.evaluate_relocation(*args)
+        raise ValueError(f"Unknown move {kind}")
+
+    def apply(self, route: RouteEvaluation, move: Tuple):
+        kind, *args = move
+        if kind == "swap":
+            route.apply_swap(*args)
+        elif kind == "reverse":
+            route.apply_reversal(*args)
+        elif kind == "relocate":
+            route.apply_relocation(*args)
+        else:
+            raise ValueError(f"Unknown move {kind}")
+
+    def is_near(self, route: RouteEvaluation, location_a: int, location_b: int) -> bool:
+        """Neighbor-list check. Always true when no neighbor restriction is set."""
+        if self.neighbors is None or location_a == location_b:
+            return True
+        near = self._neighbor_sets.get(location_a)
+        if near is None:
+            near = set(route.distance_matrix.nearest(location_a, self.neighbors))
+            self._neighbor_sets[location_a] = near
+        return location_b in near
+
+    def optimize(self, route: RouteEvaluation) -> RouteEvaluation:
+        """
+        Improve the route in place. Each pass walks every move once and applies
+        improving moves as soon as they're found.
+        """
+        started = process_time()
+        self.calls += 1
+        starting_distance = route.total_distance
+        improved = True
+        iterations = 0
+
+        while improved and iterations < self.max_iterations:
+            improved = False
+            iterations += 1
+            for move in self.moves(route):
+                self.evaluations += 1
+                meets_deadlines, new_distance = self.evaluate(route, move)
+                if meets_deadlines and new_distance < route.total_distance - EPSILON:
+                    self.apply(route, move)
+                    self.improvements += 1
+                    improved = True
+
+        if iterations >= self.max_iterations:
+            logger.warning(f"Route optimization exceeded maximum iterations ({self.max_iterations})")
+        self.miles_saved += starting_distance - route.total_distance
+        self.cpu_time += process_time() - started
+        return route
+
+    def has_improving_move(self, route: RouteEvaluation) -> bool:
+        """
+        True if the first pass of optimize() would apply at least one move.
+        Since only moves that meet all deadlines are applied, a route that misses a deadline
+        can be fixed by optimize() exactly when this is true.
+        """
+        started = process_time()
+        try:
+            for move in self.moves(route):
+                self.evaluations += 1
+                meets_deadlines, new_distance = self.evaluate(route, move)
+                if meets_deadlines and new_distance < route.total_distance - EPSILON:
+                    return True
+            return False
+        finally:
+            self.cpu_time += process_time() - started
+
+    def report(self) -> Dict:
+        return {
+            "local_search": self.name,
+            "neighbors": self.neighbors,
+            "calls": self.calls,
+            "evaluations": self.evaluations,
+            "improvements": self.improvements,
+            "miles_saved": self.miles_saved,
+            "cpu_time": self.cpu_time,
+        }
+
+
+class PairwiseSwapSearch(LocalSearch):
+    """
+    Swap any two stops, leaving the first stop in place.
+    This is the original optimize_route_order behaviour and the default.
+    """
+    name = "swap"
+
+    def moves(self, route):
+        size = len(route.manifest)
+        for i in range(1, size - 2):
+            for j in range(i + 1, size):
+                if self.is_near(route, route.locations[i], route.locations[j + 1]):
+                    yield "swap", i, j
+
+
+class TwoOptSearch(LocalSearch):
+    """
+    2-opt: reverse the segment manifest[i..j]. This replaces the edges into and out of the
+    segment, which untangles routes that cross themselves.
+    """
+    name = "2opt"
+
+    def moves(self, route):
+        size = len(route.manifest)
+        for i in range(size - 1):
+            for j in range(i + 1, size):
+                # New edge: stop before the segment -> last stop of the segment
+                if self.is_near(route, route.locations[i], route.locations[j + 1]):
+                    yield "reverse", i, j
+
+
+class OrOptSearch(LocalSearch):
+    """
+    Or-opt: move a run of 1 to 3 consecutive stops (kept in order) somewhere else on the route.
+    """
+    name = "oropt"
+    segment_lengths = (1, 2, 3)
+
+    def moves(self, route):
+        size = len(route.manifest)
+        for length in self.segment_lengths:
+            for i in range(size - length + 1):
+                for target in range(-1, size):
+                    if i - 1 <= target <= i + length - 1:
+                        continue
+                    # New edge: stop at target -> first stop of the moved segment
+                    if self.is_near(route, route.locations[target + 1], route.locations[i + 1]):
+                        yield "relocate", i, length, target
+
+
+class TwoOptOrOptSearch(LocalSearch):
+    """2-opt moves followed by Or-opt moves in every pass"""
+    name = "2opt+oropt"
+    segment_lengths = OrOptSearch.segment_lengths
+
+    def moves(self, route):
+        yield from TwoOptSearch.moves(self, route)
+        yield from OrOptSearch.moves(self, route)
+
+
+LOCAL_SEARCHES = {
+    search.name: search for search in (PairwiseSwapSearch, TwoOptSearch, OrOptSearch, TwoOptOrOptSearch)
+}
+
+
+def get_local_search(name: str = PairwiseSwapSearch.name, neighbors: int = None) -> LocalSearch:
+    """Build a local search engine by name, e.g. "swap", "2opt", "oropt" or "2opt+oropt"."""
+    if name not in LOCAL_SEARCHES:
+        raise ValueError(f"Unknown local search {name}. Choose from: {', '.join(LOCAL_SEARCHES)}")
+    return LOCAL_SEARCHES[name](neighbors=neighbors)
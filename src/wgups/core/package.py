@@ -1,31 +1,117 @@
 from enum import Enum
 from logging import getLogger
 
+from wgups.log_pipeline import count_event, PACKAGE_DELIVERED, DELIVERED_WITH_NOTE
 from wgups.utils import convert_deadline, convert_seconds_to_hhmmss
 
 logger = getLogger(__name__)
 
 
 class Package:
+    """
+    A package to be delivered.
 
-    def __init__(self, package_ID, destination, deadline_in_hhmmss, weight, notes):
+    Uses __slots__ instead of a per-instance __dict__, which keeps each Package small when a
+    day has tens of thousands of them. deadline is stored as an int (seconds after midnight)
+    and destination_index caches the destination's index in the DistanceMatrix, so routing
+    code doesn't have to look the destination string up again.
+    """
+    __slots__ = ("package_ID", "_destination", "destination_index", "_deadline", "weight", "notes",
+                 "delivered_at_time", "_status", "_truck_id", "note_on_delivery", "_watchers")
 
+    # Attributes that notify watchers (e.g. a PackageHashTable's secondary indexes) when they change
+    WATCHED_ATTRIBUTES = ("status", "truck_id", "destination", "deadline")
+
+    def __init__(self, package_ID, destination, deadline_in_hhmmss, weight, notes, destination_index=None):
+
+        # Objects with a package_changed(package, attribute, old_value, new_value) method.
+        # A tuple, so unwatched packages all share the same empty one.
+        self._watchers = ()
+
+        # Nothing watches a new package yet, so the watched attributes are set directly
         self.package_ID = package_ID
-        self.destination = destination
-        self.deadline = convert_deadline(deadline_in_hhmmss)
+        self._destination = destination
+        self.destination_index = destination_index
+        self._deadline = convert_deadline(deadline_in_hhmmss)
         self.weight = weight
         self.notes = notes
 
         self.delivered_at_time = None
 
         """Packages start at hub"""
-        self.status = PackageStatus.AT_HUB
+        self._status = PackageStatus.AT_HUB
 
         # ID 0 means it's not loaded
-        self.truck_id = 0
+        self._truck_id = 0
 
         self.note_on_delivery = None
 
+    def __copy__(self):
+        """
+        Shallow copy that isn't watched. A copy isn't the package stored in any hash table,
+        so it must not update that table's indexes.
+        """
+        duplicate = self.__class__.__new__(self.__class__)
+        for cls in self.__class__.__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(self, name):
+                    setattr(duplicate, name, getattr(self, name))
+        duplicate._watchers = ()
+        return duplicate
+
+    def add_watcher(self, watcher):
+        self._watchers = self._watchers + (watcher,)
+
+    def remove_watcher(self, watcher):
+        self._watchers = tuple(w for w in self._watchers if w is not watcher)
+
+    def _notify(self, attribute, old_value, new_value):
+        for watcher in self._watchers:
+            watcher.package_changed(self, attribute, old_value, new_value)
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        # No check that the status really changed: callers only write transitions, and a watcher
+        # is told about every write (a repeated status would move the package to the end of its index)
+        old_value, self._status = self._status, value
+        if self._watchers:
+            self._notify("status", old_value, value)
+
+    @property
+    def truck_id(self):
+        return self._truck_id
+
+    @truck_id.setter
+    def truck_id(self, value):
+        old_value, self._truck_id = self._truck_id, value
+        if self._watchers and old_value != value:
+            self._notify("truck_id", old_value, value)
+
+    @property
+    def destination(self):
+        return self._destination
+
+    @destination.setter
+    def destination(self, value):
+        old_value, self._destination = getattr(self, "_destination", None), value
+        if old_value != value:
+            # The cached index belongs to the old destination
+            self.destination_index = None
+        self._notify("destination", old_value, value)
+
+    @property
+    def deadline(self):
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        old_value, self._deadline = self._deadline, value
+        if self._watchers and old_value != value:
+            self._notify("deadline", old_value, value)
 
     def __str__(self):
 
@@ -54,9 +140,11 @@ class Package:
     def delivered(self, delivery_time):
         self.status = PackageStatus.DELIVERED
         self.delivered_at_time = delivery_time
-        logger.info(f"Truck {self.truck_id} delivered package {self.package_ID} at {self.destination}")
+        count_event(PACKAGE_DELIVERED)
+        logger.info("Truck %s delivered package %s at %s", self.truck_id, self.package_ID, self.destination)
         if self.note_on_delivery:
-            logger.warning(f"Package {self.package_ID} delivered with note: {self.note_on_delivery}")
+            count_event(DELIVERED_WITH_NOTE)
+            logger.warning("Package %s delivered with note: %s", self.package_ID, self.note_on_delivery)
         return self.status
 
     # create function for when package status is in transit
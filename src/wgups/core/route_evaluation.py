@@ -0,0 +1,268 @@
+from typing import List
+
+from wgups.constants import EOD_IN_SECONDS
+from wgups.data_structures.distance_matrix import DistanceMatrix
+
+INFINITY = float('inf')
+
+
+class RouteEvaluation:
+    """
+    Cached evaluation of a single truck route (hub -> manifest in order -> hub).
+
+    Positions are 1-based along the route: position 0 is the truck's start location,
+    position k is manifest[k - 1]. For every position we cache:
+      - the location index in the DistanceMatrix
+      - the cumulative distance from the start
+      - the arrival time (same arithmetic as DeliveryManager.route_meets_deadlines)
+      - the slack (deadline - arrival), infinite for EOD packages, and with route_missed_deadlines
+        for packages that will be late anyway (see routing_deadline)
+
+    plus prefix/suffix minimums of the slack. With those, a swap or a 2-opt segment
+    reversal can be scored in O(segment) time without copying the manifest:
+      - distance changes only on the edges at the ends of the segment (O(1))
+      - arrival times inside the segment and at the stop right after it are recomputed (O(segment))
+      - everything from that stop on is shifted by a constant, so its feasibility
+        is a single comparison against the suffix slack (O(1))
+    """
+    def __init__(self, manifest: List, start_location: str, start_time: float, speed_in_mph: float,
+                 distance_matrix: DistanceMatrix, route_missed_deadlines: bool = False):
+        self.manifest = manifest
+        self.route_missed_deadlines = route_missed_deadlines
+        self.start_time = start_time
+        self.speed_in_mph = speed_in_mph
+        self.distance_matrix = distance_matrix
+        self.start_index = distance_matrix.index_of(start_location)
+
+        self.locations = [self.start_index]
+        self.deadlines = [INFINITY]
+        for package in manifest:
+            location = self._location_index(package)
+            self.locations.append(location)
+            self.deadlines.append(self.routing_deadline(package, location))
+
+        size = len(self.locations)
+        self.distances = [0.0] * size
+        self.arrivals = [start_time] * size
+        self.slack = [INFINITY] * size
+        self.prefix_min_slack = [INFINITY] * size
+        self.suffix_min_slack = [INFINITY] * (size + 1)
+        self.total_distance = 0.0
+        self._rebuild(1)
+
+    def _location_index(self, package):
+        """The package's destination index, using the index cached on the package when there is one"""
+        if package.destination_index is not None:
+            return package.destination_index
+        return self.distance_matrix.index_of(package.destination)
+
+    def _travel_time(self, distance):
+        hours = distance / self.speed_in_mph
+        return hours * 3600.0
+
+    def routing_deadline(self, package, location: int) -> float:
+        """
+        The deadline the route is held to for a package at this location index. EOD packages
+        have none. With route_missed_deadlines, neither does a package that would miss its deadline
+        even if the truck drove straight there: it is going to be late whatever the route, and
+        holding the route to its deadline would only leave it at the hub.
+        """
+        if package.deadline == EOD_IN_SECONDS:
+            return INFINITY
+        if self.route_missed_deadlines:
+            direct_arrival = self.start_time + self._travel_time(
+                self.distance_matrix.distance(self.start_index, location))
+            if direct_arrival > package.deadline:
+                return INFINITY
+        return package.deadline
+
+    def _rebuild(self, position):
+        """Recompute all cached values from `position` to the end of the route"""
+        distance = self.distance_matrix.distance
+        locations = self.locations
+        size = len(locations)
+        position = max(1, position)
+        for k in range(position, size):
+            leg = distance(locations[k - 1], locations[k])
+            self.distances[k] = self.distances[k - 1] + leg
+            self.arrivals[k] = self.arrivals[k - 1] + self._travel_time(leg)
+            self.slack[k] = self.deadlines[k] - self.arrivals[k]
+            self.prefix_min_slack[k] = min(self.prefix_min_slack[k - 1], self.slack[k])
+        for k in range(size - 1, 0, -1):
+            self.suffix_min_slack[k] = min(self.suffix_min_slack[k + 1], self.slack[k])
+
+        if size > 1:
+            self.total_distance = self.distances[-1] + distance(locations[-1], self.start_index)
+        else:
+            self.total_distance = 0.0
+
+    @property
+    def meets_deadlines(self):
+        return self.suffix_min_slack[1] >= 0
+
+    def meets_deadlines_with(self, packages: List):
+        """
+        Would the route still meet every deadline with `packages` appended to the end?
+        O(len(packages)), using the cached arrival time at the current last stop.
+        """
+        if not self.meets_deadlines:
+            return False
+        distance = self.distance_matrix.distance
+        current_time = self.arrivals[-1]
+        previous = self.locations[-1]
+        for package in packages:
+            location = self._location_index(package)
+            current_time = current_time + self._travel_time(distance(previous, location))
+            if current_time > self.routing_deadline(package, location):
+                return False
+            previous = location
+        return True
+
+    def append(self, packages: List):
+        """Append packages to the end of the route and extend the cache"""
+        position = len(self.locations)
+        for package in packages:
+            location = self._location_index(package)
+            self.manifest.append(package)
+            self.locations.append(location)
+            self.deadlines.append(self.routing_deadline(package, location))
+            self.distances.append(0.0)
+            self.arrivals.append(self.start_time)
+            self.slack.append(INFINITY)
+            self.prefix_min_slack.append(INFINITY)
+            self.suffix_min_slack.append(INFINITY)
+        self._rebuild(position)
+
+    def _location_after(self, position):
+        """Location following `position`, or the hub for the return leg"""
+        if position + 1 < len(self.locations):
+            return self.locations[position + 1]
+        return self.start_index
+
+    def _segment_feasible(self, p, q, order):
+        """
+        Check deadlines when positions p..q are visited in `order` (a list of positions),
+        with positions before p and after q unchanged.
+        """
+        if self.prefix_min_slack[p - 1] < 0:
+            return False
+        distance = self.distance_matrix.distance
+        locations = self.locations
+        deadlines = self.deadlines
+        current_time = self.arrivals[p - 1]
+        previous = locations[p - 1]
+        for k in order:
+            current_time = current_time + self._travel_time(distance(previous, locations[k]))
+            if current_time > deadlines[k]:
+                return False
+            previous = locations[k]
+        if q + 1 < len(locations):
+            # The leg out of the segment changes, then every later stop is delayed by the same amount
+            next_arrival = current_time + self._travel_time(distance(previous, locations[q + 1]))
+            shift = next_arrival - self.arrivals[q + 1]
+            if shift > self.suffix_min_slack[q + 1]:
+                return False
+        return True
+
+    def evaluate_swap(self, i, j):
+        """
+        Score swapping manifest[i] and manifest[j] (0-based, i < j).
+        Returns (meets_deadlines, new_total_distance).
+        """
+        p, q = i + 1, j + 1
+        distance = self.distance_matrix.distance
+        locations = self.locations
+        before_p, at_p, at_q, after_q = locations[p - 1], locations[p], locations[q], self._location_after(q)
+        if q == p + 1:
+            delta = (distance(before_p, at_q) + distance(at_q, at_p) + distance(at_p, after_q)
+                     - distance(before_p, at_p) - distance(at_p, at_q) - distance(at_q, after_q))
+        else:
+            after_p, before_q = locations[p + 1], locations[q - 1]
+            delta = (distance(before_p, at_q) + distance(at_q, after_p)
+                     + distance(before_q, at_p) + distance(at_p, after_q)
+                     - distance(before_p, at_p) - distance(at_p, after_p)
+                     - distance(before_q, at_q) - distance(at_q, after_q))
+        order = [q] + list(range(p + 1, q)) + [p]
+        return self._segment_feasible(p, q, order), self.total_distance + delta
+
+    def evaluate_reversal(self, i, j):
+        """
+        Score reversing manifest[i..j] inclusive (0-based, i < j), a 2-opt move.
+        Distances are symmetric, so only the two edges at the ends of the segment change.
+        Returns (meets_deadlines, new_total_distance).
+        """
+        p, q = i + 1, j + 1
+        distance = self.distance_matrix.distance
+        locations = self.locations
+        before_p, at_p, at_q, after_q = locations[p - 1], locations[p], locations[q], self._location_after(q)
+        delta = (distance(before_p, at_q) + distance(at_p, after_q)
+                 - distance(before_p, at_p) - distance(at_q, after_q))
+        order = range(q, p - 1, -1)
+        return self._segment_feasible(p, q, order), self.total_distance + delta
+
+    def evaluate_order(self, p, q, order):
+        """
+        Score visiting route positions p..q (1-based, see class docstring) in `order`,
+        a permutation of those positions. Everything outside p..q is unchanged.
+        Returns (meets_deadlines, new_total_distance).
+        """
+        distance = self.distance_matrix.distance
+        locations = self.locations
+        after_q = self._location_after(q)
+        new_path = 0.0
+        previous = locations[p - 1]
+        for k in order:
+            new_path += distance(previous, locations[k])
+            previous = locations[k]
+        new_path += distance(previous, after_q)
+        old_path = self.distances[q] - self.distances[p - 1] + distance(locations[q], after_q)
+        return self._segment_feasible(p, q, order), self.total_distance - old_path + new_path
+
+    def _relocation_order(self, i, length, target):
+        """
+        Positions affected by moving manifest[i:i + length] to just after manifest[target]
+        (target == -1 means the front of the route), and the order they are visited in afterwards.
+        """
+        first, last = i + 1, i + length
+        if target >= i + length:
+            return first, target + 1, list(range(last + 1, target + 2)) + list(range(first, last + 1))
+        return target + 2, last, list(range(first, last + 1)) + list(range(target + 2, first))
+
+    def evaluate_relocation(self, i, length, target):
+        """
+        Score moving the segment manifest[i:i + length] (kept in order) to just after
+        manifest[target], an Or-opt move. target must be outside i - 1 .. i + length - 1.
+        Returns (meets_deadlines, new_total_distance).
+        """
+        p, q, order = self._relocation_order(i, length, target)
+        return self.evaluate_order(p, q, order)
+
+    def apply_order(self, p, q, order):
+        """Visit route positions p..q in `order` from now on, and refresh the cache"""
+        manifest = [self.manifest[k - 1] for k in order]
+        locations = [self.locations[k] for k in order]
+        deadlines = [self.deadlines[k] for k in order]
+        self.manifest[p - 1:q] = manifest
+        self.locations[p:q + 1] = locations
+        self.deadlines[p:q + 1] = deadlines
+        self._rebuild(p)
+
+    def apply_relocation(self, i, length, target):
+        """Move manifest[i:i + length] to just after manifest[target] and refresh the cache"""
+        self.apply_order(*self._relocation_order(i, length, target))
+
+    def apply_swap(self, i, j):
+        """Swap manifest[i] and manifest[j] in place and refresh the cache"""
+        p, q = i + 1, j + 1
+        self.manifest[i], self.manifest[j] = self.manifest[j], self.manifest[i]
+        self.locations[p], self.locations[q] = self.locations[q], self.locations[p]
+        self.deadlines[p], self.deadlines[q] = self.deadlines[q], self.deadlines[p]
+        self._rebuild(p)
+
+    def apply_reversal(self, i, j):
+        """Reverse manifest[i..j] in place and refresh the cache"""
+        p, q = i + 1, j + 1
+        self.manifest[i:j + 1] = self.manifest[i:j + 1][::-1]
+        self.locations[p:q + 1] = self.locations[p:q + 1][::-1]
+        self.deadlines[p:q + 1] = self.deadlines[p:q + 1][::-1]
+        self._rebuild(p)
@@ -1,6 +1,7 @@
 from logging import getLogger
 
 from wgups.core.package import Package, PackageStatus
+from wgups.log_pipeline import count_event, SPECIAL_ROUTE_CREATED, SPECIAL_ROUTE_VISITED
 
 logger = getLogger(__name__)
 
@@ -11,7 +12,7 @@ A special route package is a an "empty" package object used for directing the tr
 It is not a package that is to be delivered, but rather a placeholder for the truck to go to a specific location.
 """
 class SpecialRoute(Package):
-
+    __slots__ = ("reason",)
 
     def __init__(self, destination=None, notes=None, reason=None):
         package_ID = 999
@@ -19,11 +20,13 @@ class SpecialRoute(Package):
         weight = 0
         super().__init__(package_ID, destination, deadline_in_hhmmss, weight, notes)
         self.reason = reason
-        logger.warning(f"Special Route  created for {self.destination}")
+        count_event(SPECIAL_ROUTE_CREATED)
+        logger.info("Special Route created for %s", self.destination)
 
     def delivered(self, delivery_time):
-        logger.warning(f"Truck {self.truck_id} arrived at special location {self.destination}")
-        logger.warning(f"Reason: {self.reason}")
+        count_event(SPECIAL_ROUTE_VISITED)
+        logger.info("Truck %s arrived at special location %s", self.truck_id, self.destination)
+        logger.info("Reason: %s", self.reason)
         self.status = PackageStatus.DELIVERED
         self.delivered_at_time = delivery_time
         return self.status
@@ -0,0 +1,116 @@
+import re
+from difflib import get_close_matches
+from logging import getLogger
+from typing import Dict, List, Optional
+
+logger = getLogger(__name__)
+
+# Spelled-out words that show up in both short and long form, e.g. "5100 South 2700 West"
+ABBREVIATIONS = {
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "STREET": "ST", "AVENUE": "AVE", "ROAD": "RD", "BOULEVARD": "BLVD", "DRIVE": "DR", "LANE": "LN",
+    "STATION": "STA", "SUITE": "#", "APT": "#", "UNIT": "#",
+}
+PUNCTUATION = re.compile(r"[.,]")
+ZIP_CODE = re.compile(r"\b\d{5}\b")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of an address: upper case, no punctuation, single spaces,
+    and spelled-out directions / street types abbreviated.
+    "5383 South 900 East #104, Salt Lake City" -> "5383 S 900 E #104 SALT LAKE CITY"
+    """
+    tokens = PUNCTUATION.sub(" ", address.upper()).replace("#", " # ").split()
+    return " ".join(ABBREVIATIONS.get(token, token) for token in tokens).replace("# ", "#")
+
+
+def street_key(address: str) -> Optional[str]:
+    """(normalized street, zip) key for a "street, city, state zip" address, or None without a zip code"""
+    parts = address.split(",")
+    zip_codes = ZIP_CODE.findall(parts[-1])
+    if len(parts) < 2 or not zip_codes:
+        return None
+    return f"{normalize_address(parts[0])}|{zip_codes[-1]}"
+
+
+class AddressIndex:
+    """
+    Address -> location name lookup for the WGUPS location table (location_lookup.csv).
+
+    Built once from the location rows. Lookups try, in order:
+      - the address exactly as written in the table: O(1)
+      - the normalized address (case, punctuation, "South" vs "S", ...): O(1)
+      - the normalized street plus zip code, ignoring the city: O(1)
+      - any address that contains the search text, as the original linear scan did: O(locations)
+      - the closest normalized address by similarity, preferring addresses with the
+        same house number: O(locations), and logged, since it is a guess
+
+    Only the first two are used for well formed data, so resolving every package is linear
+    in the number of packages. When two rows share a key, the first row wins, like the scan.
+    """
+    def __init__(self, location_data: List[Dict], fuzzy_cutoff: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.exact: Dict[str, str] = {}
+        self.normalized: Dict[str, str] = {}
+        self.by_street: Dict[str, str] = {}
+        # House number -> normalized addresses, to narrow down fuzzy matches
+        self.by_number: Dict[str, List[str]] = {}
+        # Rows in table order, for the substring fallback
+        self._rows: List[tuple] = []
+
+        for row in location_data:
+            self.add(row['PackageText'], row['Location'])
+
+    def add(self, address: str, location: str):
+        """Index one row of the location table"""
+        normalized = normalize_address(address)
+        self.exact.setdefault(address, location)
+        if normalized not in self.normalized:
+            self.normalized[normalized] = location
+            number = normalized.split(" ", 1)[0]
+            self.by_number.setdefault(number, []).append(normalized)
+        key = street_key(address)
+        if key is not None:
+            self.by_street.setdefault(key, location)
+        self._rows.append((address, location))
+
+    def lookup(self, address: str) -> Optional[str]:
+        """The location name for an address, or None if nothing matches closely enough"""
+        location = self.exact.get(address)
+        if location is not None:
+            return location
+
+        normalized = normalize_address(address)
+        location = self.normalized.get(normalized)
+        if location is not None:
+            return location
+
+        key = street_key(address)
+        if key is not None and key in self.by_street:
+            return self.by_street[key]
+
+        for text, location in self._rows:
+            if address in text:
+                return location
+
+        return self._fuzzy_lookup(address, normalized)
+
+    def _fuzzy_lookup(self, address: str, normalized: str) -> Optional[str]:
+        candidates = self.by_number.get(normalized.split(" ", 1)[0], [])
+        matches = get_close_matches(normalized, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        if not matches:
+            matches = get_close_matches(normalized, list(self.normalized), n=1, cutoff=self.fuzzy_cutoff)
+        if not matches:
+            return None
+        location = self.normalized[matches[0]]
+        logger.warning(f"No exact match for address '{address}', using the closest one: {location}")
+        return location
+
+    def __len__(self):
+        """Return the number of distinct normalized addresses"""
+        return len(self.normalized)
+
+    def __contains__(self, address):
+        """Allow 'in' operator for addresses"""
+        return self.lookup(address) is not None
@@ -1,12 +1,30 @@
 class AVLNode:
-    def __init__(self, package):
+    def __init__(self, key, package):
+        self.key = key  # (deadline, package ID)
         self.package = package  # Store the Package object
         self.left = None
         self.right = None
         self.height = 1  # Height of the node
+        self.size = 1  # Number of nodes in the subtree rooted here, for order statistics
+
+
+def deadline_key(package, deadline=None):
+    """The tree key of a package: its deadline (or the one given), then its ID to keep keys unique"""
+    return (package.deadline if deadline is None else deadline, package.package_ID)
 
 
 class AVLTree:
+    """
+    Order-statistic AVL tree of packages, keyed by (deadline, package_ID).
+
+    Every node also knows the size of its subtree, so besides O(log n) insert and delete,
+    the tree answers "how many packages are due before t" (count_before) and "which is the
+    k-th earliest" (select) in O(log n), and "which packages are due in [t0, t1)" (range)
+    in O(log n + matching).
+
+    Insert, delete and traversal are loops over an explicit path or stack, not recursion,
+    so a large tree can't run into Python's recursion limit.
+    """
     def __init__(self):
         self.root = None
 
@@ -14,10 +32,19 @@ class AVLTree:
     def get_height(self, node):
         return node.height if node else 0
 
+    # Utility to get the subtree size of a node
+    def get_size(self, node):
+        return node.size if node else 0
+
     # Utility to calculate the balance factor of a node
     def get_balance(self, node):
         return self.get_height(node.left) - self.get_height(node.right) if node else 0
 
+    def _update(self, node):
+        """Recompute a node's height and size from its children"""
+        node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
+        node.size = 1 + self.get_size(node.left) + self.get_size(node.right)
+
     # Right rotate subtree rooted with node y
     def right_rotate(self, y):
         if not y or not y.left:
@@ -30,9 +57,9 @@ class AVLTree:
         x.right = y
         y.left = T2
 
-        # Update heights
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
+        # Update heights and sizes, lowest node first
+        self._update(y)
+        self._update(x)
 
         return x
 
@@ -48,80 +75,177 @@ class AVLTree:
         y.left = x
         x.right = T2
 
-        # Update heights
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
+        # Update heights and sizes, lowest node first
+        self._update(x)
+        self._update(y)
 
         return y
 
-    # Insert a package into the AVL tree
-    def insert(self, node, package):
-        """Recursive helper function for insertion."""
-        if not node:
-            return AVLNode(package)
-
-        # Use deadlinefor ordering
-        if package.deadline > node.package.deadline:
-            node.left = self.insert(node.left, package)
-        elif package.deadline < node.package.deadline:
-            node.right = self.insert(node.right, package)
-        else:
-            # Same deadline, check for duplicate ID (enforce unique packages)
-            if package.package_ID == node.package.package_ID:
-                raise ValueError(f"Duplicate package ID {package.package_ID} is not allowed.")
-            else:
-                # Insert packages with the same deadline into the right subtree
-                node.right = self.insert(node.right, package)
-
-        # Update the height of the ancestor node
-        node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
-
-        # Balance the node
+    def _rebalance(self, node):
+        """Update node and restore the AVL property at it. Returns the new root of its subtree."""
+        self._update(node)
         balance = self.get_balance(node)
 
-        # Left Left Case
-        if balance > 1 and package.deadline > node.left.package.deadline:
+        if balance > 1:
+            # Left Right Case: turn it into Left Left first
+            if self.get_balance(node.left) < 0:
+                node.left = self.left_rotate(node.left)
+            # Left Left Case
             return self.right_rotate(node)
 
-        # Right Right Case
-        if balance < -1 and package.deadline < node.right.package.deadline:
+        if balance < -1:
+            # Right Left Case: turn it into Right Right first
+            if self.get_balance(node.right) > 0:
+                node.right = self.right_rotate(node.right)
+            # Right Right Case
             return self.left_rotate(node)
 
-        # Left Right Case
-        if balance > 1 and package.deadline > node.left.package.deadline:
-            node.left = self.left_rotate(node.left)
-            return self.right_rotate(node)
+        return node
 
-        # Right Left Case
-        if balance < -1 and package.deadline < node.right.package.deadline:
-            node.right = self.right_rotate(node.right)
-            return self.left_rotate(node)
+    def _rebalance_path(self, path):
+        """
+        Rebalance the nodes on a path of (node, went_left) pairs from the root, bottom up.
+        The children of the last node are already in place. Each node above it gets its
+        rebalanced child back.
+        """
+        child = None
+        for depth in range(len(path) - 1, -1, -1):
+            node, went_left = path[depth]
+            if depth < len(path) - 1:
+                if went_left:
+                    node.left = child
+                else:
+                    node.right = child
+            child = self._rebalance(node)
+        self.root = child
 
-        return node
+    # Insert a package into the AVL tree
+    def insert(self, package, deadline=None):
+        """
+        Inserts a package, keyed by its deadline (or the one given) and ID.
+        Raises ValueError if that key is already in the tree.
+        """
+        key = deadline_key(package, deadline)
+        if self.root is None:
+            self.root = AVLNode(key, package)
+            return
+
+        # Walk down to the insertion point, remembering the way
+        path = []
+        node = self.root
+        while node is not None:
+            if key == node.key:
+                raise ValueError(f"Duplicate package ID {package.package_ID} is not allowed.")
+            went_left = key < node.key
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+
+        leaf = AVLNode(key, package)
+        parent, went_left = path[-1]
+        if went_left:
+            parent.left = leaf
+        else:
+            parent.right = leaf
+        self._rebalance_path(path)
 
     # Public method to insert a package
     def insert_package(self, package):
         """Inserts a package into the AVL tree."""
-        self.root = self.insert(self.root, package)
+        self.insert(package)
+
+    def delete(self, package, deadline=None):
+        """
+        Removes a package, looked up by its deadline (or the one given, e.g. the deadline it
+        had when it was inserted) and ID. Raises KeyError if it isn't in the tree.
+        """
+        key = deadline_key(package, deadline)
+        path = []
+        node = self.root
+        while node is not None and key != node.key:
+            went_left = key < node.key
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        if node is None:
+            raise KeyError(key)
+
+        if node.left is not None and node.right is not None:
+            # Two children: take the in-order successor's place, then remove the successor
+            path.append((node, False))
+            successor = node.right
+            while successor.left is not None:
+                path.append((successor, True))
+                successor = successor.left
+            node.key, node.package = successor.key, successor.package
+            node = successor
+
+        replacement = node.left if node.left is not None else node.right
+        if not path:
+            self.root = replacement
+            return
+        parent, went_left = path[-1]
+        if went_left:
+            parent.left = replacement
+        else:
+            parent.right = replacement
+        self._rebalance_path(path)
+
+    def count_before(self, deadline):
+        """Number of packages due strictly before `deadline`"""
+        count = 0
+        node = self.root
+        while node is not None:
+            if node.key[0] < deadline:
+                count += self.get_size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def select(self, index):
+        """The package at position `index` in deadline order (0 is the earliest)"""
+        if not 0 <= index < self.get_size(self.root):
+            raise IndexError(index)
+        node = self.root
+        while True:
+            left_size = self.get_size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.package
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    def range(self, start=None, end=None):
+        """
+        Packages due in [start, end), earliest first. Either bound can be None for no bound.
+        Only visits the subtrees that can hold matching packages.
+        """
+        result = []
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if start is None or node.key[0] >= start:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right  # Everything on the left is due before start
+            else:
+                node = stack.pop()
+                if end is not None and node.key[0] >= end:
+                    break
+                result.append(node.package)
+                node = node.right
+        return result
 
     # In-order traversal to get sorted list of packages by deadlines
-    def in_order_traversal(self, node="Initial", result=None):
+    def in_order_traversal(self):
         """Traverse the AVL tree in order and return sorted packages."""
-        if result is None:
-            result = []
-        if node is "Initial":
-            node = self.root
-        if node is None:
-            return result
+        return self.range()
 
+    def __iter__(self):
+        return iter(self.range())
 
-        if node is not None:
-            # Traverse the left subtree
-            self.in_order_traversal(node.left, result)
-            # Visit the current node
-            result.append(node.package)
-            # Traverse the right subtree
-            self.in_order_traversal(node.right, result)
-
-        return result
-
+    def __len__(self):
+        return self.get_size(self.root)
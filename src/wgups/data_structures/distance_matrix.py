@@ -0,0 +1,159 @@
+from array import array
+from math import isnan
+from typing import Dict, Iterable, List, Tuple
+
+
+class DistanceMatrix:
+    """
+    A dense, symmetric distance matrix for the WGUPS location network.
+
+    Every location string is interned to an integer index once, when the matrix is built.
+    Distances are stored in a flat array of doubles (row-major, n * n), so looking up the
+    distance between two indices is a single O(1) array access instead of a scan over
+    every row of the distance CSV.
+
+    Pairs that are missing from the source data are stored as NaN and reported as None
+    by `between`, matching the behaviour of `utils.get_distance`.
+
+    The array can also be a memoryview over a precompiled cache file (see `from_buffer`),
+    of doubles or floats, so a large network is paged in on demand instead of parsed.
+    """
+    def __init__(self, distance_data: List[Dict]):
+        self.locations: List[str] = []
+        self.index: Dict[str, int] = {}
+
+        # First pass: intern every location we see
+        for row in distance_data:
+            self.intern(row['Location1'])
+            self.intern(row['Location2'])
+
+        self._allocate()
+
+        # Second pass: fill both halves of the matrix
+        for row in distance_data:
+            self._set(self.index[row['Location1']], self.index[row['Location2']], float(row['Distance']))
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Tuple[str, str, float]]) -> "DistanceMatrix":
+        """
+        Build the matrix in a single pass over (location1, location2, distance) entries, e.g. a generator
+        streaming the distance CSV. Entries are buffered as compact index/distance arrays until the
+        number of locations (and so the matrix size) is known, instead of as one dict per CSV row.
+        """
+        matrix = cls([])
+        firsts, seconds, distances = array('l'), array('l'), array('d')
+        for location1, location2, distance in entries:
+            firsts.append(matrix.intern(location1))
+            seconds.append(matrix.intern(location2))
+            distances.append(distance)
+
+        matrix._allocate()
+        for i, j, distance in zip(firsts, seconds, distances):
+            matrix._set(i, j, distance)
+        return matrix
+
+    @classmethod
+    def from_buffer(cls, locations: List[str], data) -> "DistanceMatrix":
+        """
+        Wrap an existing row-major n * n buffer of distances, e.g. a memoryview over a memory-mapped
+        cache file (see wgups.network_cache). Nothing is copied, so this is O(locations).
+        """
+        matrix = cls([])
+        for location in locations:
+            matrix.intern(location)
+        if len(data) != len(matrix.locations) ** 2:
+            raise Exception(f"Distance buffer has {len(data)} entries, expected {len(matrix.locations) ** 2}")
+        matrix.size = len(matrix.locations)
+        matrix._nearest = {}
+        matrix._data = data
+        return matrix
+
+    def __getstate__(self):
+        # A memory-mapped buffer can't be pickled (e.g. to send to batch workers), so send a copy
+        state = dict(self.__dict__)
+        if isinstance(self._data, memoryview):
+            state["_data"] = array(self._data.format, self._data)
+            state.pop("_mmap", None)
+        return state
+
+    def _allocate(self):
+        """Size the matrix for the interned locations: NaN everywhere, 0 on the diagonal"""
+        self.size = len(self.locations)
+        self._nearest: Dict[int, List[int]] = {}
+        self._data = array('d', [float('nan')]) * (self.size * self.size)
+        for i in range(self.size):
+            self._data[i * self.size + i] = 0.0
+
+    def _set(self, i: int, j: int, distance: float):
+        """Fill both halves of the matrix for one pair"""
+        if i == j:
+            return
+        self._data[i * self.size + j] = distance
+        self._data[j * self.size + i] = distance
+
+    def intern(self, location: str) -> int:
+        """
+        Return the integer index for a location, assigning a new one if it hasn't been seen.
+        Only used while building the matrix; the matrix does not grow afterwards.
+        """
+        idx = self.index.get(location)
+        if idx is None:
+            idx = len(self.locations)
+            self.index[location] = idx
+            self.locations.append(location)
+        return idx
+
+    def index_of(self, location: str) -> int:
+        """Lookup the integer index of a location string"""
+        idx = self.index.get(location)
+        if idx is None:
+            raise Exception(f"Location {location} not found in distance data")
+        return idx
+
+    def location_of(self, idx: int) -> str:
+        """Lookup the location string for an integer index"""
+        return self.locations[idx]
+
+    def distance(self, i: int, j: int) -> float:
+        """
+        O(1) distance between two location indices.
+        Missing pairs come back as NaN.
+        """
+        return self._data[i * self.size + j]
+
+    def nearest(self, i: int, k: int) -> List[int]:
+        """
+        The k location indices closest to location i (excluding i itself), nearest first.
+        Computed once per location and cached; used for neighbor-list restricted local search.
+        """
+        ranked = self._nearest.get(i)
+        if ranked is None:
+            row = i * self.size
+            ranked = sorted((j for j in range(self.size) if j != i and not isnan(self._data[row + j])),
+                            key=lambda j: (self._data[row + j], j))
+            self._nearest[i] = ranked
+        return ranked[:k]
+
+    def between(self, location1: str, location2: str) -> float:
+        """
+        Distance between two location strings.
+        Returns None if the pair is not in the distance data.
+        """
+        if location1 == location2:
+            return 0.0
+        i = self.index.get(location1)
+        j = self.index.get(location2)
+        if i is None or j is None:
+            return None
+        distance = self._data[i * self.size + j]
+        if isnan(distance):
+            return None
+        return distance
+
+    def __len__(self):
+        """Return the number of locations in the matrix"""
+        return self.size
+
+    def __contains__(self, location):
+        """Allow 'in' operator for location strings"""
+        return location in self.index
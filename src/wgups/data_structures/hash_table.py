@@ -1,8 +1,13 @@
+FNV_OFFSET_BASIS = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+
 class HashNode:
     """A node in the hash table's linked list for handling collisions"""
-    def __init__(self, key, package):
+    def __init__(self, key, package, key_hash):
         self.key = key  # Package ID
         self.package = package  # Package object
+        self.key_hash = key_hash  # Integer hash of the key, computed once
         self.next = None
 
 class PackageHashTable:
@@ -14,50 +19,146 @@ class PackageHashTable:
 
     Details about the values of packages are in the `package.py` file.
 
+    Secondary indexes are kept for status, truck_id, destination and deadline.
+    Each maps an attribute value to the packages that currently have it, and is kept
+    current by the packages themselves: a stored package notifies the table whenever
+    one of those attributes changes (e.g. on_truck(), delivered()).
+    Status queries are then O(matching) instead of a scan over every bucket.
+
     """
-    def __init__(self, initial_capacity=40):  # We know we have ~40 packages
-        self.capacity = initial_capacity
+    INDEXED_ATTRIBUTES = ("status", "truck_id", "destination", "deadline")
+
+    def __init__(self, initial_capacity=40, max_load_factor=0.75):  # We know we have ~40 packages
+        self.capacity = max(1, initial_capacity)
+        self.max_load_factor = max_load_factor
         self.size = 0
-        self.buckets = [None] * initial_capacity
+        self.buckets = [None] * self.capacity
+        # Stored key -> its integer hash, so a lookup doesn't parse the key again
+        self.key_hashes = {}
+        # attribute -> value -> {id(package): package}, in the order packages got that value
+        self.indexes = {attribute: {} for attribute in self.INDEXED_ATTRIBUTES}
+
+    def _index(self, package):
+        """Add a package to every secondary index and start watching it"""
+        for attribute, index in self.indexes.items():
+            index.setdefault(getattr(package, attribute), {})[id(package)] = package
+        package.add_watcher(self)
+
+    def _unindex(self, package):
+        """Remove a package from every secondary index and stop watching it"""
+        for attribute, index in self.indexes.items():
+            self._index_discard(index, getattr(package, attribute), package)
+        package.remove_watcher(self)
+
+    @staticmethod
+    def _index_discard(index, value, package):
+        matching = index.get(value)
+        if matching is not None:
+            matching.pop(id(package), None)
+            if not matching:
+                del index[value]
+
+    def package_changed(self, package, attribute, old_value, new_value):
+        """Called by a stored Package when an indexed attribute changes"""
+        index = self.indexes.get(attribute)
+        if index is None:
+            return
+        self._index_discard(index, old_value, package)
+        matching = index.get(new_value)
+        if matching is None:
+            matching = index[new_value] = {}
+        matching[id(package)] = package
     
+    @staticmethod
+    def _key_hash(key):
+        """
+        Integer hash for a package ID.
+        Package IDs are integer strings, so the integer value itself is a perfect hash for them.
+        Any other key gets a deterministic FNV-1a hash (unlike hash(), the same across runs).
+        It is computed once per stored key, on insert, and kept in key_hashes and on the HashNode.
+        """
+        if isinstance(key, int):
+            return key
+        if isinstance(key, str) and key.isdigit():
+            return int(key)
+        key_hash = FNV_OFFSET_BASIS
+        for byte in str(key).encode("utf-8"):
+            key_hash = ((key_hash ^ byte) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+        return key_hash
+
     def _hash(self, key):
         """
-        Hash function for package IDs.
-        Since package IDs are integers and we know roughly how many packages we have,
-        we can use a simple modulo operation.
+        Bucket index for a package ID: the key's integer hash modulo the capacity.
+        Sequential package IDs land in consecutive buckets, so there are no collisions
+        until the table is full - and the table grows before that happens.
         """
-        return int(key) % self.capacity
-    
+        return self._key_hash(key) % self.capacity
+
+    @property
+    def load_factor(self):
+        return self.size / self.capacity
+
+    def _resize(self, new_capacity):
+        """
+        Rehash every node into a new bucket array.
+        Nodes are relinked, not copied, and their cached key hash is reused.
+        """
+        old_buckets = self.buckets
+        self.capacity = new_capacity
+        self.buckets = [None] * new_capacity
+        for bucket in old_buckets:
+            current = bucket
+            while current:
+                next_node = current.next
+                index = current.key_hash % new_capacity
+                current.next = self.buckets[index]
+                self.buckets[index] = current
+                current = next_node
+
     def insert(self, key, package):
-        """Insert a package into the hash table using its ID as key"""
-        index = self._hash(key)
+        """
+        Insert a package into the hash table using its ID as key.
+        Grows the table (roughly doubling it) once the load factor passes max_load_factor.
+        """
+        key_hash = self.key_hashes.get(key)
+        if key_hash is None:
+            key_hash = self.key_hashes[key] = self._key_hash(key)
+        index = key_hash % self.capacity
         
         if self.buckets[index] is None:
             # No collision, create new node
-            self.buckets[index] = HashNode(key, package)
+            self.buckets[index] = HashNode(key, package, key_hash)
             self.size += 1
         else:
             # Handle collision with chaining
             current = self.buckets[index]
             while current:
-                if current.key == key:
+                if current.key_hash == key_hash and current.key == key:
                     # Update existing package
+                    self._unindex(current.package)
                     current.package = package
+                    self._index(package)
                     return
                 if current.next is None:
                     break
                 current = current.next
             # Add new node to chain
-            current.next = HashNode(key, package)
+            current.next = HashNode(key, package, key_hash)
             self.size += 1
+        self._index(package)
+
+        if self.load_factor > self.max_load_factor:
+            self._resize(self.capacity * 2 + 1)
     
     def get(self, key):
         """Retrieve a package by its ID"""
-        index = self._hash(key)
-        current = self.buckets[index]
+        key_hash = self.key_hashes.get(key)
+        if key_hash is None:
+            return None  # Never stored, or removed
+        current = self.buckets[key_hash % self.capacity]
         
         while current:
-            if current.key == key:
+            if current.key_hash == key_hash and current.key == key:
                 return current.package
             current = current.next
         return None
@@ -106,19 +207,39 @@ class PackageHashTable:
             }
         return None
     
+    def chain_stats(self):
+        """
+        Summary of chain lengths across all buckets, for checking the table under load.
+        """
+        lengths = [self.get_bucket_info(i)["chain_length"] for i in range(self.capacity)]
+        used = [length for length in lengths if length]
+        return {
+            "capacity": self.capacity,
+            "size": self.size,
+            "load_factor": self.load_factor,
+            "used_buckets": len(used),
+            "longest_chain": max(used, default=0),
+            "average_chain": sum(used) / len(used) if used else 0.0,
+        }
+    
     def remove(self, key):
         """Remove a package from the hash table"""
-        index = self._hash(key)
+        key_hash = self.key_hashes.get(key)
+        if key_hash is None:
+            return None
+        index = key_hash % self.capacity
         current = self.buckets[index]
         prev = None
         
         while current:
-            if current.key == key:
+            if current.key_hash == key_hash and current.key == key:
                 if prev:
                     prev.next = current.next
                 else:
                     self.buckets[index] = current.next
                 self.size -= 1
+                del self.key_hashes[key]
+                self._unindex(current.package)
                 return current.package
             prev = current
             current = current.next
@@ -134,6 +255,21 @@ class PackageHashTable:
                 current = current.next
         return packages
     
+    def lookup_by_status(self, status):
+        """
+        All packages currently in the given status (PackageStatus enum).
+        O(matching) via the status index.
+        """
+        return list(self.indexes["status"].get(status, {}).values())
+
+    def count_by_status(self, status):
+        """Number of packages currently in the given status. O(1)."""
+        return len(self.indexes["status"].get(status, {}))
+
+    def all_have_status(self, status):
+        """True if every package in the table is in the given status. O(1)."""
+        return self.count_by_status(status) == self.size
+
     def __getitem__(self, key):
         """Allow dictionary-style access with []"""
         return self.get(key)
@@ -180,6 +316,14 @@ class PackageHashTable:
             # Find packages on a specific truck with a certain status
             packages = hash_table.lookup(truck_id=2, status=PackageStatus.IN_TRANSIT)
         """
+        # Start from the smallest secondary index that applies, and filter the rest
+        indexed = [self.indexes[attr].get(value, {}) for attr, value in criteria.items() if attr in self.indexes]
+        if indexed:
+            candidates = min(indexed, key=len)
+            return [package for package in candidates.values()
+                    if all(hasattr(package, attr) and getattr(package, attr) == value
+                           for attr, value in criteria.items())]
+
         matching_packages = []
         
         # Iterate through all packages in the hash table
@@ -1,8 +1,18 @@
+import heapq
+
+
 class BundleItem:
-    def __init__(self, packages):
+    def __init__(self, packages, deadline=None):
         self.packages = packages
-        # The deadline of a bundle is the earliest deadline among its packages
-        self.deadline = min(pkg.deadline for pkg in packages)
+        # The deadline of a bundle is the earliest deadline among its packages.
+        # Callers that already know it can pass it in instead of having it recomputed.
+        self.deadline = min(pkg.deadline for pkg in packages) if deadline is None else deadline
+        # Identifies the bundle in the heap's position map
+        self.key = tuple(pkg.package_ID for pkg in packages)
+
+    def refresh(self):
+        """Recompute the deadline, after a package's deadline changed"""
+        self.deadline = min(pkg.deadline for pkg in self.packages)
 
     def __lt__(self, other):
         return self.deadline < other.deadline
@@ -10,59 +20,171 @@ class BundleItem:
     def __eq__(self, other):
         return self.deadline == other.deadline
 
+
 class MinHeap:
+    """
+    Indexed binary min-heap ordered by each item's `deadline`.
+
+    Alongside the array, `positions` maps each item's key to its index in the array, so an
+    item already in the heap can be found, re-prioritized (update) or taken out (remove) in
+    O(log n). A list of packages pushed on the heap is wrapped in a BundleItem, whose key is
+    the tuple of its package IDs. Any other item is its own key, so it must be hashable.
+
+    Sifts are loops, not recursion. Equal deadlines are never swapped, so for the same
+    sequence of pushes the pop order, ties included, is the same as it always was.
+    A deadline can be any comparable value. Giving every item a distinct one, such as a
+    (deadline, package ID) tuple, makes the order total, so it no longer depends on how
+    the heap was built or patched.
+    """
     def __init__(self):
         self.data = []  # List to store heap elements
+        self.positions = {}  # Item key -> index in data
+
+    @classmethod
+    def heapify(cls, items, deadlines=None):
+        """
+        Build a heap from many items at once, in O(n) instead of n pushes.
+        `deadlines`, if given, are the deadlines of the lists of packages, as for push().
+        Items with equal deadlines may come out in a different order than after n pushes.
+        """
+        heap = cls()
+        if deadlines is None:
+            deadlines = [None] * len(items)
+        heap.data = [BundleItem(item, deadline) if isinstance(item, list) else item
+                     for item, deadline in zip(items, deadlines)]
+        for index, item in enumerate(heap.data):
+            heap.positions[heap._key(item)] = index
+        for index in range(len(heap.data) // 2 - 1, -1, -1):
+            heap._heapify_down(index)
+        return heap
 
-    def push(self, item):
-        """Adds an item to the heap and maintains heap property."""
+    @staticmethod
+    def _key(item):
+        return item.key if isinstance(item, BundleItem) else item
+
+    def push(self, item, deadline=None):
+        """
+        Adds an item to the heap and maintains heap property.
+        Returns the item's key, for update() and remove().
+        """
         if isinstance(item, list):
             # If it's a list of packages, wrap it in a BundleItem
-            item = BundleItem(item)
+            item = BundleItem(item, deadline)
+        key = self._key(item)
+        if key in self.positions:
+            raise KeyError(f"{key} is already in the heap")
         self.data.append(item)  # Add the item at the end
+        self.positions[key] = len(self.data) - 1
         self._heapify_up(len(self.data) - 1)  # Restore heap property
+        return key
 
     def pop(self):
         """Removes and returns the item with the earliest deadline."""
         if not self.data:
             return False
-        # Swap the root with the last element
-        self._swap(0, len(self.data) - 1)
-        # Remove the last element (smallest item)
-        min_item = self.data.pop()
-        # Restore heap property
-        self._heapify_down(0)
+        min_item = self._remove_at(0)
         return min_item.packages if isinstance(min_item, BundleItem) else min_item
 
+    def peek(self):
+        """The item with the earliest deadline, without removing it."""
+        if not self.data:
+            return False
+        min_item = self.data[0]
+        return min_item.packages if isinstance(min_item, BundleItem) else min_item
+
+    def in_order(self):
+        """
+        Every item by deadline, without taking them off the heap. With distinct deadlines this
+        is the order pop() would return them in. Don't change the heap while iterating.
+        Walks the heap itself: a small frontier heap holds the children of the items listed so far,
+        and the smallest of them is always the next item. Listing the first k items costs
+        O(k log k), and nothing is copied or sorted up front.
+        """
+        data = self.data
+        if not data:
+            return
+        # (deadline, index) pairs. Indexes are unique, so deadlines that tie never get compared further.
+        frontier = [(data[0].deadline, 0)]
+        while frontier:
+            _, index = heapq.heappop(frontier)
+            item = data[index]
+            yield item.packages if isinstance(item, BundleItem) else item
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(data):
+                    heapq.heappush(frontier, (data[child].deadline, child))
+
+    def update(self, key, deadline=None):
+        """
+        Move an item to its place after its deadline changed, in either direction.
+        A bundle recomputes its deadline from its packages unless one is given.
+        """
+        index = self.positions[key]
+        item = self.data[index]
+        if deadline is not None:
+            item.deadline = deadline
+        elif isinstance(item, BundleItem):
+            item.refresh()
+        self._heapify_down(self._heapify_up(index))
+
+    def remove(self, key):
+        """Take an item out of the heap, wherever it is. Returns what pop() would have."""
+        item = self._remove_at(self.positions[key])
+        return item.packages if isinstance(item, BundleItem) else item
+
+    def _remove_at(self, index):
+        last = len(self.data) - 1
+        # Swap the element with the last element, then remove it
+        self._swap(index, last)
+        item = self.data.pop()
+        del self.positions[self._key(item)]
+        if index < last:
+            # Restore heap property. The element moved into index may need to go either way.
+            self._heapify_down(self._heapify_up(index))
+        return item
+
     def _heapify_up(self, index):
-        """Restore the heap property by moving the element at index up."""
-        parent = (index - 1) // 2
-        if index > 0 and self.data[index].deadline < self.data[parent].deadline:
+        """Restore the heap property by moving the element at index up. Returns where it ends up."""
+        data = self.data
+        while index > 0:
+            parent = (index - 1) // 2
+            if not data[index].deadline < data[parent].deadline:
+                break
             self._swap(index, parent)
-            self._heapify_up(parent)
+            index = parent
+        return index
 
     def _heapify_down(self, index):
-        """Restore the heap property by moving the element at index down."""
-        smallest = index
-        left = 2 * index + 1
-        right = 2 * index + 2
+        """Restore the heap property by moving the element at index down. Returns where it ends up."""
+        data = self.data
+        size = len(data)
+        while True:
+            smallest = index
+            left = 2 * index + 1
+            right = 2 * index + 2
 
-        # Check if left child exists and is smaller
-        if left < len(self.data) and self.data[left].deadline < self.data[smallest].deadline:
-            smallest = left
+            # Check if left child exists and is smaller
+            if left < size and data[left].deadline < data[smallest].deadline:
+                smallest = left
 
-        # Check if right child exists and is smaller
-        if right < len(self.data) and self.data[right].deadline < self.data[smallest].deadline:
-            smallest = right
+            # Check if right child exists and is smaller
+            if right < size and data[right].deadline < data[smallest].deadline:
+                smallest = right
 
-        # If the smallest isn't the current index, swap and continue
-        if smallest != index:
+            # If the smallest is the current index, we're done
+            if smallest == index:
+                return index
             self._swap(index, smallest)
-            self._heapify_down(smallest)
+            index = smallest
 
     def _swap(self, i, j):
-        """Helper function to swap two elements in the heap."""
-        self.data[i], self.data[j] = self.data[j], self.data[i]
+        """Helper function to swap two elements in the heap and their positions."""
+        data = self.data
+        data[i], data[j] = data[j], data[i]
+        self.positions[self._key(data[i])] = i
+        self.positions[self._key(data[j])] = j
+
+    def __contains__(self, key):
+        return key in self.positions
 
     def __len__(self):
         """Returns the number of elements in the heap."""
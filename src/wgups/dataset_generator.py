@@ -0,0 +1,192 @@
+"""
+Synthetic dataset generator
+
+Writes package_file.csv, distance_data.csv and location_lookup.csv in exactly the formats
+the bundled res/ files use, so any size of workload can be run through the same ingest
+functions and the full simulation:
+
+    wgups generate datasets/day
+    wgups --cli --event-driven --data-dir datasets/day
+
+The defaults, 40 packages and 27 locations, are the size of the bundled day, which the CLI's
+3 trucks and 2 drivers finish: the day above is done at 10:44, with nothing late.
+Nothing checks that other days fit in what the drivers can deliver before midnight, or that
+their deadlines can be met. A package that can no longer make its deadline stays at the hub
+(unless the run uses regions), and the run stops at midnight. With the CLI fleet, 9 of the
+first 10 seeds of the default size finish, and days of 80 packages or more often don't.
+Run larger days through `wgups batch` with a bigger truck_fleet_size and driver_crew_size,
+and read the late and undelivered counts it reports.
+
+Locations sit on a street grid around the hub, one unit being a tenth of a mile, and the
+distance between two locations is their grid (Manhattan) distance. That is a true metric,
+so the triangle inequality holds for every trio of locations, as it does for real roads.
+
+Tunable:
+  - the deadline mix, e.g. {"09:00:00": 0.01, "10:30:00": 0.1, "EOD": 0.89}
+  - the share of packages that can only ride one truck, are delayed on the flight,
+    or must be delivered together with others (bundles)
+
+Package 9 always gets the "Wrong address listed" note, and the address it is corrected to
+at 10:20 is always in the location table, as the special update expects.
+"""
+import csv
+import os
+import random
+from typing import Dict, List, Tuple
+
+from wgups.constants import DELAYED_FLIGHT_NOTE, TRUCK_ONLY_NOTE, BUNDLE_NOTE, WRONG_ADDRESS_NOTE, REVISED_ADDRESS, \
+    FLIGHT_ARRIVAL_TIME
+from wgups.core.delivery_truck import START_LOCATION, MAX_CAPACITY
+from wgups.utils import PACKAGE_FILE_NAME, DISTANCE_FILE_NAME, LOCATION_FILE_NAME, convert_deadline
+
+PACKAGE_FIELDS = ["Package ID", "Address", "City", "State", "Zip", "Delivery Deadline", "Mass", "Special Notes"]
+DISTANCE_FIELDS = ["Location1", "Location2", "Distance"]
+LOCATION_FIELDS = ["PackageText", "Location"]
+
+DEFAULT_DEADLINE_MIX = {"09:00:00": 0.01, "10:30:00": 0.1, "EOD": 0.89}
+
+CITIES = [
+    ("Salt Lake City", "84101"), ("Salt Lake City", "84106"), ("Salt Lake City", "84115"),
+    ("West Valley City", "84119"), ("Millcreek", "84117"), ("Holladay", "84117"), ("Murray", "84107"),
+]
+STATE = "UT"
+
+REVISED_LOCATION = "Third District Juvenile Court 410 S State St"
+WRONG_ADDRESS_PACKAGE_ID = 9
+
+
+def _grid_points(count: int, rng: random.Random, area_in_miles: float) -> List[Tuple[int, int]]:
+    """`count` distinct grid points (in tenths of a mile) around the hub at (0, 0)"""
+    half = max(1, round(area_in_miles * 10 / 2))
+    if count > (2 * half + 1) ** 2 - 1:
+        raise ValueError(f"Can't fit {count} locations in a {area_in_miles} mile square")
+    points = set()
+    while len(points) < count:
+        point = (rng.randint(-half, half), rng.randint(-half, half))
+        if point != (0, 0):
+            points.add(point)
+    # Sorted first so the result doesn't depend on set ordering
+    ordered = sorted(points)
+    rng.shuffle(ordered)
+    return ordered
+
+
+def generate_dataset(packages: int = 40, locations: int = 27, seed: int = 1,
+                     deadline_mix: Dict[str, float] = None, truck_only_rate: float = 0.05,
+                     delayed_rate: float = 0.05, bundle_rate: float = 0.05, max_bundle_size: int = 4,
+                     trucks: int = 2, area_in_miles: float = 10.0) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Build (package_rows, distance_rows, location_rows) as they appear in the CSV files.
+    locations counts every stop, including the hub and the corrected address for package 9.
+    """
+    if packages < WRONG_ADDRESS_PACKAGE_ID:
+        raise ValueError(f"Need at least {WRONG_ADDRESS_PACKAGE_ID} packages (package 9 gets a corrected address)")
+    if locations < 3:
+        raise ValueError("Need at least 3 locations: the hub, the corrected address and one stop")
+    if not 2 <= max_bundle_size <= MAX_CAPACITY:
+        raise ValueError(f"max_bundle_size must be between 2 and {MAX_CAPACITY}")
+    rng = random.Random(seed)
+    deadline_mix = deadline_mix or DEFAULT_DEADLINE_MIX
+
+    # Locations: the hub, package 9's corrected address, then grid addresses
+    points = [(0, 0)] + _grid_points(locations - 1, rng, area_in_miles)
+    half = max(abs(coordinate) for point in points for coordinate in point)
+    # House numbers all have the same number of digits, so no address is part of another
+    base = 10 ** len(str(20 * half))
+    names = [START_LOCATION, REVISED_LOCATION]
+    addresses = ["None1", REVISED_ADDRESS]
+    for x, y in points[2:]:
+        city, zip_code = rng.choice(CITIES)
+        street = f"{base + 10 * (half - y)} S {base + 10 * (x + half)} E"
+        names.append(f"Stop {street}")
+        addresses.append(f"{street}, {city}, {STATE} {zip_code}")
+
+    location_rows = [{"PackageText": address, "Location": name} for address, name in zip(addresses, names)]
+
+    distance_rows = []
+    for i in range(1, len(points)):
+        x1, y1 = points[i]
+        for j in range(i):
+            x2, y2 = points[j]
+            distance_rows.append({"Location1": names[i], "Location2": names[j],
+                                  "Distance": f"{(abs(x1 - x2) + abs(y1 - y2)) / 10:.1f}"})
+
+    # Packages: random stops (never the hub or the corrected address) and deadlines from the mix
+    deadlines = list(deadline_mix)
+    weights = [deadline_mix[deadline] for deadline in deadlines]
+    package_rows = []
+    for package_id in range(1, packages + 1):
+        street, city, state_zip = addresses[rng.randrange(2, len(addresses))].split(", ")
+        state, zip_code = state_zip.split(" ")
+        package_rows.append({
+            "Package ID": str(package_id),
+            "Address": street,
+            "City": city,
+            "State": state,
+            "Zip": zip_code,
+            "Delivery Deadline": rng.choices(deadlines, weights)[0],
+            "Mass": str(rng.randint(1, 100)),
+            "Special Notes": "",
+        })
+
+    # Special notes. Each package gets at most one, package 9 always gets the wrong address note.
+    wrong_address = package_rows[WRONG_ADDRESS_PACKAGE_ID - 1]
+    wrong_address["Special Notes"] = WRONG_ADDRESS_NOTE
+    wrong_address["Delivery Deadline"] = "EOD"  # Can't leave the hub before the 10:20 correction
+    others = [row for row in package_rows if row is not wrong_address]
+    rng.shuffle(others)
+
+    bundled = others[:round(bundle_rate * len(others))]
+    while len(bundled) >= 2:
+        size = min(rng.randint(2, max_bundle_size), len(bundled))
+        group, bundled = bundled[:size], bundled[size:]
+        for row in group:
+            linked = ", ".join(other["Package ID"] for other in group if other is not row)
+            row["Special Notes"] = BUNDLE_NOTE.format(package_ids=linked)
+
+    unbundled = [row for row in others if not row["Special Notes"]]
+    delayed_count = round(delayed_rate * len(others))
+    for row in unbundled[:delayed_count]:
+        row["Special Notes"] = DELAYED_FLIGHT_NOTE
+        # Nothing on the flight can make a deadline before it lands
+        if convert_deadline(row["Delivery Deadline"]) <= FLIGHT_ARRIVAL_TIME:
+            row["Delivery Deadline"] = "EOD"
+    for row in unbundled[delayed_count:delayed_count + round(truck_only_rate * len(others))]:
+        row["Special Notes"] = TRUCK_ONLY_NOTE.format(truck_id=rng.randint(1, trucks))
+
+    return package_rows, distance_rows, location_rows
+
+
+def _write_csv(path: str, fields: List[str], rows: List[Dict]):
+    with open(path, mode='w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_dataset(output_dir: str, **options) -> Dict[str, str]:
+    """
+    Generate a dataset (see generate_dataset for the options) and write the three CSV files
+    into output_dir, under the same names as the bundled files. Returns the file paths.
+    """
+    package_rows, distance_rows, location_rows = generate_dataset(**options)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "packages": os.path.join(output_dir, PACKAGE_FILE_NAME),
+        "distances": os.path.join(output_dir, DISTANCE_FILE_NAME),
+        "locations": os.path.join(output_dir, LOCATION_FILE_NAME),
+    }
+    _write_csv(paths["packages"], PACKAGE_FIELDS, package_rows)
+    _write_csv(paths["distances"], DISTANCE_FIELDS, distance_rows)
+    _write_csv(paths["locations"], LOCATION_FIELDS, location_rows)
+    return paths
+
+
+def parse_deadline_mix(pairs: List[str]) -> Dict[str, float]:
+    """Parse ["10:30:00=0.2", "EOD=0.8"] style command line arguments"""
+    deadline_mix = {}
+    for pair in pairs:
+        deadline, _, weight = pair.partition("=")
+        convert_deadline(deadline)  # Fails early on a malformed deadline
+        deadline_mix[deadline] = float(weight)
+    return deadline_mix
@@ -0,0 +1,367 @@
+"""
+Structured event log and replay
+
+Instead of dumping every package's __str__ into a text file, the simulation can record each
+state transition as one compact event:
+
+    time      simulated seconds after midnight
+    event     load, depart, deliver, return, dock, available or update
+    truck     truck id (0 when no truck is involved)
+    package   package id (None when no package is involved)
+    location  DistanceMatrix index of the place the event is about (-1 for none)
+    miles     the truck's odometer at that moment
+
+    load       package put on a truck at the hub
+    depart     truck sets off for its next stop (package is that stop)
+    deliver    package delivered at location
+    return     truck sets off back to the hub
+    dock       truck is back at the hub
+    available  delayed package arrived at the hub
+    update     package re-addressed to location
+
+Events are appended, in time order, to either
+  - a JSONL file (.jsonl): a header line, then one JSON object per event, or
+  - a binary file (anything else): magic, a JSON header, then fixed-size records.
+
+The header holds the start of day: locations, trucks and their speed, and every package's
+status and destination. EventLogReader.state_at(t) rebuilds the packages' and trucks' state
+at any time by replaying the events up to t, without re-running the simulation, and
+EventLogReader.events(start, end) binary searches the file for a time window.
+
+Usage:
+    wgups --cli --event-log day.events
+    wgups replay day.events --at 10:25:00
+    wgups replay day.events --from 09:00:00 --to 09:30:00
+"""
+import json
+import os
+import struct
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from wgups.core.package import PackageStatus
+from wgups.utils import convert_seconds_to_hhmmss
+
+MAGIC = b"WGUPSEV1"
+FORMAT_VERSION = 1
+
+LOAD, DEPART, DELIVER, RETURN, DOCK, AVAILABLE, UPDATE = EVENT_TYPES = (
+    "load", "depart", "deliver", "return", "dock", "available", "update")
+EVENT_CODES = {event: code for code, event in enumerate(EVENT_TYPES)}
+
+# Once a JSONL bisect is down to this many bytes, just read forward
+JSONL_SCAN_BYTES = 4096
+
+# time, event code, truck, package slot (index in the header's package list, -1 for none), location, miles
+RECORD = struct.Struct("<IBHiid")
+
+
+class Event(NamedTuple):
+    time: int
+    event: str
+    truck: int
+    package: Optional[str]
+    location: int
+    miles: float
+
+
+class EventLog:
+    """
+    Base class for the event writers. DeliveryManager(event_log=...) attaches it,
+    which writes the header; the trucks and the manager then call record().
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.delivery_manager = None
+        self.package_slots: Dict[str, int] = {}
+        self.count = 0
+
+    def attach(self, delivery_manager):
+        """Write the header describing the start of day, and take the event times from this manager"""
+        self.delivery_manager = delivery_manager
+        packages = sorted(delivery_manager.packages.values(), key=lambda pkg: _package_sort_key(pkg.package_ID))
+        self.package_slots = {pkg.package_ID: slot for slot, pkg in enumerate(packages)}
+        header = {
+            "version": FORMAT_VERSION,
+            "start_time": delivery_manager.time,
+            "locations": delivery_manager.distance_matrix.locations,
+            "hub": delivery_manager.distance_matrix.index_of(delivery_manager.trucks[0].point_a)
+            if delivery_manager.trucks else -1,
+            "trucks": [[truck.truck_id, truck.speed_in_mph] for truck in delivery_manager.trucks],
+            "packages": [[pkg.package_ID, pkg.status.name, _location_index(delivery_manager, pkg), pkg.deadline]
+                         for pkg in packages],
+        }
+        self._write_header(header)
+
+    def record(self, event: str, truck=None, package=None, location: int = -1):
+        """Append one event at the current simulation time"""
+        miles = truck.total_miles_travelled if truck is not None else 0.0
+        self._write(Event(self.delivery_manager.time, event, truck.truck_id if truck is not None else 0,
+                          package.package_ID if package is not None else None, location, miles))
+        self.count += 1
+
+    def _write_header(self, header: Dict):
+        raise NotImplementedError
+
+    def _write(self, event: Event):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlEventLog(EventLog):
+    """One JSON object per line. Easy to grep and load elsewhere."""
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, mode='w', encoding='utf-8')
+
+    def _write_header(self, header: Dict):
+        self._file.write(json.dumps(header, separators=(",", ":")) + "\n")
+
+    def _write(self, event: Event):
+        self._file.write(json.dumps(event._asdict(), separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class BinaryEventLog(EventLog):
+    """Fixed-size records after a JSON header, so a reader can seek straight to any event"""
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, mode='wb')
+
+    def _write_header(self, header: Dict):
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        self._file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+
+    def _write(self, event: Event):
+        # Packages that aren't in the header (e.g. special routes) are recorded without their id
+        slot = self.package_slots.get(event.package, -1) if event.package is not None else -1
+        self._file.write(RECORD.pack(event.time, EVENT_CODES[event.event], event.truck, slot, event.location,
+                                     event.miles))
+
+    def close(self):
+        self._file.close()
+
+
+class EventLogTee:
+    """Sends each event to several event logs, e.g. a file and the in-memory history"""
+    def __init__(self, *event_logs: EventLog):
+        self.event_logs = event_logs
+
+    def record(self, event: str, truck=None, package=None, location: int = -1):
+        for event_log in self.event_logs:
+            event_log.record(event, truck, package, location)
+
+
+def open_event_log(path: str) -> EventLog:
+    """A JSONL writer for .jsonl paths, a binary writer for anything else"""
+    if path.endswith(".jsonl"):
+        return JsonlEventLog(path)
+    return BinaryEventLog(path)
+
+
+class EventLogReader:
+    """
+    Reads an event log written by either writer. events() seeks by binary search on time,
+    state_at() replays from the start-of-day header.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, mode='rb') as log_file:
+            self.binary = log_file.read(len(MAGIC)) == MAGIC
+            if self.binary:
+                (header_length,) = struct.unpack("<I", log_file.read(4))
+                self.header = json.loads(log_file.read(header_length).decode("utf-8"))
+                self._data_offset = len(MAGIC) + 4 + header_length
+                self._count = (os.path.getsize(path) - self._data_offset) // RECORD.size
+            else:
+                log_file.seek(0)
+                self.header = json.loads(log_file.readline().decode("utf-8"))
+                self._data_offset = log_file.tell()
+        self.package_ids = [row[0] for row in self.header["packages"]]
+        self.locations = self.header["locations"]
+
+    # --------------------------
+    # Reading events
+    # --------------------------
+    def events(self, start: int = None, end: int = None) -> Iterator[Event]:
+        """Events with start <= time <= end, in order. Skips straight to `start`."""
+        with open(self.path, mode='rb') as log_file:
+            if self.binary:
+                yield from self._binary_events(log_file, start, end)
+            else:
+                yield from self._jsonl_events(log_file, start, end)
+
+    def _binary_event(self, log_file, position: int) -> Event:
+        log_file.seek(self._data_offset + position * RECORD.size)
+        time, code, truck, slot, location, miles = RECORD.unpack(log_file.read(RECORD.size))
+        return Event(time, EVENT_TYPES[code], truck, self.package_ids[slot] if slot >= 0 else None, location, miles)
+
+    def _binary_events(self, log_file, start, end):
+        low, high = 0, self._count
+        if start is not None:
+            # First record at or after `start`. Records are fixed size, so each probe is one seek.
+            while low < high:
+                middle = (low + high) // 2
+                if self._binary_event(log_file, middle).time < start:
+                    low = middle + 1
+                else:
+                    high = middle
+        log_file.seek(self._data_offset + low * RECORD.size)
+        for position in range(low, self._count):
+            chunk = log_file.read(RECORD.size)
+            if len(chunk) < RECORD.size:
+                break
+            time, code, truck, slot, location, miles = RECORD.unpack(chunk)
+            if end is not None and time > end:
+                break
+            yield Event(time, EVENT_TYPES[code], truck, self.package_ids[slot] if slot >= 0 else None,
+                        location, miles)
+
+    def _jsonl_events(self, log_file, start, end):
+        low = self._data_offset
+        if start is not None:
+            # Bisect on byte offsets down to a small window. `low` only moves past lines that
+            # are all earlier than `start`, so reading on from the line after it loses nothing.
+            high = os.path.getsize(self.path)
+            while high - low > JSONL_SCAN_BYTES:
+                middle = (low + high) // 2
+                log_file.seek(middle)
+                log_file.readline()
+                line = log_file.readline()
+                if line and json.loads(line)["time"] < start:
+                    low = middle
+                else:
+                    high = middle
+        log_file.seek(low)
+        if low > self._data_offset:
+            log_file.readline()
+        for line in log_file:
+            event = Event(**json.loads(line))
+            if start is not None and event.time < start:
+                continue
+            if end is not None and event.time > end:
+                break
+            yield event
+
+    # --------------------------
+    # Replay
+    # --------------------------
+    def state_at(self, time: int) -> "ReplayState":
+        """The state of every package and truck at the end of simulated second `time`"""
+        state = ReplayState(self.header)
+        for event in self.events(end=time):
+            state.apply(event)
+        state.time = time
+        return state
+
+
+class ReplayState:
+    """Package and truck state rebuilt from an event log"""
+    def __init__(self, header: Dict):
+        self.time = header["start_time"]
+        self.locations: List[str] = header["locations"]
+        self.hub = header["hub"]
+        # Package id -> dict(status, truck, location, deadline, delivered_at)
+        self.packages: Dict[str, Dict] = {
+            package_id: {"status": PackageStatus[status], "truck": 0, "location": location, "deadline": deadline,
+                         "delivered_at": None}
+            for package_id, status, location, deadline in header["packages"]}
+        # Truck id -> dict(status, location, heading, miles, since, speed, packages)
+        self.trucks: Dict[int, Dict] = {
+            truck_id: {"status": "AT_HUB", "location": self.hub, "heading": None, "miles": 0.0,
+                       "since": self.time, "speed": speed, "packages": []}
+            for truck_id, speed in header["trucks"]}
+
+    def copy(self) -> "ReplayState":
+        """An independent copy, for keeping as a snapshot"""
+        duplicate = ReplayState.__new__(ReplayState)
+        duplicate.time, duplicate.locations, duplicate.hub = self.time, self.locations, self.hub
+        duplicate.packages = {package_id: dict(package) for package_id, package in self.packages.items()}
+        duplicate.trucks = {truck_id: dict(truck, packages=list(truck["packages"]))
+                            for truck_id, truck in self.trucks.items()}
+        return duplicate
+
+    def apply(self, event: Event):
+        truck = self.trucks.get(event.truck)
+        package = self.packages.get(event.package) if event.package is not None else None
+        if truck is not None:
+            truck["miles"] = event.miles
+            truck["since"] = event.time
+
+        if event.event == LOAD:
+            truck["packages"].append(event.package)
+            if package is not None:
+                package["status"] = PackageStatus.ON_TRUCK
+                package["truck"] = event.truck
+        elif event.event == DEPART:
+            if truck["status"] == "AT_HUB":
+                # Loaded by the routing pass, which runs before the trucks move in the same second
+                truck["since"] = event.time - 1
+            truck["status"], truck["heading"] = "EN_ROUTE", event.location
+            for package_id in truck["packages"]:
+                if package_id in self.packages:
+                    self.packages[package_id]["status"] = PackageStatus.IN_TRANSIT
+            if package is not None:
+                package["status"] = PackageStatus.NEXT_STOP
+        elif event.event == DELIVER:
+            truck["location"], truck["heading"] = event.location, None
+            if event.package in truck["packages"]:
+                truck["packages"].remove(event.package)
+            if package is not None:
+                package["status"] = PackageStatus.DELIVERED
+                package["delivered_at"] = event.time
+        elif event.event == RETURN:
+            truck["status"], truck["heading"] = "RETURNING", self.hub
+        elif event.event == DOCK:
+            truck["status"], truck["location"], truck["heading"] = "AT_HUB", self.hub, None
+        elif event.event == AVAILABLE and package is not None:
+            package["status"] = PackageStatus.AT_HUB
+        elif event.event == UPDATE and package is not None:
+            package["location"] = event.location
+
+    def truck_miles(self, truck_id: int) -> float:
+        """
+        Odometer at self.time. Between events a moving truck travels at its constant speed,
+        so this matches the simulation up to floating point rounding.
+        """
+        truck = self.trucks[truck_id]
+        if truck["status"] == "AT_HUB":
+            return truck["miles"]
+        return truck["miles"] + truck["speed"] * (self.time - truck["since"]) / 3600
+
+    def summary_lines(self) -> List[str]:
+        lines = [f"Status at {convert_seconds_to_hhmmss(self.time)}"]
+        for truck_id in sorted(self.trucks):
+            truck = self.trucks[truck_id]
+            heading = f" heading to {self.locations[truck['heading']]}" if truck["heading"] is not None else ""
+            lines.append(f"Truck {truck_id}: {truck['status']}{heading}, {self.truck_miles(truck_id):.4f} miles, "
+                         f"{len(truck['packages'])} packages on board")
+        for package_id, package in sorted(self.packages.items(), key=lambda item: _package_sort_key(item[0])):
+            delivered = (f" at {convert_seconds_to_hhmmss(package['delivered_at'])}"
+                         if package["delivered_at"] is not None else "")
+            truck = f" on truck {package['truck']}" if package["truck"] else ""
+            lines.append(f"Package {package_id}: {package['status'].name}{delivered}{truck}, "
+                         f"deadline {convert_seconds_to_hhmmss(package['deadline'])}, "
+                         f"{self.locations[package['location']] if package['location'] >= 0 else 'unknown location'}")
+        total = sum(self.truck_miles(truck_id) for truck_id in self.trucks)
+        lines.append(f"Total miles: {total:.4f}")
+        return lines
+
+
+def _location_index(delivery_manager, package) -> int:
+    if package.destination_index is not None:
+        return package.destination_index
+    return delivery_manager.distance_matrix.index_of(package.destination)
+
+
+def _package_sort_key(package_id: str):
+    return (0, int(package_id), "") if str(package_id).isdigit() else (1, 0, str(package_id))
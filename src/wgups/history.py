@@ -0,0 +1,78 @@
+"""
+Simulation history
+
+Keeps what is needed to answer "what was the status of everything at HH:MM:SS?" for any
+time the simulation has already passed, without re-running it or touching the live state:
+
+  - deltas: every event the simulation records (the same load / depart / deliver / ...
+    events as wgups.event_log), in memory and in time order
+  - snapshots: a copy of the replayed package and truck state every `interval` simulated
+    seconds (15 minutes by default)
+
+state_at(t) binary searches the snapshots for the last one at or before t, copies it and
+applies only the events between the snapshot and t: O(log snapshots + events in one
+interval), plus copying the snapshot.
+
+It is only kept when the DeliveryManager is given a snapshot_interval:
+
+    delivery_manager = DeliveryManager(..., snapshot_interval=SNAPSHOT_INTERVAL)
+    delivery_manager.start()
+    state = delivery_manager.state_at(convert_deadline("10:25:00"))
+    state.packages["9"]["status"], state.truck_miles(1)
+"""
+from bisect import bisect_right
+from itertools import islice
+from typing import Dict, List
+
+from wgups.event_log import EventLog, Event, ReplayState
+
+SNAPSHOT_INTERVAL = 15 * 60  # seconds
+
+
+class SimulationHistory(EventLog):
+    """An EventLog kept in memory, with periodic snapshots of the replayed state"""
+    def __init__(self, interval: int = SNAPSHOT_INTERVAL):
+        super().__init__(path=None)
+        self.interval = interval
+        self.events: List[Event] = []
+        self.state: ReplayState = None
+        # Snapshot i holds the state after every event up to and including second snapshot_times[i],
+        # which is the state after the first snapshot_event_counts[i] events
+        self.snapshot_times: List[int] = []
+        self.snapshot_event_counts: List[int] = []
+        self.snapshots: List[ReplayState] = []
+        self._last_event_time = None
+
+    def _write_header(self, header: Dict):
+        self.state = ReplayState(header)
+        self._take_snapshot(header["start_time"])
+
+    def _take_snapshot(self, covered_time: int):
+        snapshot = self.state.copy()
+        snapshot.time = covered_time
+        self.snapshot_times.append(covered_time)
+        self.snapshot_event_counts.append(len(self.events))
+        self.snapshots.append(snapshot)
+
+    def _write(self, event: Event):
+        # Only snapshot between seconds, so a snapshot never holds half of a second's events
+        if (self._last_event_time is not None and event.time != self._last_event_time
+                and event.time - 1 - self.snapshot_times[-1] >= self.interval):
+            self._take_snapshot(event.time - 1)
+        self.events.append(event)
+        self.state.apply(event)
+        self._last_event_time = event.time
+
+    def close(self):
+        pass
+
+    def state_at(self, time: int) -> ReplayState:
+        """The state of every package and truck at the end of simulated second `time`"""
+        index = max(bisect_right(self.snapshot_times, time) - 1, 0)
+        state = self.snapshots[index].copy()
+        for event in islice(self.events, self.snapshot_event_counts[index], None):
+            if event.time > time:
+                break
+            state.apply(event)
+        state.time = time
+        return state
@@ -0,0 +1,82 @@
+"""
+Streaming ingestion
+
+Reads the data files lazily, one CSV row at a time, and converts each row straight into
+what the simulation uses, instead of materializing every row as a dict first:
+
+  - location rows go straight into the AddressIndex
+  - distance rows become (location1, location2, distance) entries for DistanceMatrix.from_entries
+  - package rows become Package objects, with the deadline, destination and destination
+    index resolved once (the weight stays the CSV string, as it always has)
+
+Peak memory then depends on the size of the finished data structures, not on the CSVs.
+DeliveryManager accepts the Package generator as its package_data:
+
+    address_index = load_address_index()
+    distance_matrix = load_distance_matrix()
+    packages = stream_packages(None, address_index, distance_matrix)
+    delivery_manager = DeliveryManager(packages, distance_matrix, address_index)
+"""
+import csv
+from typing import Dict, Iterator, Tuple
+
+from wgups.core.package import Package
+from wgups.data_structures.address_index import AddressIndex
+from wgups.data_structures.distance_matrix import DistanceMatrix
+from wgups.utils import iter_csv_rows, data_file_path, full_address, PACKAGE_FILE_NAME, DISTANCE_FILE_NAME, \
+    LOCATION_FILE_NAME
+
+
+def package_from_row(row: Dict, address_index: AddressIndex, distance_matrix: DistanceMatrix) -> Package:
+    """Build a Package from a package_file.csv row, resolving its destination once"""
+    address = row.get('full_address') or full_address(row)
+    destination = address_index.lookup(address)
+    if destination is None:
+        raise (Exception(f"Location {address} not found"))
+    return Package(
+        package_ID=row['Package ID'],
+        destination=destination,
+        deadline_in_hhmmss=row['Delivery Deadline'],
+        weight=row['Mass'],
+        notes=row['Special Notes'],
+        destination_index=distance_matrix.index_of(destination)
+    )
+
+
+def stream_packages(package_file_path: str = None, address_index: AddressIndex = None,
+                    distance_matrix: DistanceMatrix = None) -> Iterator[Package]:
+    """Yield a ready-made Package for each row of the package file, in file order"""
+    if package_file_path is None:
+        package_file_path = data_file_path(PACKAGE_FILE_NAME)
+    if address_index is None:
+        address_index = load_address_index()
+    if distance_matrix is None:
+        distance_matrix = load_distance_matrix()
+    for row in iter_csv_rows(package_file_path):
+        yield package_from_row(row, address_index, distance_matrix)
+
+
+def stream_distance_entries(distance_file_path: str = None) -> Iterator[Tuple[str, str, float]]:
+    """Yield (location1, location2, distance) for each row of the distance file"""
+    if distance_file_path is None:
+        distance_file_path = data_file_path(DISTANCE_FILE_NAME)
+    # The distance file is by far the largest, so skip DictReader's per-row dict and index columns directly
+    with open(distance_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, [])
+        first, second, distance = (header.index(column) for column in ('Location1', 'Location2', 'Distance'))
+        for row in reader:
+            if row:
+                yield row[first], row[second], float(row[distance])
+
+
+def load_distance_matrix(distance_file_path: str = None) -> DistanceMatrix:
+    """Build the DistanceMatrix in a single streaming pass over the distance file"""
+    return DistanceMatrix.from_entries(stream_distance_entries(distance_file_path))
+
+
+def load_address_index(location_file_path: str = None) -> AddressIndex:
+    """Build the AddressIndex in a single streaming pass over the location file"""
+    if location_file_path is None:
+        location_file_path = data_file_path(LOCATION_FILE_NAME)
+    return AddressIndex(iter_csv_rows(location_file_path))
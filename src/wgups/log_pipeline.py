@@ -0,0 +1,140 @@
+"""
+Logging pipeline
+
+The simulation logs on its hot paths: every delivery, departure and return to the hub, and
+every item accepted while building a route. Two things keep that cheap:
+
+  - Hot-path calls pass their values as logging arguments ("Truck %s delivered package %s", ...)
+    instead of f-strings, so a record that is filtered out by level is never formatted at all.
+  - With start_async_logging, the root logger only puts records on a queue
+    (DeferredQueueHandler). A QueueListener thread formats them and does the handler I/O,
+    so the simulation thread never waits on a terminal or a file.
+
+Quiet batch runs set the level to logging.WARNING. Per-delivery and per-route records are then
+dropped by the level check before a record object is even created. Only warnings and errors
+get through. The same events are still counted in `event_counts`, so a sweep can report how
+many deliveries, departures and special routes happened without paying for the log lines.
+
+A simulation run inside another, like the fleet planner's, goes in a `separate_run()` block. Its
+records (up to warnings) are dropped and its events are counted in a Counter of its own. Both
+are scoped to the context the block runs in, so other threads (the GUI worker, a QueueListener)
+keep logging and counting as before.
+
+Usage:
+    wgups --cli --async-logging
+    wgups --cli --quiet
+"""
+import atexit
+import logging
+import queue
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Iterator, Set
+
+# Event name -> number of times it happened, whatever the log level. Reset with reset_event_counts().
+event_counts: Counter = Counter()
+
+# The Counter count_event adds to in the current context: event_counts, except inside separate_run()
+_current_event_counts: ContextVar[Counter] = ContextVar("current_event_counts", default=event_counts)
+# Whether the current context is inside separate_run()
+_in_separate_run: ContextVar[bool] = ContextVar("in_separate_run", default=False)
+
+# Listeners started by start_async_logging and not stopped yet
+_running_listeners: Set[QueueListener] = set()
+
+PACKAGE_DELIVERED = "package_delivered"
+DELIVERED_WITH_NOTE = "delivered_with_note"
+ROUTE_STARTED = "route_started"
+RETURNED_TO_HUB = "returned_to_hub"
+ITEM_ACCEPTED = "item_accepted"
+TRUCK_DEPARTED = "truck_departed"
+SPECIAL_ROUTE_CREATED = "special_route_created"
+SPECIAL_ROUTE_VISITED = "special_route_visited"
+SPECIAL_UPDATE = "special_update"
+
+
+def count_event(event: str):
+    _current_event_counts.get()[event] += 1
+
+
+def reset_event_counts():
+    _current_event_counts.get().clear()
+
+
+def event_count_report() -> Dict[str, int]:
+    """The event counts as a plain dict, sorted by event name"""
+    return dict(sorted(_current_event_counts.get().items()))
+
+
+class SeparateRunFilter(logging.Filter):
+    """Drops records up to warnings logged from inside separate_run()"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.WARNING or not _in_separate_run.get()
+
+
+_separate_run_filter = SeparateRunFilter()
+
+
+@contextmanager
+def separate_run(package: str = "wgups") -> Iterator[Counter]:
+    """
+    Until the block ends, in this context only: records up to warnings from the `package` loggers
+    are dropped, and count_event counts in a new Counter, which is yielded, instead of event_counts.
+    The filter goes on each of the package's loggers (records don't go through their parent
+    loggers' filters), so they have to exist by then: import the simulation before the block.
+    """
+    for name, package_logger in list(logging.root.manager.loggerDict.items()):
+        if (name == package or name.startswith(package + ".")) and isinstance(package_logger, logging.Logger):
+            package_logger.addFilter(_separate_run_filter)
+    counts = Counter()
+    counts_token = _current_event_counts.set(counts)
+    separate_token = _in_separate_run.set(True)
+    try:
+        yield counts
+    finally:
+        _in_separate_run.reset(separate_token)
+        _current_event_counts.reset(counts_token)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that hands the record over as it is, instead of formatting it first like
+    the standard one does. The consumer (a QueueListener, or the GUI's log window) formats it.
+    The queue never leaves the process, so nothing has to be made picklable, but log arguments
+    must be values that won't change before they are formatted (ids, numbers, strings).
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_async_logging(level: int = logging.INFO, handlers: Iterable[logging.Handler] = None) -> QueueListener:
+    """
+    Route every record through a queue to a listener thread that runs `handlers`
+    (by default, the handlers the root logger has now). Returns the started listener,
+    which is also stopped, flushing what is left in the queue, at exit.
+    """
+    root_logger = logging.getLogger()
+    handlers = list(handlers) if handlers is not None else list(root_logger.handlers)
+    if not handlers:
+        handlers = [logging.StreamHandler()]
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(DeferredQueueHandler(log_queue))
+    root_logger.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _running_listeners.add(listener)
+    atexit.register(stop_async_logging, listener)
+    return listener
+
+
+def stop_async_logging(listener: QueueListener):
+    """Stop the listener once every queued record has been handled. Safe to call twice."""
+    if listener in _running_listeners:
+        _running_listeners.discard(listener)
+        listener.stop()
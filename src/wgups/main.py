@@ -1,26 +1,160 @@
 # William Perez, STUDENT ID 001438917
 import argparse
+import queue
 import threading
 import tkinter as tk
 from tkinter import simpledialog, scrolledtext, messagebox
 import logging
 from logging import getLogger
+from wgups.batch import run_batch
+from wgups.dataset_generator import write_dataset, parse_deadline_mix
 from wgups.core.delivery_manager import DeliveryManager
-from wgups.utils import ingest_packages_from_file, ingest_distances_from_file, ingest_locations_from_file
+from wgups.core.fleet_planner import plan_summary_lines
+from wgups.core.local_search import LOCAL_SEARCHES, get_local_search
+from wgups.event_log import EventLogReader, open_event_log
+from wgups.history import SNAPSHOT_INTERVAL
+from wgups.ingest import stream_packages, load_distance_matrix, load_address_index
+from wgups.log_pipeline import DeferredQueueHandler, start_async_logging, event_count_report
+from wgups.network_cache import PRECISIONS, compile_network, cache_path_for, load_network
+from wgups.profiling import Profiler
+from wgups.utils import convert_deadline, convert_seconds_to_hhmmss, data_file_path, PACKAGE_FILE_NAME, DISTANCE_FILE_NAME, LOCATION_FILE_NAME
 
 logger = getLogger(__name__)
 logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler()])
 
+# Most log records the GUI appends to the log window per refresh, and lines kept in it
+LOG_BATCH_SIZE = 5000
+MAX_LOG_LINES = 20000
+
+
+class SimulationWorker(threading.Thread):
+    """
+    Owns the DeliveryManager and runs every command against it on one background thread,
+    so the Tk thread never blocks on the simulation and never touches it mid-tick.
+
+    Commands are functions of the DeliveryManager, queued with submit() and run in order.
+    A command's result comes back through `results` as a (callback, result) pair, for the
+    Tk thread to call. pause() interrupts the command that is running, between two ticks,
+    along with any commands queued before the pause.
+    """
+    def __init__(self, delivery_manager: DeliveryManager):
+        super().__init__(name="wgups-simulation", daemon=True)
+        self.delivery_manager = delivery_manager
+        self.commands = queue.Queue()
+        self.results = queue.SimpleQueue()
+        self.interrupt = threading.Event()
+
+    def submit(self, command, callback=None):
+        """Run command(delivery_manager) on the worker, then callback(result) on the Tk thread"""
+        self.commands.put((command, callback))
+
+    def pause(self):
+        self.interrupt.set()
+        self.submit(self._paused)
+
+    def stop(self):
+        self.interrupt.set()
+        self.commands.put(None)
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            command, callback = item
+            try:
+                result = command(self.delivery_manager)
+            except Exception:
+                logger.exception("Simulation command failed")
+                continue
+            if callback is not None:
+                self.results.put((callback, result))
+
+    def _paused(self, delivery_manager):
+        self.interrupt.clear()
+        logger.info(f"Paused at {simulation_time(delivery_manager)}.")
+
+    # --------------------------
+    # Commands
+    # --------------------------
+    def tick_while(self, delivery_manager: DeliveryManager, keep_going) -> bool:
+        """
+        Tick while keep_going() holds and packages are left to deliver.
+        Returns False if a pause interrupted it.
+        """
+        while keep_going() and not delivery_manager.all_packages_delivered():
+            if self.interrupt.is_set():
+                return False
+            delivery_manager.tick()
+        if delivery_manager.all_packages_delivered():
+            log_completion(delivery_manager)
+        return True
+
+    def step(self, seconds: int):
+        def command(delivery_manager):
+            end_time = delivery_manager.time + seconds
+            self.tick_while(delivery_manager, lambda: delivery_manager.time < end_time)
+        self.submit(command)
+
+    def run_to_completion(self):
+        self.submit(lambda delivery_manager: self.tick_while(delivery_manager, lambda: True))
+
+    def status_at(self, time: int):
+        """
+        Log everything's status at `time`, from the simulation's history.
+        If the simulation hasn't got there yet, it runs up to `time` first.
+        """
+        def command(delivery_manager):
+            if not self.tick_while(delivery_manager, lambda: delivery_manager.time < time):
+                return
+            for line in delivery_manager.state_at(min(time, delivery_manager.time)).summary_lines():
+                logger.info(line)
+        self.submit(command)
+
+    def run_until_next_delivery(self, callback):
+        """callback(package) gets the package delivered, or None if there was none"""
+        def command(delivery_manager):
+            delivered = len(delivery_manager.packages_delivered)
+            finished = self.tick_while(delivery_manager,
+                                       lambda: len(delivery_manager.packages_delivered) == delivered)
+            # Counted after the tick that recorded the delivery, so the day's last package is returned too
+            if not finished or len(delivery_manager.packages_delivered) == delivered:
+                return None
+            newest_package = delivery_manager.packages_delivered[-1]
+            logger.info("Next package delivered.")
+            logger.info(f"Package ID: {newest_package.package_ID}")
+            return newest_package
+        self.submit(command, callback)
+
+
+def simulation_time(delivery_manager: DeliveryManager) -> str:
+    hours = delivery_manager.time // 3600
+    minutes = (delivery_manager.time % 3600) // 60
+    seconds = delivery_manager.time % 60
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def log_completion(delivery_manager: DeliveryManager):
+    delivered = len(delivery_manager.packages_delivered)
+    logger.info(f"Simulation complete. Time: {simulation_time(delivery_manager)}")
+    logger.info(f"All {delivered} routes ran. "
+                f"({delivered - delivery_manager.total_packages} extra routes made for special deliveries)")
+
+
 class WGUPSApp:
     def __init__(self, root, delivery_manager: DeliveryManager):
         self.root = root
         self.delivery_manager = delivery_manager
         self.root.title("WGUPS Algorithm GUI")
 
-        # State variables
-        self.running = False
-        self.log_queue = []
-        self.lock = threading.Lock()
+        # The simulation runs on its own thread. Every button goes through it,
+        # so the window stays responsive and the manager is only touched there.
+        self.worker = SimulationWorker(delivery_manager)
+        self.worker.start()
+
+        # Log records from any thread, formatted and drained in batches by update_logs
+        self.log_queue = queue.SimpleQueue()
+        self.log_formatter = logging.Formatter("%(message)s")
 
         # Create GUI elements
         self.start_button = tk.Button(root, text="Run to Comlpetion", command=self.start)
@@ -39,6 +173,9 @@ class WGUPSApp:
         self.step_button = tk.Button(root, text="Tick number of Seconds", command=self.step)
         self.step_button.pack(pady=5)
 
+        self.pause_button = tk.Button(root, text="Pause", command=self.pause)
+        self.pause_button.pack(pady=5)
+
         self.package_status_button = tk.Button(root, text="Check Package Status", command=self.check_package_status)
         self.package_status_button.pack(pady=5)
 
@@ -48,6 +185,12 @@ class WGUPSApp:
         self.check_truck_milage_button = tk.Button(root, text="Check All Trucks' Mileage", command=self.check_truck_milage)
         self.check_truck_milage_button.pack(pady=5)
 
+        self.performance_report_button = tk.Button(root, text="Performance Report", command=self.performance_report)
+        self.performance_report_button.pack(pady=5)
+
+        self.status_at_button = tk.Button(root, text="Status at HH:MM:SS", command=self.status_at)
+        self.status_at_button.pack(pady=5)
+
 
         self.log_label = tk.Label(root, text="Log Messages:")
         self.log_label.pack(pady=5)
@@ -55,151 +198,146 @@ class WGUPSApp:
         self.log_window = scrolledtext.ScrolledText(root, height=40, width=150, state="disabled")
         self.log_window.pack(pady=5)
 
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
         # Periodically update the log window
         self.update_logs()
 
-    @property
-    def simulation_time(self):
-        hours = self.delivery_manager.time // 3600
-        minutes = (self.delivery_manager.time % 3600) // 60
-        seconds = self.delivery_manager.time % 60
-        return f"{hours:02}:{minutes:02}:{seconds:02}"
-
     def start(self):
-        if not self.running:
-            self.running = True
-            threading.Thread(target=self.run_tick_loop, daemon=True).start()
-            logger.info("Started the tick loop.")
+        logger.info("Started the tick loop.")
+        self.worker.run_to_completion()
 
     def pause(self):
-        if self.running:
-            self.running = False
-            logger.info("Paused the tick loop.")
-        self.update_logs()
+        self.worker.pause()
+
+    def close(self):
+        self.worker.stop()
+        self.root.destroy()
 
     def step(self):
-        self.pause()  # Ensure paused before stepping
         seconds = simpledialog.askinteger("Step", "Enter seconds to tick:")
         if seconds is not None:
-            for _ in range(seconds):
-                if self.delivery_manager.all_packages_delivered():
-                    logger.info(f"Simulation complete. Time: {self.simulation_time}")
-                    logger.info(
-                        f"All {len(self.delivery_manager.packages_delivered)} routes ran. ({len(self.delivery_manager.packages_delivered) - self.delivery_manager.total_packages} extra routes made for special deliveries)")
-
-                    break
-                self.delivery_manager.tick()
-        self.update_logs()
+            self.worker.step(seconds)
 
     def check_package_status(self):
         # Prompt the user for a package ID
         package_id = simpledialog.askstring("Package ID", "Enter the Package ID:")
         if package_id:
-            # Get the status of the package
-            package = self.delivery_manager.packages.lookup_by_id(package_id)
-            # Show the result in a dialog box
-            messagebox.showinfo("Package Status", f"Package ID: {package_id}\nStatus: {package}")
+            # Get the status of the package on the worker, then show the result in a dialog box
+            self.worker.submit(
+                lambda delivery_manager: str(delivery_manager.packages.lookup_by_id(package_id)),
+                lambda status: messagebox.showinfo("Package Status", f"Package ID: {package_id}\nStatus: {status}"))
 
     def check_all_package_status(self):
-        logger.info("ALL PACKAGES REPORT")
-        logger.info(f"{self.simulation_time}")
-        logger.info("Packages at hub:")
-        for package in self.delivery_manager.packages_at_hub:
-            logger.info(f"Package ID: {package.package_ID} Status: {package}")
-
-        logger.info("Packages on trucks:")
-        for package in self.delivery_manager.packages_on_trucks:
-            logger.info(f"Package ID: {package.package_ID} Status: {package}")
-
-        logger.info("Packages delivered:")
-        for package in self.delivery_manager.packages_delivered:
-            logger.info(f"Package ID: {package.package_ID} Status: {package}")
-
-        logger.info("Unavailable Packages:")
-        for package in self.delivery_manager.packages_unavailable:
-            logger.info(f"Package ID: {package.package_ID} Status: {package}")
+        def command(delivery_manager):
+            logger.info("ALL PACKAGES REPORT")
+            logger.info(f"{simulation_time(delivery_manager)}")
+            logger.info("Packages at hub, earliest deadline first:")
+            for package in delivery_manager.packages_at_hub_sorted:
+                logger.info(f"Package ID: {package.package_ID} Status: {package}")
+
+            logger.info("Packages on trucks:")
+            for package in delivery_manager.packages_on_trucks:
+                logger.info(f"Package ID: {package.package_ID} Status: {package}")
+
+            logger.info("Packages delivered:")
+            for package in delivery_manager.packages_delivered:
+                logger.info(f"Package ID: {package.package_ID} Status: {package}")
+
+            logger.info("Unavailable Packages:")
+            for package in delivery_manager.packages_unavailable:
+                logger.info(f"Package ID: {package.package_ID} Status: {package}")
+
+            overdue = delivery_manager.packages_overdue
+            logger.info(f"Overdue packages (not delivered, deadline passed): {len(overdue)}")
+            for package in overdue:
+                logger.info(f"Package ID: {package.package_ID} Status: {package}")
+        self.worker.submit(command)
 
     def check_truck_milage(self):
-        total_milate = 0.0
-        for truck in self.delivery_manager.trucks:
-            total_milate += truck.total_miles_travelled
-            logger.info(f"Truck {truck.truck_id} has traveled {truck.total_miles_travelled:.4f} miles")
-        logger.info(f"Total miles traveled by all trucks: {total_milate:.4f}")
+        def command(delivery_manager):
+            total_milate = 0.0
+            for truck in delivery_manager.trucks:
+                total_milate += truck.total_miles_travelled
+                logger.info(f"Truck {truck.truck_id} has traveled {truck.total_miles_travelled:.4f} miles")
+            logger.info(f"Total miles traveled by all trucks: {total_milate:.4f}")
+        self.worker.submit(command)
+
+    def performance_report(self):
+        def command(delivery_manager):
+            profiler = delivery_manager.profiler
+            if profiler is None:
+                logger.info("Profiling is off. Start the program with --profile to time each phase.")
+                return
+            logger.info(f"PERFORMANCE REPORT {simulation_time(delivery_manager)}")
+            profiler.log_summary()
+        self.worker.submit(command)
+
+    def status_at(self):
+        text = simpledialog.askstring("Status at", "Enter a time (HH:MM:SS):")
+        if not text:
+            return
+        try:
+            time = convert_deadline(text.strip())
+        except (ValueError, IndexError):
+            messagebox.showerror("Status at", f"Not a time: {text}")
+            return
+        self.worker.status_at(time)
 
     def run_until_next_delivery(self):
-        self.pause()
-        num_packages_delivered = len(self.delivery_manager.packages_delivered)
-        while not self.delivery_manager.all_packages_delivered() and len(self.delivery_manager.packages_delivered) == num_packages_delivered:
-            self.delivery_manager.tick()
-
-        if self.delivery_manager.all_packages_delivered():
-            logger.info(f"Simulation complete. Time: {self.simulation_time}")
-            logger.info(
-                f"All {len(self.delivery_manager.packages_delivered)} routes ran. ({len(self.delivery_manager.packages_delivered) - self.delivery_manager.total_packages} extra routes made for special deliveries)")
-
-        else:
-            logger.info("Next package delivered.")
-            newest_package = self.delivery_manager.packages_delivered[-1]
-            logger.info(f"Package ID: {newest_package.package_ID}")
-            messagebox.showinfo("Package Delivered", f"Package ID: {newest_package.package_ID} Status: {newest_package}")
-        self.update_logs()
-
-
-    def run_tick_loop(self):
-        while self.running:
-            if self.delivery_manager.all_packages_delivered():
-                break
-            self.delivery_manager.tick() # Adjust as needed
-            #time.sleep(1)
-
-        # convert time to hh:mm:ss
-        logger.info(f"Simulation complete. Time: {self.simulation_time}")
-        logger.info(
-            f"All {len(self.delivery_manager.packages_delivered)} routes ran. ({len(self.delivery_manager.packages_delivered) - self.delivery_manager.total_packages} extra routes made for special deliveries)")
+        def show(package):
+            if package is not None:
+                messagebox.showinfo("Package Delivered", f"Package ID: {package.package_ID} Status: {package}")
+        self.worker.run_until_next_delivery(show)
 
     def update_logs(self):
         """
-        Periodically update the log window with new messages.
+        Periodically move new log records into the log window, and run any callbacks
+        for commands the worker finished. Records are inserted as one batch per refresh.
         """
-        with self.lock:
-            while self.log_queue:
-                message = self.log_queue.pop(0)
-                self.log_window.configure(state="normal")
-                self.log_window.insert(tk.END, message + "\n")
-                self.log_window.configure(state="disabled")
-                self.log_window.yview(tk.END)
+        messages = []
+        try:
+            while len(messages) < LOG_BATCH_SIZE:
+                messages.append(self.log_formatter.format(self.log_queue.get_nowait()))
+        except queue.Empty:
+            pass
+        if messages:
+            self.log_window.configure(state="normal")
+            self.log_window.insert(tk.END, "\n".join(messages) + "\n")
+            lines = int(self.log_window.index("end-1c").split(".")[0])
+            if lines > MAX_LOG_LINES:
+                self.log_window.delete("1.0", f"{lines - MAX_LOG_LINES}.0")
+            self.log_window.configure(state="disabled")
+            self.log_window.yview(tk.END)
+
+        try:
+            while True:
+                callback, result = self.worker.results.get_nowait()
+                callback(result)
+        except queue.Empty:
+            pass
 
         # Schedule the next log update
         self.root.after(100, self.update_logs)
 
     def set_speed(self, speed):
-        self.delivery_manager.default_tick_speed = int(speed)
+        self.worker.submit(lambda delivery_manager: setattr(delivery_manager, "default_tick_speed", int(speed)))
         logger.info(f"Speed set to {speed}")
         self.speed_label.config(text=f"1 real-time second = {speed} simulation seconds")
 
 
 def configure_logging(app):
     """
-    Redirect logging output to the GUI's log window.
+    Redirect logging output to the GUI's log window, through its log queue.
     """
-    class QueueHandler(logging.Handler):
-        def emit(self, record):
-            msg = self.format(record)
-            with app.lock:
-                app.log_queue.append(msg)
-
-        # Get the root logger
-
     root_logger = logging.getLogger()
 
     # Remove other handlers to avoid duplicate logs
-    for handler in root_logger.handlers:
+    for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
 
-    # Add the QueueHandler
-    queue_handler = QueueHandler()
-    queue_handler.setFormatter(logging.Formatter("%(message)s"))
-    root_logger.addHandler(queue_handler)
+    # Records are handed to the GUI as they are, and only formatted on the Tk thread when shown
+    root_logger.addHandler(DeferredQueueHandler(app.log_queue))
 
     # Set log level for the root logger
     root_logger.setLevel(logging.INFO)
@@ -212,33 +350,249 @@ def run_gui(delivery_manager: DeliveryManager):
     root.mainloop()
 
 def run_cli(args, delivery_manager: DeliveryManager):
-    delivery_manager.start()
+    if delivery_manager.plan is not None:
+        for line in plan_summary_lines(delivery_manager.plan):
+            logger.info(line)
+    delivery_manager.start(event_driven=args.event_driven)
+
+    report = delivery_manager.local_search_report()
+    logger.info(f"Local search '{report['local_search']}' (neighbors={report['neighbors']}): "
+                f"{report['fleet_miles']:.4f} fleet miles, {report['cpu_time']:.4f}s CPU, "
+                f"{report['evaluations']} moves evaluated, {report['improvements']} applied, "
+                f"{report['miles_saved']:.4f} miles saved")
+    for status_time in args.status_at or []:
+        state = delivery_manager.state_at(min(convert_deadline(status_time), delivery_manager.time))
+        for line in state.summary_lines():
+            logger.info(line)
+    if args.quiet:
+        # Logged at the quiet level itself, so it's the one line a quiet run prints
+        logger.log(logging.WARNING, "Finished at %s with %.4f fleet miles. Events: %s",
+                   convert_seconds_to_hhmmss(delivery_manager.time), delivery_manager.total_miles_travelled,
+                   event_count_report())
+
+def run_replay(args):
+    """Print the state at --at, or the events between --from and --to, from an event log"""
+    reader = EventLogReader(args.log)
+    if args.start or args.end:
+        start = convert_deadline(args.start) if args.start else None
+        end = convert_deadline(args.end) if args.end else None
+        for event in reader.events(start, end):
+            location = reader.locations[event.location] if event.location >= 0 else ""
+            print(f"{convert_seconds_to_hhmmss(event.time)} {event.event:<9} truck={event.truck} "
+                  f"package={event.package} miles={event.miles:.4f} {location}")
+    if args.at or not (args.start or args.end):
+        at = convert_deadline(args.at) if args.at else convert_deadline("23:59:59")
+        for line in reader.state_at(at).summary_lines():
+            print(line)
 
-def main(args)-> None:
-
-    # Create hash tables to store the package
-    # In python, these are implemented as Dictionaries
-    # These two helper functions create Lists of Dictionaries.
-    package_data = ingest_packages_from_file()
-    distance_data = ingest_distances_from_file()
-    location_data = ingest_locations_from_file()
-    delivery_manager = DeliveryManager(package_data, distance_data, location_data)
 
-    if args.cli:
-        run_cli(args, delivery_manager)
+def main(args)-> None:
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    if args.async_logging:
+        start_async_logging(level=logging.getLogger().level)
+
+    if args.command == "batch":
+        run_batch(args.scenarios, args.output, workers=args.workers, data_dir=args.data_dir)
+        return
+
+    if args.command == "generate":
+        paths = write_dataset(args.output_dir, packages=args.packages, locations=args.locations, seed=args.seed,
+                              deadline_mix=parse_deadline_mix(args.deadline_mix) if args.deadline_mix else None,
+                              truck_only_rate=args.truck_only_rate, delayed_rate=args.delayed_rate,
+                              bundle_rate=args.bundle_rate, trucks=args.trucks, area_in_miles=args.area)
+        logger.info(f"Wrote {args.packages} packages and {args.locations} locations: {', '.join(paths.values())}")
+        return
+
+    if args.command == "replay":
+        run_replay(args)
+        return
+
+    distance_file_path = data_file_path(DISTANCE_FILE_NAME, args.data_dir)
+    location_file_path = data_file_path(LOCATION_FILE_NAME, args.data_dir)
+
+    if args.command == "compile":
+        compile_network(distance_file_path, location_file_path, cache_path_for(distance_file_path),
+                        precision=args.precision)
+        return
+
+    # Stream the CSVs straight into the data structures the simulation uses:
+    # the address index, the O(1) distance matrix, and ready-made Package objects.
+    # The first two come from the memory-mapped network cache unless --no-cache is given.
+    if args.no_cache:
+        address_index = load_address_index(location_file_path)
+        distance_matrix = load_distance_matrix(distance_file_path)
     else:
-        run_gui(delivery_manager=delivery_manager)
+        address_index, distance_matrix = load_network(distance_file_path, location_file_path)
+    packages = stream_packages(data_file_path(PACKAGE_FILE_NAME, args.data_dir), address_index, distance_matrix)
+    local_search = get_local_search(args.local_search, neighbors=args.neighbors)
+    profiler = Profiler(pstats_path=args.profile_output) if args.profile or args.profile_output else None
+    event_log = open_event_log(args.event_log) if args.event_log else None
+    # The GUI's Status at button and --status-at answer from the history, so only they keep one
+    snapshot_interval = SNAPSHOT_INTERVAL if not args.cli or args.status_at else None
+    delivery_manager = DeliveryManager(packages, distance_matrix, address_index, local_search=local_search,
+                                       profiler=profiler, event_log=event_log, snapshot_interval=snapshot_interval,
+                                       regions=args.regions, plan_ahead=args.plan)
+
+    try:
+        if args.cli:
+            run_cli(args, delivery_manager)
+        else:
+            run_gui(delivery_manager=delivery_manager)
+    finally:
+        if event_log is not None:
+            event_log.close()
+            logger.info(f"Wrote {event_log.count} events to {event_log.path}")
 
     logger.info("All packages delivered")
 
 
-if __name__ == '__main__':
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="WGUPS Delivery Manager")
     parser.add_argument(
         "--cli",
         action="store_true",
         help="Run the application in CLI mode instead of GUI mode.",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--event-driven",
+        action="store_true",
+        help="In CLI mode, jump between simulation events instead of ticking every second.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="Read package_file.csv, distance_data.csv and location_lookup.csv from this directory "
+             "(e.g. one written by `generate`) instead of the bundled data.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse the distance and location CSVs instead of using the compiled network cache.",
+    )
+    parser.add_argument(
+        "--local-search",
+        choices=list(LOCAL_SEARCHES),
+        default="swap",
+        help="Route improvement moves: pairwise swaps (default), 2-opt reversals, Or-opt relocations, or both.",
+    )
+    parser.add_argument(
+        "--neighbors",
+        type=int,
+        default=None,
+        help="Only try local search moves that join a stop to one of its k nearest locations.",
+    )
+    parser.add_argument(
+        "--regions",
+        type=int,
+        default=None,
+        help="Cluster the day's delivery locations into K regions (k-medoids on the distance matrix) "
+             "and have each truck fill up from one region first.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Work out every trip of the day (truck, departure time, manifest) before it starts, by running the "
+             "dispatcher once with the whole truck fleet, then run the day by following that schedule.",
+    )
+    parser.add_argument(
+        "--event-log",
+        default=None,
+        metavar="FILE",
+        help="Record every load, departure, delivery, return, docking and special update to FILE "
+             "(JSONL if it ends in .jsonl, compact binary otherwise). Read it back with `replay`.",
+    )
+    parser.add_argument(
+        "--status-at",
+        nargs="+",
+        metavar="HH:MM:SS",
+        help="In CLI mode, log every package's and truck's status at these times once the run is done.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only log warnings and errors. Per-delivery records are skipped but still counted in the final summary.",
+    )
+    parser.add_argument(
+        "--async-logging",
+        action="store_true",
+        help="Format and write log records on a background thread instead of the simulation thread.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Count calls and time each simulation phase, and log the breakdown when the run ends "
+             "(or from the GUI's Performance Report button).",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        metavar="FILE",
+        help="Implies --profile, and also writes a cProfile of the run to FILE (view with python -m pstats FILE).",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Run many simulation scenarios in parallel.")
+    batch_parser.add_argument("scenarios", help="YAML or JSON file describing the scenarios to run.")
+    batch_parser.add_argument(
+        "-o", "--output",
+        default="batch_results.csv",
+        help="Where to stream per-scenario results. .csv or .jsonl (default: batch_results.csv).",
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: one per CPU).",
+    )
+
+    compile_parser = subparsers.add_parser(
+        "compile", help="Precompile the distance and location CSVs into the binary network cache.")
+    compile_parser.add_argument(
+        "--precision",
+        choices=list(PRECISIONS),
+        default="auto",
+        help="Matrix storage: float32 only when lossless (auto, the default), always float32, or float64.",
+    )
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Rebuild the package and truck status at a given time from an --event-log file.")
+    replay_parser.add_argument("log", help="Event log written with --event-log.")
+    replay_parser.add_argument("--at", metavar="HH:MM:SS", help="Print the status at this time (default: end of day).")
+    replay_parser.add_argument("--from", dest="start", metavar="HH:MM:SS", help="List the events from this time.")
+    replay_parser.add_argument("--to", dest="end", metavar="HH:MM:SS", help="List the events up to this time.")
+
+    generate_parser = subparsers.add_parser("generate", help="Write a synthetic dataset in the bundled CSV formats.")
+    generate_parser.add_argument("output_dir", help="Directory to write the three CSV files to.")
+    generate_parser.add_argument("--packages", type=int, default=40,
+                                 help="Number of packages (default: 40, the size of the bundled day).")
+    generate_parser.add_argument("--locations", type=int, default=27,
+                                 help="Number of locations, including the hub (default: 27).")
+    generate_parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+    generate_parser.add_argument(
+        "--deadline-mix",
+        nargs="+",
+        metavar="DEADLINE=WEIGHT",
+        help="Relative share of each deadline, e.g. 10:30:00=0.2 EOD=0.8 (default: 09:00:00=0.01 10:30:00=0.1 EOD=0.89).",
+    )
+    generate_parser.add_argument("--truck-only-rate", type=float, default=0.05,
+                                 help="Share of packages that can only ride one truck (default: 0.05).")
+    generate_parser.add_argument("--delayed-rate", type=float, default=0.05,
+                                 help="Share of packages delayed on the flight (default: 0.05).")
+    generate_parser.add_argument("--bundle-rate", type=float, default=0.05,
+                                 help="Share of packages that must be delivered with others (default: 0.05).")
+    generate_parser.add_argument("--trucks", type=int, default=2,
+                                 help="Truck-only notes name trucks 1 to this number (default: 2).")
+    generate_parser.add_argument("--area", type=float, default=10.0,
+                                 help="Side of the square around the hub the locations fall in, in miles (default: 10).")
+    return parser
+
+
+def entry_point() -> None:
+    args = build_parser().parse_args()
     # check if CLI arguments are passed
     main(args)
+
+
+if __name__ == '__main__':
+    entry_point()
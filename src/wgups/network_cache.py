@@ -0,0 +1,206 @@
+"""
+Precompiled network cache
+
+Compiles distance_data.csv and location_lookup.csv into one binary file, so startup doesn't
+have to parse hundreds of thousands of distance rows:
+
+    magic     8 bytes   b"WGUPSNC1"
+    length    4 bytes   little-endian size of the JSON header
+    header    JSON      format version, matrix type code ("d" or "f") and size,
+                        the source files' size / mtime / sha256, the location names in
+                        matrix order, and the location lookup rows
+    padding   to an 8 byte boundary
+    matrix    size * size native doubles ("d") or floats ("f"), row-major, NaN for missing pairs
+
+The loader memory-maps the file and hands a memoryview over the matrix to
+DistanceMatrix.from_buffer, so only the pages routing actually touches are read, and
+startup costs O(locations) instead of O(locations^2).
+
+The cache is rebuilt automatically when either CSV changes. If a source's size and mtime
+still match the header, the cache is used right away. Otherwise its sha256 is compared,
+so a file that was only touched doesn't force a rebuild.
+
+Floats ("f") halve the file size, but most decimal distances (e.g. 7.2) can't be stored
+exactly as floats, which would shift mileage and delivery times slightly. By default the
+matrix is stored as floats only when every distance survives the conversion unchanged,
+and as doubles otherwise. Pass precision="float32" to always use floats.
+
+Usage:
+    wgups compile                        # compile the bundled data (done automatically on startup too)
+    wgups --data-dir DIR compile --precision float32
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from logging import getLogger
+from math import isnan
+from typing import Dict, List, Tuple
+
+from wgups.data_structures.address_index import AddressIndex
+from wgups.data_structures.distance_matrix import DistanceMatrix
+from wgups.ingest import load_distance_matrix
+from wgups.utils import iter_csv_rows, data_file_path, DISTANCE_FILE_NAME, LOCATION_FILE_NAME
+
+logger = getLogger(__name__)
+
+MAGIC = b"WGUPSNC1"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+PRECISIONS = {"auto": None, "float32": "f", "float64": "d"}
+
+
+def default_cache_dir() -> str:
+    """$WGUPS_CACHE_DIR, or ~/.cache/wgups"""
+    return os.environ.get("WGUPS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "wgups")
+
+
+def cache_path_for(distance_file_path: str, cache_dir: str = None) -> str:
+    """One cache file per distance file location"""
+    key = hashlib.sha256(os.path.abspath(distance_file_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir or default_cache_dir(), f"network-{key}.bin")
+
+
+def _file_hash(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, mode='rb') as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _source_info(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "sha256": _file_hash(path)}
+
+
+def _source_is_current(recorded: Dict, path: str) -> bool:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size == recorded["size"] and stat.st_mtime_ns == recorded["mtime_ns"]:
+        return True
+    return stat.st_size == recorded["size"] and _file_hash(path) == recorded["sha256"]
+
+
+def _matrix_type_code(distances: array, precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision}. Choose from: {', '.join(PRECISIONS)}")
+    type_code = PRECISIONS[precision]
+    if type_code is not None:
+        return type_code
+    as_floats = array('f', distances)
+    lossless = all(single == double or (isnan(single) and isnan(double))
+                   for single, double in zip(as_floats, distances))
+    return 'f' if lossless else 'd'
+
+
+def compile_network(distance_file_path: str = None, location_file_path: str = None, cache_path: str = None,
+                    precision: str = "auto") -> str:
+    """Parse both CSVs once and write the binary cache. Returns the cache file path."""
+    distance_file_path = distance_file_path or data_file_path(DISTANCE_FILE_NAME)
+    location_file_path = location_file_path or data_file_path(LOCATION_FILE_NAME)
+    cache_path = cache_path or cache_path_for(distance_file_path)
+
+    # Hash before parsing, so a file changing mid-compile makes the cache look stale, not current
+    sources = {"distances": _source_info(distance_file_path), "locations": _source_info(location_file_path)}
+    distance_matrix = load_distance_matrix(distance_file_path)
+    location_rows = [[row['PackageText'], row['Location']] for row in iter_csv_rows(location_file_path)]
+
+    type_code = _matrix_type_code(distance_matrix._data, precision)
+    matrix = distance_matrix._data if type_code == 'd' else array('f', distance_matrix._data)
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "type_code": type_code,
+        "size": distance_matrix.size,
+        "sources": sources,
+        "locations": distance_matrix.locations,
+        "location_rows": location_rows,
+    }).encode("utf-8")
+    preamble = MAGIC + struct.pack("<I", len(header)) + header
+    padding = b"\0" * (-len(preamble) % ALIGNMENT)
+
+    # Write to a temporary file and swap it in, so a reader never sees a half-written cache
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, mode='wb') as cache_file:
+        cache_file.write(preamble + padding)
+        matrix.tofile(cache_file)
+    os.replace(temporary_path, cache_path)
+    logger.info(f"Compiled {distance_matrix.size} locations ({type_code}) into {cache_path}")
+    return cache_path
+
+
+def open_network(cache_path: str, distance_file_path: str = None,
+                 location_file_path: str = None) -> Tuple[AddressIndex, DistanceMatrix]:
+    """
+    Memory-map a compiled cache. Returns None if the file is missing, malformed, from another
+    format version or platform, or older than the CSVs it was compiled from (when their paths are given).
+    """
+    try:
+        with open(cache_path, mode='rb') as cache_file:
+            mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if mapped[:len(MAGIC)] != MAGIC:
+            return None
+        (header_length,) = struct.unpack_from("<I", mapped, len(MAGIC))
+        header_end = len(MAGIC) + 4 + header_length
+        header = json.loads(mapped[len(MAGIC) + 4:header_end].decode("utf-8"))
+        if header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            return None
+        for name, path in (("distances", distance_file_path), ("locations", location_file_path)):
+            if path is not None and not _source_is_current(header["sources"][name], path):
+                logger.info(f"{path} changed since {cache_path} was compiled")
+                return None
+
+        offset = header_end + (-header_end % ALIGNMENT)
+        item_size = array(header["type_code"]).itemsize
+        matrix_bytes = header["size"] ** 2 * item_size
+        if len(mapped) < offset + matrix_bytes:
+            return None
+        data = memoryview(mapped)[offset:offset + matrix_bytes].cast(header["type_code"])
+    except (ValueError, KeyError, struct.error):
+        mapped.close()
+        return None
+
+    distance_matrix = DistanceMatrix.from_buffer(header["locations"], data)
+    distance_matrix._mmap = mapped  # Keep the mapping open for as long as the matrix is used
+    address_index = AddressIndex({"PackageText": text, "Location": location}
+                                 for text, location in header["location_rows"])
+    return address_index, distance_matrix
+
+
+def load_network(distance_file_path: str = None, location_file_path: str = None, cache_dir: str = None,
+                 precision: str = "auto") -> Tuple[AddressIndex, DistanceMatrix]:
+    """
+    The AddressIndex and DistanceMatrix for a pair of CSVs, from the compiled cache.
+    Compiles (or recompiles) the cache first when it is missing or stale. If the cache
+    can't be written, falls back to building both from the CSVs in memory.
+    """
+    distance_file_path = distance_file_path or data_file_path(DISTANCE_FILE_NAME)
+    location_file_path = location_file_path or data_file_path(LOCATION_FILE_NAME)
+    cache_path = cache_path_for(distance_file_path, cache_dir)
+
+    network = open_network(cache_path, distance_file_path, location_file_path)
+    if network is not None:
+        return network
+
+    try:
+        compile_network(distance_file_path, location_file_path, cache_path, precision=precision)
+    except OSError as e:
+        logger.warning(f"Couldn't write the network cache {cache_path} ({e}), reading the CSVs instead")
+        return AddressIndex(iter_csv_rows(location_file_path)), load_distance_matrix(distance_file_path)
+
+    network = open_network(cache_path, distance_file_path, location_file_path)
+    if network is None:
+        raise Exception(f"Network cache {cache_path} is unreadable right after compiling it")
+    return network
@@ -0,0 +1,140 @@
+"""
+Per-phase timing instrumentation
+
+A Profiler counts calls and accumulates wall time for named phases of the simulation.
+Phases are methods of the objects doing the work (DeliveryManager, each DeliveryTruck and
+the DistanceMatrix). Instrumenting one replaces the bound method on that instance with a
+timed wrapper, so code paths stay untouched and, when profiling is off, nothing is wrapped
+and nothing is measured.
+
+Times are inclusive: run_route_algorithm includes the optimize_route_order calls it makes,
+which include the distance lookups they make, and so on.
+
+A session (see Profiler.session) also measures the total wall time of the run, so each phase
+can be reported as a share of it, and can record a cProfile of the run to a pstats file:
+
+    profiler = Profiler(pstats_path="wgups.pstats")
+    delivery_manager = DeliveryManager(..., profiler=profiler)
+    delivery_manager.start()   # logs the summary when done
+    python -m pstats wgups.pstats
+
+Usage:
+    wgups --cli --profile
+    wgups --cli --event-driven --profile-output wgups.pstats
+"""
+import cProfile
+from contextlib import contextmanager
+from functools import wraps
+from logging import getLogger
+from time import perf_counter
+from typing import Dict, Iterable, List
+
+logger = getLogger(__name__)
+
+# What DeliveryManager instruments, as (phase name prefix, method names)
+DELIVERY_MANAGER_PHASES = ("DeliveryManager", (
+    "tick", "advance_to_next_event", "special_update", "run_route_algorithm", "_get_available_items_as_bundles",
+    "_build_dispatch_queue", "_requeue", "_items_appendable", "_candidate_meets_deadlines", "optimize_route_order",
+    "evaluate_route", "route_meets_deadlines", "calculate_route_distance"))
+DELIVERY_TRUCK_PHASES = ("DeliveryTruck", ("update", "coast", "deliver"))
+DISTANCE_MATRIX_PHASES = ("DistanceMatrix", ("distance", "between"))
+
+
+class Profiler:
+    """
+    Call counts and accumulated wall time per phase.
+    Pass one to DeliveryManager(profiler=...) to instrument a simulation run.
+    """
+    def __init__(self, pstats_path: str = None):
+        self.pstats_path = pstats_path
+        # Phase name -> [calls, seconds]. Lists, so the wrappers can update them in place.
+        self.phases: Dict[str, List] = {}
+        self.wall_time = 0.0
+        self._instrumented = []
+
+    def wrap(self, name: str, function):
+        """A timed version of function, recorded under the phase `name`"""
+        stats = self.phases.setdefault(name, [0, 0.0])
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats[1] += perf_counter() - started
+                stats[0] += 1
+        return timed
+
+    def instrument(self, target, prefix: str, method_names: Iterable[str]):
+        """Time these methods of this one object, as phases named "prefix.method" """
+        for method_name in method_names:
+            if method_name in vars(target):
+                continue  # Already instrumented
+            setattr(target, method_name, self.wrap(f"{prefix}.{method_name}", getattr(target, method_name)))
+            self._instrumented.append((target, method_name))
+
+    def detach(self):
+        """Remove every timed wrapper, leaving the objects as they were (the numbers are kept)"""
+        for target, method_name in self._instrumented:
+            vars(target).pop(method_name, None)
+        self._instrumented = []
+
+    def reset(self):
+        """Forget everything measured so far"""
+        for stats in self.phases.values():
+            stats[0], stats[1] = 0, 0.0
+        self.wall_time = 0.0
+
+    @contextmanager
+    def session(self):
+        """Measure the total wall time of a run, and record a cProfile of it when pstats_path is set"""
+        profile = cProfile.Profile() if self.pstats_path else None
+        started = perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield self
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.wall_time += perf_counter() - started
+            if profile is not None:
+                profile.dump_stats(self.pstats_path)
+                logger.info(f"Wrote cProfile stats to {self.pstats_path} (view with: python -m pstats {self.pstats_path})")
+
+    def report(self) -> List[Dict]:
+        """One row per phase that was called, slowest first"""
+        rows = []
+        for name, (calls, seconds) in self.phases.items():
+            if not calls:
+                continue
+            rows.append({
+                "phase": name,
+                "calls": calls,
+                "seconds": seconds,
+                "mean_us": seconds / calls * 1e6,
+                "share": seconds / self.wall_time if self.wall_time else None,
+            })
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        return rows
+
+    def summary_lines(self) -> List[str]:
+        """The report as a fixed-width table"""
+        rows = self.report()
+        if not rows:
+            return ["No phases were timed."]
+        width = max(len(row["phase"]) for row in rows)
+        lines = [f"{'Phase':<{width}}  {'Calls':>10}  {'Seconds':>10}  {'Mean us':>10}  {'Share':>7}"]
+        for row in rows:
+            share = f"{row['share']:7.1%}" if row["share"] is not None else f"{'-':>7}"
+            lines.append(f"{row['phase']:<{width}}  {row['calls']:>10}  {row['seconds']:>10.4f}  "
+                         f"{row['mean_us']:>10.2f}  {share}")
+        if self.wall_time:
+            lines.append(f"Wall time {self.wall_time:.4f}s. Times are inclusive, so nested phases overlap.")
+        return lines
+
+    def log_summary(self):
+        logger.info("Timing by phase:")
+        for line in self.summary_lines():
+            logger.info(line)
@@ -1,10 +1,13 @@
 import csv
 import os
+from functools import lru_cache
 from logging import getLogger
-from typing import Dict, List
+from typing import Dict, Iterator, List, Union
 
 import wgups.res as res
 from wgups.constants import EOD_IN_SECONDS
+from wgups.data_structures.address_index import AddressIndex
+from wgups.data_structures.distance_matrix import DistanceMatrix
 
 PACKAGE_FILE_NAME = "package_file.csv"
 DISTANCE_FILE_NAME = "distance_data.csv"
@@ -12,10 +15,13 @@ LOCATION_FILE_NAME = "location_lookup.csv"
 logger = getLogger(__name__)
 
 
-def get_distance(distance_data: List[Dict], location1: str, location2: str) -> float:
+def get_distance(distance_data: Union[DistanceMatrix, List[Dict]], location1: str, location2: str) -> float:
     data = distance_data
     if data is None:
         raise Exception("No distance data available")
+    if isinstance(data, DistanceMatrix):
+        # O(1) indexed lookup
+        return data.between(location1, location2)
     if location1 == location2:
         return 0.0
     for row in data:
@@ -25,15 +31,45 @@ def get_distance(distance_data: List[Dict], location1: str, location2: str) -> f
     return None
 
 
-def ingest_distances_from_file()-> List[Dict]:
-    distance_file_path = os.path.join(str(res.__path__[0]), DISTANCE_FILE_NAME)
+def data_file_path(file_name: str, data_dir: str = None) -> str:
+    """
+    Path of one of the data files, e.g. PACKAGE_FILE_NAME.
+    Looks in data_dir if given (e.g. a generated dataset), otherwise in the bundled res/ package.
+    """
+    if data_dir is None:
+        data_dir = str(res.__path__[0])
+    return os.path.join(data_dir, file_name)
+
+
+def ingest_distances_from_file(distance_file_path: str = None)-> List[Dict]:
+    if distance_file_path is None:
+        distance_file_path = data_file_path(DISTANCE_FILE_NAME)
     distance_data = csv_to_dict_list(distance_file_path)
 
     return distance_data
 
 
-def ingest_packages_from_file() -> List[Dict]:
-    package_file_path = os.path.join(str(res.__path__[0]), PACKAGE_FILE_NAME)
+def build_distance_matrix(distance_data: List[Dict] = None) -> DistanceMatrix:
+    """
+    Build the indexed distance matrix once, so lookups during the simulation are O(1).
+    """
+    if distance_data is None:
+        distance_data = ingest_distances_from_file()
+    return DistanceMatrix(distance_data)
+
+
+def build_address_index(location_data: List[Dict] = None) -> AddressIndex:
+    """
+    Build the address -> location index once, so resolving package addresses is O(1) each.
+    """
+    if location_data is None:
+        location_data = ingest_locations_from_file()
+    return AddressIndex(location_data)
+
+
+def ingest_packages_from_file(package_file_path: str = None) -> List[Dict]:
+    if package_file_path is None:
+        package_file_path = data_file_path(PACKAGE_FILE_NAME)
     #logger.info(f" {package_file_path}")
     packages = csv_to_dict_list(package_file_path)
 
@@ -42,12 +78,13 @@ def ingest_packages_from_file() -> List[Dict]:
 
     # Add full_address to each package
     for package in packages:
-        package["full_address"] = f"{package['Address']}, {package['City']}, {package['State']} {package['Zip']}"
+        package["full_address"] = full_address(package)
 
     return packages
 
-def ingest_locations_from_file() -> List[Dict]:
-    location_file_path = os.path.join(str(res.__path__[0]), LOCATION_FILE_NAME)
+def ingest_locations_from_file(location_file_path: str = None) -> List[Dict]:
+    if location_file_path is None:
+        location_file_path = data_file_path(LOCATION_FILE_NAME)
     locations = csv_to_dict_list(location_file_path)
 
     logger.info(f"Loaded {len(locations)} locations from CSV")
@@ -57,18 +94,26 @@ def ingest_locations_from_file() -> List[Dict]:
 
 
 
-def csv_to_dict_list(csv_file_path: str)-> List[Dict]:
-    dict_list = []
+def full_address(package_row: Dict) -> str:
+    """The address a package row is delivered to, as written in the location lookup table"""
+    return f"{package_row['Address']}, {package_row['City']}, {package_row['State']} {package_row['Zip']}"
+
+
+def iter_csv_rows(csv_file_path: str) -> Iterator[Dict]:
+    """Read a CSV file lazily, one row dict at a time"""
     with open(csv_file_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        for row in csv_reader:
-            dict_list.append(row)
-    return dict_list
+        yield from csv.DictReader(csv_file)
+
+
+def csv_to_dict_list(csv_file_path: str)-> List[Dict]:
+    return list(iter_csv_rows(csv_file_path))
 
 
+@lru_cache(maxsize=None)
 def convert_deadline(deadline_in_hhmmss):
     """
-    Convert the deadline to seconds
+    Convert the deadline to seconds.
+    Cached: a day only has a handful of distinct deadlines, so packages share the same int objects.
     """
     if deadline_in_hhmmss == 'EOD':
         return EOD_IN_SECONDS